@@ -0,0 +1,52 @@
+"""Create transfers ledger tables
+
+Revision ID: 5c1e7a9d2f40
+Revises: 33e9f8549c31
+Create Date: 2026-10-19 10:12:41.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e7a9d2f40'
+down_revision: Union[str, None] = '33e9f8549c31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('entry_transfers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('event', sa.Integer(), nullable=False),
+    sa.Column('element_in', sa.Integer(), nullable=False),
+    sa.Column('element_in_cost', sa.Integer(), nullable=False),
+    sa.Column('element_out', sa.Integer(), nullable=False),
+    sa.Column('element_out_cost', sa.Integer(), nullable=False),
+    sa.Column('time', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('entry_id', 'event', 'element_in', 'element_out', 'time', name='uq_entry_transfers_transfer')
+    )
+    op.create_index(op.f('ix_entry_transfers_event'), 'entry_transfers', ['event'], unique=False)
+    op.create_index('ix_entry_transfers_entry_event', 'entry_transfers', ['entry_id', 'event'], unique=False)
+    op.create_table('entry_gameweek_transfers',
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('event', sa.Integer(), nullable=False),
+    sa.Column('transfers', sa.Integer(), nullable=False),
+    sa.Column('transfers_cost', sa.Integer(), nullable=False),
+    sa.Column('synced_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('entry_id', 'event')
+    )
+    op.create_index(op.f('ix_entry_gameweek_transfers_event'), 'entry_gameweek_transfers', ['event'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_entry_gameweek_transfers_event'), table_name='entry_gameweek_transfers')
+    op.drop_table('entry_gameweek_transfers')
+    op.drop_index('ix_entry_transfers_entry_event', table_name='entry_transfers')
+    op.drop_index(op.f('ix_entry_transfers_event'), table_name='entry_transfers')
+    op.drop_table('entry_transfers')
@@ -0,0 +1,55 @@
+"""Create entry history tables
+
+Revision ID: 8e3b6f1c0a72
+Revises: 5c1e7a9d2f40
+Create Date: 2026-10-19 11:02:17.334905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3b6f1c0a72'
+down_revision: Union[str, None] = '5c1e7a9d2f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('entry_history',
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('event', sa.Integer(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('total_points', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=True),
+    sa.Column('overall_rank', sa.Integer(), nullable=True),
+    sa.Column('bank', sa.Integer(), nullable=True),
+    sa.Column('value', sa.Integer(), nullable=True),
+    sa.Column('event_transfers', sa.Integer(), nullable=False),
+    sa.Column('event_transfers_cost', sa.Integer(), nullable=False),
+    sa.Column('points_on_bench', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('entry_id', 'event')
+    )
+    op.create_table('entry_past_seasons',
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('season_name', sa.String(), nullable=False),
+    sa.Column('total_points', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('entry_id', 'season_name')
+    )
+    op.create_table('entry_history_sync',
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('last_event', sa.Integer(), nullable=False),
+    sa.Column('last_event_final', sa.Boolean(), nullable=False),
+    sa.Column('synced_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('entry_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('entry_history_sync')
+    op.drop_table('entry_past_seasons')
+    op.drop_table('entry_history')
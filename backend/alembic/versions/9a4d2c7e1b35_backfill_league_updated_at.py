@@ -0,0 +1,30 @@
+"""Backfill leagues.updated_at
+
+Revision ID: 9a4d2c7e1b35
+Revises: 8e3b6f1c0a72
+Create Date: 2026-10-19 11:52:40.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4d2c7e1b35'
+down_revision: Union[str, None] = '8e3b6f1c0a72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows created without updated_at used to be patched on their first read
+    op.execute("UPDATE leagues SET updated_at = created_at WHERE updated_at IS NULL")
+    with op.batch_alter_table('leagues') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('leagues') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), server_default=None)
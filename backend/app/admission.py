@@ -0,0 +1,225 @@
+"""Admission control for routes that call upstream.
+
+When upstream slows down (at a deadline), requests used to pile up without
+limit until they all timed out together. :class:`AdmissionMiddleware` bounds
+each route class instead:
+
+* ``upstream`` (single-entry and reference data routes) and ``league``
+  (routes that fan out over a whole league) each allow a fixed number of
+  requests in flight, plus a bounded FIFO queue.
+* A queued request waits at most ``ADMISSION_QUEUE_TIMEOUT`` seconds. A full
+  queue or an expired wait gets an immediate ``503`` with ``Retry-After``.
+* Requests whose upstream payloads are already cached skip the queue: they
+  are admitted straight away and do not take a slot.
+* Every admitted request gets ``ADMISSION_REQUEST_DEADLINE`` seconds for its
+  upstream calls (:func:`app.upstream.request_budget`). The per-host limit in
+  :mod:`app.upstream` refuses calls past that deadline, and such a request
+  is answered with ``503`` too.
+
+Database, trend and debug routes are not limited, and neither is
+``/api/batch`` itself: :mod:`app.batch` admits each of its sub-requests
+against that sub-request's own class. :func:`admission_stats` reports queue
+depth, in-flight requests and rejections per class.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .snapshot import loaded_snapshot
+from .upstream import is_cached, request_budget
+
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+ADMISSION_REQUEST_DEADLINE = float(os.getenv("ADMISSION_REQUEST_DEADLINE", "20"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+
+# Route class -> (requests in flight, queued requests) per worker
+ROUTE_CLASS_LIMITS: Dict[str, Tuple[int, int]] = {
+    "upstream": (int(os.getenv("ADMISSION_UPSTREAM_CONCURRENCY", "32")), int(os.getenv("ADMISSION_UPSTREAM_QUEUE", "64"))),
+    "league": (int(os.getenv("ADMISSION_LEAGUE_CONCURRENCY", "8")), int(os.getenv("ADMISSION_LEAGUE_QUEUE", "16"))),
+}
+
+# Checked in order; paths under /api/ that match nothing are "upstream"
+_UNLIMITED = [
+    re.compile(r"^/api/leagues$"),
+    re.compile(r"^/api/leagues/\d+$"),
+    re.compile(r"^/api/trends/"),
+    re.compile(r"^/api/players/\d+/trend$"),
+    re.compile(r"^/api/batch$"),
+]
+_LEAGUE = [
+    re.compile(r"^/api/leagues/\d+/"),
+    re.compile(r"^/api/weekly-matchups/\d+$"),
+]
+
+
+def route_class(path: str) -> Optional[str]:
+    """``upstream``, ``league`` or None (not limited) for a request path."""
+    if not path.startswith("/api/") or any(pattern.match(path) for pattern in _UNLIMITED):
+        return None
+    if any(pattern.match(path) for pattern in _LEAGUE):
+        return "league"
+    return "upstream"
+
+
+# Route path -> whether it reads the snapshot, and the upstream paths it
+# reads (with a TTL); the request is cache-servable when all of them are in
+# this worker's memory. /api/team/{id} is not listed: it also syncs the
+# entry's stored history, which fetches upstream whenever the sync is due.
+_SOURCES: List[Tuple["re.Pattern[str]", bool, Callable[["re.Match[str]"], List[str]]]] = [
+    (re.compile(r"^/api/(bootstrap-static|current-gameweek|players/search)$"), False, lambda match: ["bootstrap-static/"]),
+    (re.compile(r"^/api/fixtures/(\d+)$"), True, lambda match: [f"fixtures/?event={match.group(1)}"]),
+    (re.compile(r"^/api/entry/(\d+)/event/(\d+)/picks$"), False, lambda match: [f"entry/{match.group(1)}/event/{match.group(2)}/picks/"]),
+]
+
+
+def cache_servable(path: str) -> bool:
+    for pattern, reads_snapshot, sources in _SOURCES:
+        match = pattern.match(path)
+        if match:
+            if reads_snapshot and loaded_snapshot() is None:
+                return False
+            return all(is_cached(source) for source in sources(match))
+    return False
+
+
+class AdmissionGate:
+    """Bounded concurrency with a bounded FIFO queue, for one route class in one worker."""
+
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self.admitted = 0
+        self.bypassed = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.shed_upstream = 0
+        self.peak_queue = 0
+
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting up to ``timeout`` seconds in the queue; False when refused."""
+        if self.active < self.limit and not self.queued():
+            self.active += 1
+            self.admitted += 1
+            return True
+        if self.queued() >= self.queue_size:
+            self.rejected_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.peak_queue = max(self.peak_queue, self.queued())
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            # Cancelled (client went away): pass on a slot that was just handed over
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            waiter.cancel()
+            raise
+        # Timed out: give up the place in the queue
+        waiter.cancel()
+        if waiter.cancelled():
+            self.rejected_timeout += 1
+            return False
+        # release() handed over its slot (active already counts it)
+        self.admitted += 1
+        return True
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "in_flight": self.active,
+            "queued": self.queued(),
+            "peak_queued": self.peak_queue,
+            "admitted": self.admitted,
+            "cache_bypassed": self.bypassed,
+            "rejected_queue_full": self.rejected_full,
+            "rejected_queue_timeout": self.rejected_timeout,
+            "shed_upstream_busy": self.shed_upstream,
+        }
+
+
+_gates: Dict[str, AdmissionGate] = {
+    name: AdmissionGate(name, limit, queue_size) for name, (limit, queue_size) in ROUTE_CLASS_LIMITS.items()
+}
+
+
+def admission_stats() -> Dict[str, Dict[str, int]]:
+    return {name: gate.stats() for name, gate in _gates.items()}
+
+
+async def _send_unavailable(send, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(ADMISSION_RETRY_AFTER).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the admission policy in the module docstring."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        gate = _gates[name]
+        if scope["method"] == "GET" and cache_servable(scope["path"]):
+            gate.bypassed += 1
+            await self.app(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        if not await gate.acquire(ADMISSION_QUEUE_TIMEOUT):
+            await _send_unavailable(send, "Server is busy, please retry shortly")
+            return
+        try:
+            with request_budget(ADMISSION_REQUEST_DEADLINE - (time.monotonic() - start)) as budget:
+
+                async def send_shed_as_unavailable(message):
+                    # Routes report upstream failures as 500; one refused for lack of slots is a 503
+                    if message["type"] == "http.response.start" and budget.shed and message["status"] >= 500:
+                        gate.shed_upstream += 1
+                        headers = [(key, value) for key, value in message.get("headers", []) if key != b"retry-after"]
+                        headers.append((b"retry-after", str(ADMISSION_RETRY_AFTER).encode()))
+                        message = {**message, "status": 503, "headers": headers}
+                    await send(message)
+
+                await self.app(scope, receive, send_shed_as_unavailable)
+        finally:
+            gate.release()
@@ -0,0 +1,144 @@
+"""In-process batching of GET requests.
+
+``POST /api/batch`` takes a list of sub-requests for existing routes and
+returns every result in one response, so a dashboard view costs one round
+trip instead of a dozen. Sub-requests are dispatched straight to the
+application's router (no HTTP) and run concurrently: route handlers that call
+upstream are sync functions, so each one runs in the threadpool while sharing
+the worker's caches.
+
+The only middleware a sub-request goes through is admission control
+(:class:`app.admission.AdmissionMiddleware`): each one takes a slot in its
+own route class, so a batch cannot exceed the limits its items would have as
+separate requests. A refused item gets a 503 result; the rest still run.
+
+Identical sub-requests, within one batch or across batches being served at
+the same time, are dispatched once and share the result (single flight).
+"""
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from .admission import AdmissionMiddleware
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+BATCH_PATH = "/api/batch"
+
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    query: Optional[Dict[str, Any]] = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+
+# (status, body) of a dispatched sub-request
+Outcome = Tuple[int, Any]
+
+# Sub-requests currently being dispatched in this worker, keyed by path and query
+_inflight: Dict[str, "asyncio.Future[Outcome]"] = {}
+
+
+def _split(item: BatchItem) -> Tuple[str, str]:
+    parts = urlsplit(item.path)
+    query = parts.query
+    if item.query:
+        query = "&".join(filter(None, [query, urlencode(item.query, doseq=True)]))
+    return parts.path, query
+
+
+def _decode(body: bytes) -> Any:
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body.decode("utf-8", errors="replace")
+
+
+async def _dispatch(app, parent_scope: Mapping[str, Any], path: str, query: str) -> Outcome:
+    scope = {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent_scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": parent_scope.get("scheme", "http"),
+        "server": parent_scope.get("server"),
+        "client": parent_scope.get("client"),
+        "root_path": parent_scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": [(b"accept", b"application/json")],
+        "app": app,
+    }
+    status = 500
+    chunks: List[bytes] = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await AdmissionMiddleware(app.router)(scope, receive, send)
+    except (HTTPException, StarletteHTTPException) as e:
+        return e.status_code, {"detail": e.detail}
+    except RequestValidationError as e:
+        return 422, {"detail": json.loads(json.dumps(e.errors(), default=str))}
+    except Exception as e:
+        return 500, {"detail": f"An unexpected error occurred: {str(e)}"}
+    return status, _decode(b"".join(chunks))
+
+
+async def _single_flight(app, parent_scope: Mapping[str, Any], path: str, query: str) -> Outcome:
+    key = f"{path}?{query}"
+    pending = _inflight.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        outcome = await _dispatch(app, parent_scope, path, query)
+        future.set_result(outcome)
+        return outcome
+    except BaseException:
+        # Only cancellation gets here (_dispatch reports errors as outcomes)
+        future.cancel()
+        raise
+    finally:
+        del _inflight[key]
+
+
+async def run_batch(app, parent_scope: Mapping[str, Any], items: List[BatchItem]) -> List[Dict[str, Any]]:
+    """Dispatch ``items`` concurrently and return one result per item, in order."""
+    async def run(item: BatchItem) -> Dict[str, Any]:
+        path, query = _split(item)
+        result: Dict[str, Any] = {"id": item.id, "path": item.path}
+        if item.method.upper() != "GET":
+            status, body = 405, {"detail": "Only GET sub-requests can be batched"}
+        elif not path.startswith("/api/") or path == BATCH_PATH:
+            status, body = 400, {"detail": "Sub-requests must target /api/ routes other than /api/batch"}
+        else:
+            status, body = await _single_flight(app, parent_scope, path, query)
+        result.update({"status": status, "body": body})
+        return result
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
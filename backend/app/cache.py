@@ -0,0 +1,325 @@
+"""Cache backends shared by all workers on a host.
+
+``CACHE_BACKEND`` selects the implementation:
+
+* ``memory`` (default): a dict in the current process. Fine for a single worker.
+* ``disk``: files under ``CACHE_DIR``, shared by every worker on the host.
+  Writes are atomic renames and cross-process locks use ``flock``.
+* ``redis``: any Redis-compatible server at ``REDIS_URL`` (needs the optional
+  ``redis`` package). Shared across hosts as well as workers.
+
+Values are bytes. ``lock(key)`` serialises the work of filling a key, so with
+the disk or Redis backends an upstream payload is fetched once per host (or
+cluster) rather than once per worker.
+
+The memory and disk backends are bounded: the memory cache evicts expired
+and then least recently used entries past ``CACHE_MEMORY_MAX_BYTES``, and a
+background sweep of the disk cache every ``CACHE_SWEEP_INTERVAL`` seconds
+removes expired entries and leftover temporary files, then the entries
+closest to expiry past ``CACHE_DISK_MAX_BYTES``. Redis expires keys itself.
+"""
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None  # type: ignore[assignment]
+
+try:
+    import redis  # type: ignore[import-not-found]
+except ImportError:
+    redis = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "fpl-league-hub-cache"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CACHE_LOCK_TIMEOUT = float(os.getenv("CACHE_LOCK_TIMEOUT", "30"))
+CACHE_MEMORY_MAX_BYTES = int(os.getenv("CACHE_MEMORY_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_DISK_MAX_BYTES = int(os.getenv("CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+CACHE_SWEEP_INTERVAL = float(os.getenv("CACHE_SWEEP_INTERVAL", "300"))
+# Temporary files older than this were left by a writer that died mid-write
+_STALE_TMP_AGE = 3600
+
+# (value, absolute expiry as a unix timestamp)
+CacheEntry = Tuple[bytes, float]
+
+
+class _KeyLock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Threads holding or waiting for the lock; it is dropped when none are left
+        self.users = 0
+
+
+class CacheBackend:
+    name = "base"
+
+    def __init__(self):
+        self._key_locks: Dict[str, _KeyLock] = {}
+        self._key_locks_guard = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    @contextmanager
+    def lock(self, key: str):
+        """Hold the fill lock for ``key`` within this process."""
+        with self._key_locks_guard:
+            key_lock = self._key_locks.setdefault(key, _KeyLock())
+            key_lock.users += 1
+        try:
+            with key_lock.lock:
+                yield
+        finally:
+            with self._key_locks_guard:
+                key_lock.users -= 1
+                if not key_lock.users:
+                    del self._key_locks[key]
+
+
+class MemoryCache(CacheBackend):
+    """Entries in least recently used order, holding at most ``max_bytes`` of values."""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int = CACHE_MEMORY_MAX_BYTES):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._guard = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._guard:
+            self._remove(key)
+            self._entries[key] = (value, time.time() + ttl)
+            self.size += len(value)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str):
+        with self._guard:
+            self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+    def _evict(self):
+        now = time.time()
+        for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            self._remove(key)
+        while self.size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+
+class DiskCache(CacheBackend):
+    """One file per key: an 8-byte expiry timestamp followed by the value."""
+
+    name = "disk"
+    _header = struct.Struct("<d")
+
+    def __init__(self, directory: str, max_bytes: int = CACHE_DISK_MAX_BYTES, sweep_interval: float = CACHE_SWEEP_INTERVAL):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        if sweep_interval > 0:
+            threading.Thread(target=self._sweep_loop, args=(sweep_interval,), name="disk-cache-sweep", daemon=True).start()
+
+    def _path(self, key: str, suffix: str = ".cache") -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + suffix)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < self._header.size:
+            return None
+        (expires_at,) = self._header.unpack_from(data)
+        if expires_at <= time.time():
+            return None
+        return data[self._header.size:], expires_at
+
+    def set(self, key: str, value: bytes, ttl: float):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._header.pack(time.time() + ttl))
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self, key: str):
+        with super().lock(key):
+            if fcntl is None:
+                yield
+                return
+            path = self._path(key, ".lock")
+            while True:
+                lock_file = open(path, "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino:
+                        break
+                except FileNotFoundError:
+                    pass
+                # The previous holder removed this file; lock the one now at the path
+                lock_file.close()
+            try:
+                yield
+            finally:
+                # Removed while still held, so a process waiting on this file retries with a new one
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                lock_file.close()
+
+    def sweep(self):
+        """Remove expired entries and stale temporary files, then the entries closest to expiry past ``max_bytes``."""
+        now = time.time()
+        live: List[Tuple[float, int, str]] = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            files = [item for item in scan if item.is_file()]
+        for item in files:
+            try:
+                if item.name.endswith(".tmp"):
+                    if item.stat().st_mtime < now - _STALE_TMP_AGE:
+                        os.unlink(item.path)
+                    continue
+                if not item.name.endswith(".cache"):
+                    continue
+                with open(item.path, "rb") as f:
+                    header = f.read(self._header.size)
+                expires_at = self._header.unpack(header)[0] if len(header) == self._header.size else 0.0
+                if expires_at <= now:
+                    os.unlink(item.path)
+                    continue
+                size = item.stat().st_size
+            except FileNotFoundError:
+                # Replaced or removed by another worker meanwhile
+                continue
+            live.append((expires_at, size, item.path))
+            total += size
+
+        live.sort()
+        for _, size, path in live:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _sweep_loop(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning(f"Disk cache sweep failed: {e}")
+
+
+class RedisCache(CacheBackend):
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "fpl-hub:"):
+        super().__init__()
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + key)
+        pipe.pttl(self.prefix + key)
+        value, ttl_ms = pipe.execute()
+        if value is None or ttl_ms is None or ttl_ms < 0:
+            return None
+        return value, time.time() + ttl_ms / 1000
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    @contextmanager
+    def lock(self, key: str):
+        with super().lock(key):
+            shared_lock = self.client.lock(self.prefix + "lock:" + key, timeout=CACHE_LOCK_TIMEOUT)
+            # On timeout, fill without the lock rather than failing the request
+            acquired = shared_lock.acquire(blocking_timeout=CACHE_LOCK_TIMEOUT)
+            try:
+                yield
+            finally:
+                if acquired:
+                    shared_lock.release()
+
+
+_cache: Optional[CacheBackend] = None
+_cache_guard = threading.Lock()
+
+
+def create_cache(backend: str) -> CacheBackend:
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "disk":
+        return DiskCache(CACHE_DIR)
+    if backend == "redis":
+        return RedisCache(REDIS_URL)
+    raise ValueError(f"Unknown CACHE_BACKEND {backend!r} (expected memory, disk or redis)")
+
+
+def get_cache() -> CacheBackend:
+    global _cache
+    with _cache_guard:
+        if _cache is None:
+            _cache = create_cache(CACHE_BACKEND)
+            logger.info(f"Using {_cache.name} cache backend")
+        return _cache
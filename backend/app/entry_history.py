@@ -0,0 +1,137 @@
+"""Entry history stored in the database.
+
+``entry/{id}/history/`` returns an entry's whole season (and every past
+season) on each call. The sync keeps it in three tables instead:
+
+* ``entry_history``: one row per entry per gameweek.
+* ``entry_past_seasons``: one row per entry per past season, stored on the
+  first sync (it does not change during a season).
+* ``entry_history_sync``: the entry's watermark, i.e. the latest gameweek
+  stored and whether upstream had finished it at the time.
+
+A sync upserts only the gameweeks past the watermark. The watermark
+gameweek itself is rewritten while it is unfinished, at most every
+``HISTORY_REFRESH_INTERVAL`` seconds, since its ranks keep moving until then.
+Routes then read single entries' rows by primary key.
+"""
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .snapshot import get_snapshot
+from .upstream import UpstreamPool, event_finished, get_json
+
+logger = logging.getLogger(__name__)
+
+HISTORY_REFRESH_INTERVAL = float(os.getenv("HISTORY_REFRESH_INTERVAL", "300"))
+
+# Upstream fetches for stale entries run concurrently; database writes stay on the caller's session
+SYNC_FETCH_WORKERS = 8
+
+HISTORY_FIELDS = (
+    "points", "total_points", "rank", "overall_rank", "bank", "value",
+    "event_transfers", "event_transfers_cost", "points_on_bench",
+)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _needs_sync(state: Optional[models.EntryHistorySync], current_event: int, now: datetime) -> bool:
+    if state is None or state.last_event < current_event:
+        return True
+    if state.last_event_final:
+        return False
+    return (now - _as_utc(state.synced_at)).total_seconds() >= HISTORY_REFRESH_INTERVAL
+
+
+def _store(db: Session, entry_id: int, state: Optional[models.EntryHistorySync], history: Dict[str, Any], now: datetime):
+    since = state.last_event if state else 0
+    rewrite_since = state is not None and not state.last_event_final
+    current = history.get('current', [])
+    for row in current:
+        if row['event'] > since or (rewrite_since and row['event'] == since):
+            db.merge(models.EntryHistory(entry_id=entry_id, event=row['event'], **{field: row.get(field) for field in HISTORY_FIELDS}))
+
+    if state is None:
+        for season in history.get('past', []):
+            db.merge(models.EntryPastSeason(
+                entry_id=entry_id,
+                season_name=season['season_name'],
+                total_points=season['total_points'],
+                rank=season['rank'],
+            ))
+        state = models.EntryHistorySync(entry_id=entry_id)
+        db.add(state)
+
+    last_event = max([row['event'] for row in current] + [since])
+    state.last_event = last_event
+    state.last_event_final = bool(last_event) and event_finished(last_event)
+    state.synced_at = now
+
+
+def sync_entries(db: Session, entry_ids: List[int], strict: bool = False) -> List[int]:
+    """Bring the stored history of ``entry_ids`` up to date; returns the entries that were synced.
+
+    Entries whose fetch fails keep their stored rows. With ``strict``, a
+    failed fetch for an entry that has never been synced raises instead.
+    """
+    current_gw = get_snapshot().current_event()
+    current_event = current_gw['id'] if current_gw else 0
+    now = datetime.now(timezone.utc)
+
+    states = {
+        state.entry_id: state
+        for state in db.query(models.EntryHistorySync).filter(models.EntryHistorySync.entry_id.in_(entry_ids))
+    }
+    stale = [entry_id for entry_id in entry_ids if _needs_sync(states.get(entry_id), current_event, now)]
+    if not stale:
+        return []
+
+    def fetch(entry_id: int):
+        try:
+            return entry_id, get_json(f"entry/{entry_id}/history/")
+        except Exception as e:
+            logger.warning(f"Could not sync history for entry {entry_id}: {e}")
+            return entry_id, e
+
+    with UpstreamPool(max_workers=SYNC_FETCH_WORKERS) as pool:
+        fetched = list(pool.map(fetch, stale))
+
+    synced = []
+    for entry_id, history in fetched:
+        if isinstance(history, Exception):
+            if strict and entry_id not in states:
+                raise history
+            continue
+        _store(db, entry_id, states.get(entry_id), history, now)
+        try:
+            db.commit()
+            synced.append(entry_id)
+        except IntegrityError:
+            # Another worker stored this entry's first sync at the same time
+            db.rollback()
+            logger.info(f"History for entry {entry_id} already synced by another worker")
+    logger.debug(f"Synced history for {len(synced)} of {len(entry_ids)} entries")
+    return synced
+
+
+def gameweek_history(db: Session, entry_id: int, events: Optional[List[int]] = None) -> List[models.EntryHistory]:
+    """The entry's stored gameweek rows (optionally only ``events``), oldest first."""
+    sync_entries(db, [entry_id], strict=True)
+    query = db.query(models.EntryHistory).filter(models.EntryHistory.entry_id == entry_id)
+    if events is not None:
+        query = query.filter(models.EntryHistory.event.in_(events))
+    return query.order_by(models.EntryHistory.event).all()
+
+
+def past_seasons(db: Session, entry_id: int) -> List[models.EntryPastSeason]:
+    sync_entries(db, [entry_id], strict=True)
+    return db.query(models.EntryPastSeason).filter(models.EntryPastSeason.entry_id == entry_id).all()
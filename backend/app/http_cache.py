@@ -0,0 +1,206 @@
+"""HTTP caching headers driven by the gameweek lifecycle.
+
+:class:`HttpCacheMiddleware` gives every successful ``GET /api/...`` response
+a ``Cache-Control`` policy and a strong ``ETag``, and answers a matching
+``If-None-Match`` with ``304 Not Modified``:
+
+* Data for a gameweek upstream has finished (fixtures, picks, matchups and
+  so on for past events) cannot change any more: it is ``immutable`` and
+  cached for ``FINISHED_EVENT_TTL``.
+* Data for the live gameweek gets a short ``max-age`` (``LIVE_EVENT_TTL``)
+  with ``stale-while-revalidate``.
+* League transfers come from the transfers ledger, which stays incomplete
+  while some entries fail to sync, so they always get the live policy.
+* Everything else upstream-derived gets ``HTTP_CACHE_MAX_AGE``; database
+  backed league records are revalidated on every use (``no-cache``) and
+  debug routes are never stored.
+
+Each ETag is remembered in the shared cache for as long as the response's
+``max-age``. The disk and redis backends block, so the lookups and writes
+run in the threadpool rather than on the event loop. While an ETag is
+remembered, a matching ``If-None-Match`` is answered without running the
+route at all. After that the route runs and the ETag of the new body is
+compared, so the client still gets a 304 when nothing changed.
+"""
+import hashlib
+import os
+import re
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+from .cache import get_cache
+from .snapshot import loaded_snapshot
+from .upstream import FINISHED_EVENT_TTL, LIVE_EVENT_TTL, get_cached, state_finished
+
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", "300"))
+
+
+class CachePolicy:
+    def __init__(self, header: str, etag_ttl: float):
+        self.header = header
+        # How long a computed ETag may answer If-None-Match without re-running the route
+        self.etag_ttl = etag_ttl
+
+
+NO_STORE = CachePolicy("no-store", 0)
+REVALIDATE = CachePolicy("no-cache", 0)
+
+
+def finished_policy() -> CachePolicy:
+    return CachePolicy(f"public, max-age={int(FINISHED_EVENT_TTL)}, immutable", FINISHED_EVENT_TTL)
+
+
+def live_policy() -> CachePolicy:
+    return CachePolicy(
+        f"public, max-age={int(LIVE_EVENT_TTL)}, stale-while-revalidate={HTTP_CACHE_STALE_WHILE_REVALIDATE}",
+        LIVE_EVENT_TTL,
+    )
+
+
+def default_policy() -> CachePolicy:
+    return CachePolicy(
+        f"public, max-age={HTTP_CACHE_MAX_AGE}, stale-while-revalidate={HTTP_CACHE_STALE_WHILE_REVALIDATE}",
+        HTTP_CACHE_MAX_AGE,
+    )
+
+
+def _event_finished(event: int) -> bool:
+    """``event_finished`` from data already in this worker's memory.
+
+    The policy is chosen on the event loop, so this never fetches: it reads
+    the parsed bootstrap if it is cached, else the mapped snapshot, and
+    treats the gameweek as live when neither is loaded.
+    """
+    bootstrap = get_cached("bootstrap-static/")
+    if bootstrap is not None:
+        return state_finished(next((gw for gw in bootstrap["events"] if gw["id"] == event), None))
+    snapshot = loaded_snapshot()
+    return snapshot is not None and state_finished(snapshot.event(event))
+
+
+def event_policy(event: Optional[int]) -> CachePolicy:
+    if event is not None and _event_finished(event):
+        return finished_policy()
+    return live_policy()
+
+
+# Gameweek-scoped routes: path pattern and where the event comes from
+# (a named path group, else the ``event`` query parameter)
+_EVENT_ROUTES: List[Tuple["re.Pattern[str]", Optional[str]]] = [
+    (re.compile(r"^/api/fixtures/(?P<event>\d+)$"), "event"),
+    (re.compile(r"^/api/entry/\d+/event/(?P<event>\d+)/picks$"), "event"),
+    (re.compile(r"^/api/weekly-matchups/\d+$"), None),
+    (re.compile(r"^/api/matchup/\d+$"), None),
+    (re.compile(r"^/api/leagues/\d+/ownership/(?P<event>\d+)$"), "event"),
+    (re.compile(r"^/api/leagues/\d+/live$"), None),
+]
+# Read from the transfers ledger, which misses entries whose sync failed
+# even for a finished gameweek, so never immutable
+_LEDGER_ROUTES = [re.compile(r"^/api/leagues/\d+/transfers$")]
+# Records stored in our own database, which can change at any time
+_DATABASE_ROUTES = [re.compile(r"^/api/leagues$"), re.compile(r"^/api/leagues/\d+$")]
+
+
+def policy_for(path: str, query_string: str) -> CachePolicy:
+    if not path.startswith("/api/"):
+        return NO_STORE
+    if any(pattern.match(path) for pattern in _DATABASE_ROUTES):
+        return REVALIDATE
+    if any(pattern.match(path) for pattern in _LEDGER_ROUTES):
+        return live_policy()
+    for pattern, group in _EVENT_ROUTES:
+        match = pattern.match(path)
+        if match:
+            if group:
+                return event_policy(int(match.group(group)))
+            event = parse_qs(query_string).get("event", [None])[0]
+            return event_policy(int(event) if event and event.isdigit() else None)
+    return default_policy()
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _etag_key(path: str, query_string: str) -> str:
+    return f"etag:{path}?{query_string}"
+
+
+class HttpCacheMiddleware:
+    """ASGI middleware adding Cache-Control/ETag and serving 304s (see module docstring)."""
+
+    def __init__(self, app, policy: Callable[[str, str], CachePolicy] = policy_for):
+        self.app = app
+        self.policy = policy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        try:
+            policy = self.policy(path, query_string)
+        except Exception:
+            # Never fail a request over a header
+            policy = REVALIDATE
+        if_none_match = next(
+            (value.decode("latin-1") for name, value in scope.get("headers", []) if name == b"if-none-match"),
+            None,
+        )
+
+        cache = get_cache()
+        if if_none_match and policy.etag_ttl:
+            known = await run_in_threadpool(cache.get, _etag_key(path, query_string))
+            if known is not None and _etag_matches(if_none_match, known[0].decode()):
+                await self._send_not_modified(send, known[0].decode(), policy)
+                return
+
+        start_message = None
+        chunks: List[bytes] = []
+
+        async def buffering_send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                if message["status"] != 200:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or start_message is None or start_message["status"] != 200:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+
+            body = b"".join(chunks)
+            etag = make_etag(body)
+            if policy.etag_ttl:
+                await run_in_threadpool(cache.set, _etag_key(path, query_string), etag.encode(), policy.etag_ttl)
+            if if_none_match and _etag_matches(if_none_match, etag):
+                await self._send_not_modified(send, etag, policy)
+                return
+            headers = [(name, value) for name, value in start_message.get("headers", []) if name not in (b"etag", b"cache-control")]
+            headers += [(b"etag", etag.encode()), (b"cache-control", policy.header.encode())]
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, buffering_send)
+
+    @staticmethod
+    async def _send_not_modified(send, etag: str, policy: CachePolicy):
+        await send({
+            "type": "http.response.start",
+            "status": 304,
+            "headers": [(b"etag", etag.encode()), (b"cache-control", policy.header.encode())],
+        })
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
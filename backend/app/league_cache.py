@@ -0,0 +1,81 @@
+"""Read-through cache of ``League`` rows.
+
+League metadata is read on most page loads but only changes through the
+league routes, so reads go to the shared cache (see :mod:`app.cache`)
+instead of the database:
+
+* ``league:{id}`` holds one row (or ``null`` for a league that does not
+  exist); ``leagues:all`` holds every row.
+* A miss loads from the database and fills the key.
+* Writes go through :func:`store` and :func:`forget` after committing. They
+  replace the row's key and drop the list, so the next read of either sees
+  the change.
+
+``LEAGUE_CACHE_TTL`` bounds how stale a worker can be when the cache is not
+shared between workers (``CACHE_BACKEND=memory``) or the database is
+changed by something other than these routes.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import get_cache
+
+LEAGUE_CACHE_TTL = float(os.getenv("LEAGUE_CACHE_TTL", "300"))
+
+LEAGUE_FIELDS = ("id", "name", "created_at", "updated_at", "total_teams", "average_score", "highest_score")
+ALL_LEAGUES_KEY = "leagues:all"
+
+
+def _key(league_id: int) -> str:
+    return f"league:{league_id}"
+
+
+def league_row(league: models.League) -> Dict[str, Any]:
+    """The league's columns as JSON-ready values (datetimes as ISO 8601 strings)."""
+    row = {}
+    for field in LEAGUE_FIELDS:
+        value = getattr(league, field)
+        row[field] = value.isoformat() if hasattr(value, "isoformat") else value
+    return row
+
+
+def get_league(db: Session, league_id: int) -> Optional[Dict[str, Any]]:
+    """The league's row, or None if it does not exist."""
+    cache = get_cache()
+    entry = cache.get(_key(league_id))
+    if entry is not None:
+        return json.loads(entry[0])
+    league = db.query(models.League).filter(models.League.id == league_id).first()
+    row = league_row(league) if league is not None else None
+    cache.set(_key(league_id), json.dumps(row).encode(), LEAGUE_CACHE_TTL)
+    return row
+
+
+def get_leagues(db: Session) -> List[Dict[str, Any]]:
+    cache = get_cache()
+    entry = cache.get(ALL_LEAGUES_KEY)
+    if entry is not None:
+        return json.loads(entry[0])
+    rows = [league_row(league) for league in db.query(models.League).all()]
+    cache.set(ALL_LEAGUES_KEY, json.dumps(rows).encode(), LEAGUE_CACHE_TTL)
+    return rows
+
+
+def store(league: models.League) -> Dict[str, Any]:
+    """Write a committed (created or updated) league through to the cache."""
+    row = league_row(league)
+    cache = get_cache()
+    cache.set(_key(row["id"]), json.dumps(row).encode(), LEAGUE_CACHE_TTL)
+    cache.delete(ALL_LEAGUES_KEY)
+    return row
+
+
+def forget(league_id: int):
+    """Record a committed deletion."""
+    cache = get_cache()
+    cache.set(_key(league_id), json.dumps(None).encode(), LEAGUE_CACHE_TTL)
+    cache.delete(ALL_LEAGUES_KEY)
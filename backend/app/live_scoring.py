@@ -0,0 +1,497 @@
+"""Live H2H scores and projected standings for a whole league.
+
+FPL only updates ``entry_N_points`` on H2H matches (and the H2H table) some
+time after the points are in, so during a gameweek those numbers lag. This
+module recomputes every entry's score from its picks and the single shared
+``event/{id}/live/`` payload, applying the vice-captain rule, automatic
+substitutions and provisional bonus the way upstream eventually will.
+
+The league's picks are packed into ``(entries, 15)`` arrays of element ids and
+base multipliers, and the live payload into vectors indexed by element id, so
+scoring the whole league is one gather and one row-sum however many entries
+it has; only the live vectors change between updates.
+"""
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import requests
+
+from .cache import get_cache
+from .match_index import fetch_event_matches
+from .snapshot import Snapshot, get_snapshot
+from .upstream import UpstreamPool, event_finished, event_ttl, get_entry_picks, get_event_fixtures, get_event_live, league_standings
+
+logger = logging.getLogger(__name__)
+
+SQUAD_SIZE = 15
+STARTERS = 11
+
+# Upstream fetches of a league's picks run concurrently on a cold cache
+PICKS_FETCH_WORKERS = 8
+
+
+class LeaguePicks:
+    """Every entry's picks for one gameweek, packed for batched scoring.
+
+    Rows follow ``entry_ids``; columns are squad positions 1-15, so columns
+    0-10 are the starting XI and 11-14 the bench in substitution order.
+    """
+
+    def __init__(self, event: int, picks_by_entry: Dict[int, Dict[str, Any]], failed: Optional[List[int]] = None):
+        self.event = event
+        # Entries whose picks could not be fetched, so are missing from the rows
+        self.failed = sorted(failed or [])
+        self.entry_ids = np.array(sorted(picks_by_entry), dtype=np.int64)
+        count = len(self.entry_ids)
+        self.elements = np.zeros((count, SQUAD_SIZE), dtype=np.int32)
+        self.multipliers = np.zeros((count, SQUAD_SIZE), dtype=np.int8)
+        self.captain = np.zeros(count, dtype=np.int8)
+        self.vice_captain = np.zeros(count, dtype=np.int8)
+        self.hits = np.zeros(count, dtype=np.int32)
+        self.chips: List[Optional[str]] = []
+
+        for row, entry_id in enumerate(self.entry_ids.tolist()):
+            data = picks_by_entry[entry_id]
+            chip = data.get('active_chip')
+            self.chips.append(chip)
+            self.hits[row] = (data.get('entry_history') or {}).get('event_transfers_cost', 0)
+            captain_multiplier = 3 if chip == '3xc' else 2
+            for pick in sorted(data.get('picks', []), key=lambda p: p['position'])[:SQUAD_SIZE]:
+                column = pick['position'] - 1
+                self.elements[row, column] = pick['element']
+                # Rebuilt from the chip and armband rather than read from
+                # ``multiplier``, which upstream rewrites once it has applied
+                # its own substitutions
+                if pick['is_captain']:
+                    self.captain[row] = column
+                    self.multipliers[row, column] = captain_multiplier
+                elif column < STARTERS or chip == 'bboost':
+                    self.multipliers[row, column] = 1
+                if pick['is_vice_captain']:
+                    self.vice_captain[row] = column
+
+        self._rows = {entry_id: row for row, entry_id in enumerate(self.entry_ids.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.entry_ids)
+
+    def row(self, entry_id: int) -> Optional[int]:
+        return self._rows.get(entry_id)
+
+
+class LiveVectors:
+    """The live payload as arrays indexed by element id.
+
+    ``points`` includes provisional bonus: for fixtures whose bonus upstream
+    has not confirmed yet, 3/2/1 is awarded from the fixture's BPS ranking.
+    """
+
+    def __init__(self, live_data: Dict[str, Any], snapshot: Snapshot, event: int, fixtures: Optional[List[Dict[str, Any]]] = None):
+        elements = live_data.get('elements', [])
+        size = max([element['id'] for element in elements] + [player['id'] for player in snapshot.players()] + [0]) + 1
+        self.points = np.zeros(size, dtype=np.int32)
+        self.minutes = np.zeros(size, dtype=np.int32)
+        self.element_types = np.zeros(size, dtype=np.int8)
+        for element in elements:
+            stats = element.get('stats', {})
+            self.points[element['id']] = stats.get('total_points', 0)
+            self.minutes[element['id']] = stats.get('minutes', 0)
+
+        # An element is done once every fixture its club has in the gameweek is
+        # over (a blank gameweek counts as done); only then can a player with no
+        # minutes be treated as not playing
+        pending_teams = {
+            team_id
+            for fixture in snapshot.fixtures(event)
+            if not (fixture['finished'] or fixture['finished_provisional'])
+            for team_id in (fixture['team_h'], fixture['team_a'])
+        }
+        self.done = np.ones(size, dtype=bool)
+        for player in snapshot.players():
+            self.element_types[player['id']] = player['element_type']
+            if player['team'] in pending_teams:
+                self.done[player['id']] = False
+
+        self.provisional_bonus = provisional_bonus(elements, fixtures or [], size)
+        self.points += self.provisional_bonus
+
+
+def _fixture_stats(element: Dict[str, Any]) -> List[Tuple[int, Dict[str, int]]]:
+    """(fixture id, {identifier: value}) for each fixture in an element's ``explain``.
+
+    Single-fixture gameweeks fall back to the element's totals for anything
+    the breakdown leaves out (it lists only point-scoring stats).
+    """
+    explain = element.get('explain') or []
+    totals = element.get('stats', {})
+    rows = []
+    for item in explain:
+        values = {stat['identifier']: stat.get('value', 0) for stat in item.get('stats', [])}
+        if len(explain) == 1:
+            for identifier in ('minutes', 'bps', 'bonus'):
+                values.setdefault(identifier, totals.get(identifier, 0))
+        rows.append((item['fixture'], values))
+    return rows
+
+
+def fixture_bps(elements: List[Dict[str, Any]], fixtures: List[Dict[str, Any]]) -> Tuple[List[Tuple[int, int, int]], Set[int]]:
+    """(element id, fixture id, BPS) for everyone who played in each fixture, and the fixtures whose bonus is confirmed.
+
+    BPS is read from each fixture's ``stats``, which upstream keeps per
+    fixture, so a player with two fixtures in a double gameweek is ranked in
+    both. Fixtures without BPS in their stats yet fall back to the elements'
+    ``explain`` breakdowns (see :func:`_fixture_stats`).
+    """
+    rows: List[Tuple[int, int, int]] = []
+    confirmed: Set[int] = set()
+    covered: Set[int] = set()
+    for fixture in fixtures:
+        stats = {stat['identifier']: stat.get('h', []) + stat.get('a', []) for stat in fixture.get('stats') or []}
+        if stats.get('bonus'):
+            confirmed.add(fixture['id'])
+        if stats.get('bps'):
+            covered.add(fixture['id'])
+            rows.extend((item['element'], fixture['id'], item['value']) for item in stats['bps'])
+
+    for element in elements:
+        for fixture_id, values in _fixture_stats(element):
+            if fixture_id in covered:
+                continue
+            if values.get('bonus'):
+                confirmed.add(fixture_id)
+            if values.get('minutes'):
+                rows.append((element['id'], fixture_id, values.get('bps', 0)))
+    return rows, confirmed
+
+
+def provisional_bonus(elements: List[Dict[str, Any]], fixtures: List[Dict[str, Any]], size: int) -> np.ndarray:
+    """Bonus points, by element id, for fixtures whose bonus is not confirmed yet.
+
+    Bonus goes to the top three BPS scores of each fixture among players who
+    played in it. Ties share a rank and skip the next (3, 3, 1 or 3, 2, 2),
+    as upstream awards it.
+    """
+    rows, confirmed = fixture_bps(elements, fixtures)
+    bonus = np.zeros(size, dtype=np.int32)
+    rows = [row for row in rows if 0 <= row[0] < size]
+    if not rows:
+        return bonus
+    columns = np.array(rows, dtype=np.int64)
+    element_ids, fixture_ids, bps = columns[:, 0], columns[:, 1], columns[:, 2]
+
+    order = np.lexsort((-bps, fixture_ids))
+    element_ids, fixture_ids, bps = element_ids[order], fixture_ids[order], bps[order]
+    index = np.arange(len(order))
+    new_fixture = np.r_[True, fixture_ids[1:] != fixture_ids[:-1]]
+    new_score = new_fixture | np.r_[True, bps[1:] != bps[:-1]]
+    # Competition ranking within each fixture: position of the first player on the same score
+    fixture_start = np.maximum.accumulate(np.where(new_fixture, index, 0))
+    rank = np.maximum.accumulate(np.where(new_score, index, 0)) - fixture_start + 1
+
+    awarded = np.select([rank == 1, rank == 2, rank == 3], [3, 2, 1], 0)
+    # Nothing is awarded before anyone in the fixture has a positive BPS (e.g. at kick-off)
+    awarded[bps[fixture_start] <= 0] = 0
+    awarded[np.isin(fixture_ids, list(confirmed))] = 0
+    np.add.at(bonus, element_ids, awarded)
+    return bonus
+
+
+def _deadline_passed(event: int) -> bool:
+    """Whether picks for ``event`` can exist yet; unknown gameweeks are assumed past."""
+    state = get_snapshot().event(event)
+    if not state or not state['deadline_time']:
+        return True
+    deadline = datetime.fromisoformat(state['deadline_time'].replace('Z', '+00:00'))
+    return deadline <= datetime.now(timezone.utc)
+
+
+def fetch_league_picks(entry_ids: List[int], event: int) -> LeaguePicks:
+    """Every entry's picks for ``event``.
+
+    Entries upstream has no picks for (a 404, e.g. entries that joined after
+    the gameweek) are left out and remembered for the event's cache lifetime;
+    before the deadline nobody has picks, so nothing is fetched. Entries
+    whose fetch failed otherwise are listed in ``failed``.
+    """
+    if not _deadline_passed(event):
+        return LeaguePicks(event, {})
+    cache = get_cache()
+
+    def fetch(entry_id: int) -> Tuple[int, Optional[Dict[str, Any]]]:
+        missing_key = f"no-picks:{entry_id}:{event}"
+        if cache.get(missing_key) is not None:
+            return entry_id, {}
+        try:
+            return entry_id, get_entry_picks(entry_id, event)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                cache.set(missing_key, b"1", event_ttl(event))
+                return entry_id, {}
+            logger.warning(f"Could not fetch picks for entry {entry_id} event {event}: {e}")
+            return entry_id, None
+        except Exception as e:
+            logger.warning(f"Could not fetch picks for entry {entry_id} event {event}: {e}")
+            return entry_id, None
+
+    with UpstreamPool(max_workers=PICKS_FETCH_WORKERS) as pool:
+        fetched = dict(pool.map(fetch, entry_ids))
+    return LeaguePicks(
+        event,
+        {entry_id: data for entry_id, data in fetched.items() if data},
+        failed=[entry_id for entry_id, data in fetched.items() if data is None],
+    )
+
+
+class LeagueScores:
+    """The outcome of scoring a :class:`LeaguePicks` against :class:`LiveVectors`."""
+
+    def __init__(self, multipliers: np.ndarray, starting: np.ndarray, scores: np.ndarray):
+        # Per pick: multiplier after armband changes and substitutions, and
+        # whether the pick ends up in the XI
+        self.multipliers = multipliers
+        self.starting = starting
+        # Per entry: live score net of transfer hits
+        self.scores = scores
+
+
+# Fewest players of each element type (index) a starting XI may field: 1 GKP, 3 DEF, 2 MID, 1 FWD
+MIN_IN_FORMATION = np.array([0, 1, 3, 2, 1], dtype=np.int8)
+
+
+def automatic_subs(picks: LeaguePicks, live: LiveVectors, played: np.ndarray, absent: np.ndarray) -> np.ndarray:
+    """Which picks are in the XI once starters who did not play are substituted.
+
+    Follows upstream's rules, for every entry at once: starters are replaced
+    in squad order by the first bench player (in bench order) who played and
+    keeps the formation valid; keepers only replace keepers; no substitutions
+    under bench boost. A bench player whose fixtures are still to come holds
+    the substitution up rather than being skipped, since he may yet play.
+    """
+    count = len(picks)
+    rows = np.arange(count)
+    types = live.element_types[picks.elements]
+    starting = np.zeros((count, SQUAD_SIZE), dtype=bool)
+    starting[:, :STARTERS] = True
+    formation = np.stack([(types[:, :STARTERS] == element_type).sum(axis=1) for element_type in range(5)], axis=1)
+    bench_used = np.zeros((count, SQUAD_SIZE), dtype=bool)
+    eligible = np.array([chip != 'bboost' for chip in picks.chips], dtype=bool)
+
+    for column in range(STARTERS):
+        waiting = eligible & absent[:, column]
+        if not waiting.any():
+            continue
+        out_type = types[:, column]
+        for slot in range(STARTERS, SQUAD_SIZE):
+            in_type = types[:, slot]
+            allowed = (
+                waiting & ~bench_used[:, slot]
+                & ((out_type == 1) == (in_type == 1))
+                & ((in_type == out_type) | (formation[rows, out_type] > MIN_IN_FORMATION[out_type]))
+            )
+            waiting &= ~(allowed & ~played[:, slot] & ~absent[:, slot])
+            sub = allowed & played[:, slot]
+            if sub.any():
+                starting[sub, column] = False
+                starting[sub, slot] = True
+                bench_used[sub, slot] = True
+                np.subtract.at(formation, (rows[sub], out_type[sub]), 1)
+                np.add.at(formation, (rows[sub], in_type[sub]), 1)
+                waiting &= ~sub
+    return starting
+
+
+def score_league(picks: LeaguePicks, live: LiveVectors) -> LeagueScores:
+    """Live scores with the vice-captain rule, automatic substitutions and provisional bonus applied."""
+    count = len(picks)
+    if not count:
+        empty = np.zeros((0, SQUAD_SIZE), dtype=np.int8)
+        return LeagueScores(empty, empty.astype(bool), np.zeros(0, dtype=np.int32))
+
+    rows = np.arange(count)
+    played = live.minutes[picks.elements] > 0
+    absent = ~played & live.done[picks.elements]
+
+    # The armband passes to the vice-captain once the captain's fixtures are over without him playing
+    multipliers = picks.multipliers.copy()
+    promote = rows[absent[rows, picks.captain] & (picks.vice_captain != picks.captain)]
+    multipliers[promote, picks.vice_captain[promote]] = multipliers[promote, picks.captain[promote]]
+    multipliers[promote, picks.captain[promote]] = 0
+
+    starting = automatic_subs(picks, live, played, absent)
+    multipliers[:, :STARTERS][~starting[:, :STARTERS]] = 0
+    multipliers[:, STARTERS:][starting[:, STARTERS:]] = 1
+
+    points = live.points[picks.elements]
+    scores = (points * multipliers).sum(axis=1, dtype=np.int32) - picks.hits
+    return LeagueScores(multipliers, starting, scores)
+
+
+def score_entries(picks: LeaguePicks, live: LiveVectors) -> np.ndarray:
+    """Live gameweek score for every row of ``picks``, net of transfer hits."""
+    return score_league(picks, live).scores
+
+
+def _result(points: int, other: int) -> Tuple[int, int, int]:
+    return int(points > other), int(points == other), int(points < other)
+
+
+def live_matches(matches: List[Dict[str, Any]], scores: Dict[int, int]) -> List[Dict[str, Any]]:
+    """Copies of the upstream match objects with live points and results."""
+    results = []
+    for match in matches:
+        live_match = dict(match)
+        entry_1, entry_2 = match['entry_1_entry'], match['entry_2_entry']
+        # Entries without picks (and the AVERAGE opponent in odd-sized leagues) keep upstream's points
+        points_1 = scores.get(entry_1, match.get('entry_1_points', 0))
+        points_2 = scores.get(entry_2, match.get('entry_2_points', 0))
+        live_match['entry_1_points'], live_match['entry_2_points'] = points_1, points_2
+        (live_match['entry_1_win'], live_match['entry_1_draw'], live_match['entry_1_loss']) = _result(points_1, points_2)
+        (live_match['entry_2_win'], live_match['entry_2_draw'], live_match['entry_2_loss']) = _result(points_2, points_1)
+        live_match['winner'] = entry_1 if points_1 > points_2 else entry_2 if points_2 > points_1 else None
+        results.append(live_match)
+    return results
+
+
+def projected_standings(standings: List[Dict[str, Any]], matches: List[Dict[str, Any]], include_event: bool) -> List[Dict[str, Any]]:
+    """The H2H table with the gameweek's live results added, re-ranked.
+
+    Upstream folds a gameweek into the table once it is finished, so the live
+    results are only added (``include_event``) while it is not.
+    """
+    table = [dict(row) for row in standings]
+    by_entry = {row['entry']: row for row in table}
+    for row in table:
+        row['live_points'] = None
+
+    for match in matches:
+        for side in ('1', '2'):
+            standing = by_entry.get(match[f'entry_{side}_entry'])
+            if standing is None:
+                continue
+            standing['live_points'] = match[f'entry_{side}_points']
+            if not include_event:
+                continue
+            won, drawn, lost = match[f'entry_{side}_win'], match[f'entry_{side}_draw'], match[f'entry_{side}_loss']
+            standing['matches_played'] = standing.get('matches_played', 0) + 1
+            standing['matches_won'] = standing.get('matches_won', 0) + won
+            standing['matches_drawn'] = standing.get('matches_drawn', 0) + drawn
+            standing['matches_lost'] = standing.get('matches_lost', 0) + lost
+            standing['points_for'] = standing.get('points_for', 0) + match[f'entry_{side}_points']
+            standing['total'] = standing.get('total', 0) + 3 * won + drawn
+
+    table.sort(key=lambda row: (-row.get('total', 0), -row.get('points_for', 0)))
+    for rank, row in enumerate(table, start=1):
+        row['last_rank'] = row.get('rank')
+        row['rank'] = rank
+        row['rank_sort'] = rank
+    return table
+
+
+class EventScores:
+    """A set of entries scored live for one gameweek."""
+
+    def __init__(self, picks: LeaguePicks, live: LiveVectors, scored: LeagueScores):
+        self.picks = picks
+        self.live = live
+        self.scored = scored
+
+    def score(self, entry_id: int) -> Optional[int]:
+        row = self.picks.row(entry_id)
+        return None if row is None else int(self.scored.scores[row])
+
+    def scores(self) -> Dict[int, int]:
+        return dict(zip(self.picks.entry_ids.tolist(), self.scored.scores.tolist()))
+
+    def pick_details(self, entry_id: int) -> Dict[int, Dict[str, Any]]:
+        """Element id -> live points, provisional bonus, multiplier and XI membership for one entry."""
+        row = self.picks.row(entry_id)
+        if row is None:
+            return {}
+        details = {}
+        for column, element_id in enumerate(self.picks.elements[row].tolist()):
+            details[element_id] = {
+                "points": int(self.live.points[element_id]),
+                "provisional_bonus": int(self.live.provisional_bonus[element_id]),
+                "multiplier": int(self.scored.multipliers[row, column]),
+                "starting": bool(self.scored.starting[row, column]),
+                "subbed_in": column >= STARTERS and bool(self.scored.starting[row, column]),
+                "subbed_out": column < STARTERS and not self.scored.starting[row, column],
+            }
+        return details
+
+
+def score_event(entry_ids: List[int], event: int) -> EventScores:
+    """Fetch the picks of ``entry_ids`` and score them against the live gameweek."""
+    picks = fetch_league_picks(entry_ids, event)
+    live = _live_vectors(event)
+    return EventScores(picks, live, score_league(picks, live))
+
+
+def _match_entries(matches: List[Dict[str, Any]]) -> List[int]:
+    return sorted({
+        entry_id
+        for match in matches
+        for entry_id in (match['entry_1_entry'], match['entry_2_entry'])
+        if entry_id
+    })
+
+
+def league_event_matches(league_id: int, event: int) -> List[Dict[str, Any]]:
+    """A league's matches for a gameweek, with live points from its deadline until upstream has finished it."""
+    matches = fetch_event_matches(league_id, event)
+    if event_finished(event) or not _deadline_passed(event):
+        return matches
+    return live_matches(matches, score_event(_match_entries(matches), event).scores())
+
+
+def league_live(league_id: int, event: int) -> Dict[str, Any]:
+    """Live H2H results and projected standings for ``league_id`` in gameweek ``event``.
+
+    Before the deadline nobody has points, so the upstream matches and table
+    are returned as they are rather than projected as a round of draws.
+    """
+    matches = fetch_event_matches(league_id, event)
+    standings = league_standings(league_id)
+    finished = event_finished(event)
+    started = _deadline_passed(event)
+    if not started:
+        return {
+            "event": event,
+            "started": False,
+            "finished": finished,
+            "matches": matches,
+            "standings": [dict(row, live_points=None) for row in standings],
+        }
+
+    matches = live_matches(matches, score_event(_match_entries(matches), event).scores())
+    return {
+        "event": event,
+        "started": True,
+        "finished": finished,
+        "matches": matches,
+        "standings": projected_standings(standings, matches, include_event=not finished),
+    }
+
+
+# event -> (live payload, fixtures payload, snapshot, vectors); the payload objects
+# are only replaced when the upstream cache refreshes them, so vectors are rebuilt
+# once per update
+_vectors: Dict[int, Tuple[Any, Any, Snapshot, LiveVectors]] = {}
+_vectors_lock = threading.Lock()
+
+
+def _live_vectors(event: int) -> LiveVectors:
+    live_data = get_event_live(event)
+    fixtures = get_event_fixtures(event)
+    snapshot = get_snapshot()
+    with _vectors_lock:
+        cached = _vectors.get(event)
+        if cached is not None and cached[0] is live_data and cached[1] is fixtures and cached[2] is snapshot:
+            return cached[3]
+    vectors = LiveVectors(live_data, snapshot, event, fixtures)
+    with _vectors_lock:
+        _vectors[event] = (live_data, fixtures, snapshot, vectors)
+    return vectors
@@ -0,0 +1,250 @@
+"""Structured, non-blocking logging.
+
+:func:`configure_logging` routes every record through a bounded in-memory
+queue; a background listener thread formats and writes them to stdout, so a
+request thread only pays for building the message. When the queue is full
+records are dropped (and counted) rather than blocking the request.
+
+* ``LOG_LEVEL``: root level (default ``INFO``).
+* ``LOG_FORMAT``: ``json`` (default, one object per line) or ``text``.
+* ``LOG_DEBUG_SAMPLE_RATE``: fraction of requests whose DEBUG records are kept
+  when ``LOG_LEVEL=DEBUG`` (default 1.0). The decision is made once per
+  request, so a sampled request keeps all of its debug lines.
+* ``LOG_QUEUE_SIZE``: records buffered before dropping (default 10000).
+
+:class:`RequestContextMiddleware` gives each request a correlation id (the
+incoming ``X-Request-ID`` header, or a new one), attaches it to every record
+logged while serving the request and returns it in the response headers.
+
+Use :func:`summarize` rather than dumping payloads into log lines.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+REQUEST_ID_HEADER = "x-request-id"
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_debug_sampled = contextvars.ContextVar("debug_sampled", default=None)
+
+access_logger = logging.getLogger("app.access")
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the request id and applies debug sampling."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        if record.levelno >= logging.INFO or LOG_DEBUG_SAMPLE_RATE >= 1.0:
+            return True
+        sampled = _debug_sampled.get()
+        if sampled is None:
+            # Outside a request: sample record by record
+            return random.random() < LOG_DEBUG_SAMPLE_RATE
+        return sampled
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that never blocks: full queue means the record is dropped."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve what cannot wait for the listener thread: the message
+        # (its args may be mutated later) and any traceback (it pins frames)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        message = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def _start_listener():
+    global _listener
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=False)
+    _listener.start()
+
+
+def _restart_listener_after_fork():
+    # The listener thread does not survive fork (gunicorn preloads the app in
+    # the master), and the old queue's lock may have been held mid-fork
+    if _handler is not None:
+        _start_listener()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging():
+    """Install the queue-backed root handler; safe to call more than once."""
+    global _handler
+    with _configure_lock:
+        if _handler is not None:
+            return
+        _handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _handler.addFilter(ContextFilter())
+        _start_listener()
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_handler)
+        root.setLevel(LOG_LEVEL)
+        # Chatty third-party debug output stays out even at DEBUG
+        for name in ("urllib3", "httpcore", "httpx", "hpack", "multipart"):
+            logging.getLogger(name).setLevel(max(logging.getLevelName(LOG_LEVEL), logging.INFO))
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_restart_listener_after_fork)
+        atexit.register(_stop_listener)
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+def summarize(value: Any, max_items: int = 5, max_chars: int = 120, depth: int = 2) -> Any:
+    """A bounded, JSON-friendly outline of ``value`` for log lines.
+
+    Containers are cut to ``max_items`` entries (with their full size noted)
+    and ``depth`` levels; strings to ``max_chars`` characters.
+    """
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else value[:max_chars] + f"...(+{len(value) - max_chars} chars)"
+    if isinstance(value, dict):
+        if depth <= 0:
+            return f"<dict of {len(value)}>"
+        items = list(value.items())
+        outline = {str(key): summarize(item, max_items, max_chars, depth - 1) for key, item in items[:max_items]}
+        if len(items) > max_items:
+            outline["..."] = f"+{len(items) - max_items} keys"
+        return outline
+    if isinstance(value, (list, tuple, set)):
+        if depth <= 0:
+            return f"<{type(value).__name__} of {len(value)}>"
+        items = list(value)
+        outline_items = [summarize(item, max_items, max_chars, depth - 1) for item in items[:max_items]]
+        if len(items) > max_items:
+            outline_items.append(f"+{len(items) - max_items} items")
+        return outline_items
+    return summarize(repr(value), max_items, max_chars, depth)
+
+
+class RequestContextMiddleware:
+    """ASGI middleware assigning each request a correlation id and logging one access line."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+        id_token = _request_id.set(request_id)
+        sample_token = _debug_sampled.set(random.random() < LOG_DEBUG_SAMPLE_RATE)
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.encode(), request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            access_logger.info(
+                f"{scope.get('method')} {scope.get('path')} {status}",
+                extra={"fields": {
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                }},
+            )
+            _debug_sampled.reset(sample_token)
+            _request_id.reset(id_token)
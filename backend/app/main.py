@@ -1,38 +1,44 @@
 import os
 from dotenv import load_dotenv
-import sys
 import requests
 import logging
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from . import models, schemas
+from . import league_cache, models, schemas
+from .admission import AdmissionMiddleware, admission_stats
+from .batch import BATCH_MAX_ITEMS, BatchRequest, run_batch
+from .profiling import ProfiledRoute, ProfilingMiddleware, get_profile, list_profiles, token_matches
 from datetime import datetime
 from .database import engine, get_db, get_supabase
-import json
+from .entry_history import gameweek_history, past_seasons
+from .http_cache import HttpCacheMiddleware
+from .logging_config import RequestContextMiddleware, configure_logging, dropped_records, summarize
+from .live_scoring import league_event_matches, league_live, score_event
+from .match_index import resolve_match
+from .ownership import league_ownership
+from .planner import DEFAULT_HORIZON, entry_planner
+from .player_search import POSITIONS, search_players
+from .snapshot import get_snapshot, start_background_refresh
+from .trends import ownership_trend, player_trend, price_changes, start_trend_recorder, time_range
+from .transfers import entry_transfers, league_transfer_summary, league_transfers
+from .upstream import event_finished, get_bootstrap, get_bootstrap_body, get_entry, get_entry_picks, get_event_fixtures, get_event_live, get_json, upstream_stats
 from sqlalchemy import text
 from typing import Optional
 
 
 
-# Configure logging first thing
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging first thing (LOG_LEVEL, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Log startup information
 logger.debug(f"Current working directory: {os.getcwd()}")
-logger.debug(f"Python path: {sys.path}")
-logger.debug(f"Environment variables: {dict(os.environ)}")
-logger.debug(f"Directory contents: {os.listdir()}")
 
 
 # Load environment variables
 load_dotenv()
 
-# Get league ID from environment variable with a default value
+# Default league, used when a request does not name one
 LEAGUE_ID = int(os.getenv("LEAGUE_ID", "738279"))
 
 try:
@@ -43,10 +49,17 @@ except Exception as e:
     raise
 
 app = FastAPI()
+app.router.route_class = ProfiledRoute
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
 
+# Bounded concurrency and 503 load shedding for routes that call upstream (innermost)
+app.add_middleware(AdmissionMiddleware)
+
+# Cache-Control/ETag headers and 304s (inside CORS, so 304s still get CORS headers)
+app.add_middleware(HttpCacheMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -60,6 +73,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-request profiling, enabled by setting PROFILE_TOKEN
+app.add_middleware(ProfilingMiddleware)
+
+# Correlation id and access line for every request (outermost)
+app.add_middleware(RequestContextMiddleware)
+
+@app.on_event("startup")
+def load_reference_snapshot():
+    # Map the on-disk reference snapshot so lookups work before bootstrap is fetched
+    start_background_refresh()
+    # Price and ownership history for the trend endpoints
+    start_trend_recorder()
+
 @app.get("/debug-info")
 async def debug_info():
     """Endpoint to verify API is working and check environment"""
@@ -73,7 +99,7 @@ async def debug_info():
     }
 
 @app.get("/debug/supabase-test")
-async def test_supabase_connection():
+def test_supabase_connection():
     """Test Supabase connection"""
     try:
         supabase = get_supabase()
@@ -92,23 +118,42 @@ async def test_supabase_connection():
         }
 
 @app.get("/debug/check_league/{league_id}")
-async def check_league(league_id: int, db: Session = Depends(get_db)):
-    league = db.query(models.League).filter(models.League.id == league_id).first()
+def check_league(league_id: int, db: Session = Depends(get_db)):
+    league = league_cache.get_league(db, league_id)
     if league is None:
         return {"exists": False, "message": "League not found"}
+    return {"exists": True, "league": league}
+
+def require_profile_token(
+    header_token: Optional[str] = Header(None, alias="X-Profile-Token"),
+    query_token: Optional[str] = Query(None, alias="__profile"),
+):
+    if not token_matches(header_token or query_token):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+
+@app.get("/debug/metrics", dependencies=[Depends(require_profile_token)])
+async def debug_metrics():
+    """Admission queues, upstream slots and dropped log records for this worker (needs PROFILE_TOKEN, like the profiles)"""
     return {
-        "exists": True,
-        "league": {
-            "id": league.id,
-            "name": league.name,
-            "created_at": league.created_at,
-            "updated_at": league.updated_at,
-            "total_teams": league.total_teams,
-            "average_score": league.average_score,
-            "highest_score": league.highest_score
-        }
+        "pid": os.getpid(),
+        "admission": admission_stats(),
+        "upstream": upstream_stats(),
+        "dropped_log_records": dropped_records(),
     }
 
+@app.get("/debug/profiles", dependencies=[Depends(require_profile_token)])
+async def debug_list_profiles():
+    """List stored request profiles (newest first)"""
+    return list_profiles()
+
+@app.get("/debug/profiles/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def debug_get_profile(profile_id: int):
+    """Return a stored request profile report"""
+    report = get_profile(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
 from sqlalchemy import text
 from fastapi import FastAPI, Depends, HTTPException
 from sqlalchemy.orm import Session
@@ -149,45 +194,33 @@ def get_position(element_type):
     return positions.get(element_type, 'Unknown')
 
 def fetch_fpl_standings(league_id: int):
-    url = f"https://fantasy.premierleague.com/api/leagues-h2h/{league_id}/standings/"
-    response = None
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = get_json(f"leagues-h2h/{league_id}/standings/")
         return data['standings']['results']
     except requests.RequestException as e:
         logger.error(f"Error fetching FPL data: {e}")
-        if response is not None:
-            logger.error(f"Response status code: {response.status_code}")
-            logger.error(f"Response content: {response.text}")
+        if e.response is not None:
+            logger.error(f"Response status code: {e.response.status_code}")
+            logger.error(f"Response content: {e.response.text}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch FPL data: {str(e)}")
     except KeyError as e:
         logger.error(f"Unexpected data structure: {e}")
-        if response is not None:
-            logger.error(f"Response content: {response.text}")
         raise HTTPException(status_code=500, detail="Unexpected data structure from FPL API")
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
 def fetch_fpl_matches(league_id: int):
-    url = f"https://fantasy.premierleague.com/api/leagues-h2h/{league_id}/matches/"
-    response = None
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()['results']
+        return get_json(f"leagues-h2h/{league_id}/matches/")['results']
     except requests.RequestException as e:
         logger.error(f"Error fetching FPL matches: {e}")
-        if response is not None:
-            logger.error(f"Response status code: {response.status_code}")
-            logger.error(f"Response content: {response.text}")
+        if e.response is not None:
+            logger.error(f"Response status code: {e.response.status_code}")
+            logger.error(f"Response content: {e.response.text}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch FPL matches: {str(e)}")
     except KeyError as e:
         logger.error(f"Unexpected data structure in matches: {e}")
-        if response is not None:
-            logger.error(f"Response content: {response.text}")
         raise HTTPException(status_code=500, detail="Unexpected data structure from FPL API")
     except Exception as e:
         logger.error(f"Unexpected error in fetch_fpl_matches: {str(e)}")
@@ -211,36 +244,65 @@ def calculate_form(matches, team_id):
 async def root():
     return {"message": "Welcome to FPL League Hub API"}
 
+@app.post("/api/batch")
+async def batch(batch_request: BatchRequest, request: Request):
+    """Run several GET requests for /api/ routes concurrently and return all results"""
+    if len(batch_request.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch can hold at most {BATCH_MAX_ITEMS} requests")
+    return {"results": await run_batch(request.app, request.scope, batch_request.requests)}
+
 @app.get("/api/bootstrap-static")
-async def get_bootstrap_static():
+def get_bootstrap_static():
     try:
-        url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        # Already encoded: serialising the whole payload on every request dominated this route
+        return Response(content=get_bootstrap_body(), media_type="application/json")
     except requests.RequestException as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch FPL data: {str(e)}")
 
+@app.get("/api/players/search")
+def player_search(
+    q: str = Query("", max_length=50),
+    position: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = Query(10, ge=1, le=50),
+):
+    """Search players by name or team, optionally by position (GKP/DEF/MID/FWD or 1-4) and price in millions"""
+    element_type = None
+    if position:
+        element_type = POSITIONS.get(position.upper()) or (int(position) if position.isdigit() else None)
+        if element_type not in POSITIONS.values():
+            raise HTTPException(status_code=400, detail=f"Unknown position {position}")
+    try:
+        return search_players(q, element_type, min_price, max_price, limit)
+    except requests.RequestException as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch FPL data: {str(e)}")
+
+@app.get("/api/entry/{team_id}/planner")
+def get_entry_planner(team_id: int, horizon: int = Query(DEFAULT_HORIZON, ge=1, le=38)):
+    """The entry's latest squad with each player's fixtures and difficulty over the next gameweeks"""
+    try:
+        return entry_planner(team_id, horizon)
+    except requests.RequestException as e:
+        logger.error(f"Error fetching picks for planner of team {team_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch team picks: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error in get_entry_planner: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
 @app.get("/api/entry/{team_id}/transfers")
-async def get_team_transfers(team_id: int):
+def get_team_transfers(team_id: int, event: Optional[int] = None, db: Session = Depends(get_db)):
     try:
-        url = f"https://fantasy.premierleague.com/api/entry/{team_id}/transfers/"
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        return data if isinstance(data, list) else []
+        return entry_transfers(db, team_id, event)
     except Exception as e:
         logger.error(f"Error fetching transfers for team {team_id}: {e}")
         return []
     
 @app.get("/api/current-gameweek")
-async def get_current_gameweek():
+def get_current_gameweek():
     try:
         # Fetch bootstrap data
-        url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = get_bootstrap()
         
         # Find current gameweek
         current_gw = next((gw for gw in data['events'] if gw['is_current']), None)
@@ -257,32 +319,56 @@ async def get_current_gameweek():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/element-summary/{player_id}")
-async def get_player_summary(player_id: int):
+def get_player_summary(player_id: int):
     try:
-        url = f"https://fantasy.premierleague.com/api/element-summary/{player_id}/"
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        return get_json(f"element-summary/{player_id}/")
     except requests.RequestException as e:
         logger.error(f"Error fetching player summary for player {player_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch player summary: {str(e)}")
 
-@app.get("/api/team/{team_id}")
-async def get_team_data(team_id: int):
+@app.get("/api/players/{player_id}/trend")
+def get_player_trend(player_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None, points: int = Query(200, ge=2, le=2000)):
+    """A player's recorded price, ownership, transfers and form over time"""
+    try:
+        return player_trend(player_id, *time_range(start, end), max_points=points)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except requests.RequestException as e:
+        logger.error(f"Error fetching bootstrap for trend of player {player_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch bootstrap data: {str(e)}")
+
+@app.get("/api/trends/prices")
+def get_price_changes(start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Player price changes between start and end (default: the last 7 days)"""
+    try:
+        return price_changes(*time_range(start, end))
+    except requests.RequestException as e:
+        logger.error(f"Error fetching bootstrap for price changes: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch bootstrap data: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error in get_price_changes: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+@app.get("/api/trends/ownership")
+def get_ownership_trend(start: Optional[datetime] = None, end: Optional[datetime] = None, limit: int = Query(20, ge=1, le=100)):
+    """Biggest ownership risers and fallers between start and end (default: the last 7 days)"""
     try:
-        url = f"https://fantasy.premierleague.com/api/entry/{team_id}/"
-        response = requests.get(url)
-        response.raise_for_status()
-        team_data = response.json()
+        return ownership_trend(*time_range(start, end), limit=limit)
+    except requests.RequestException as e:
+        logger.error(f"Error fetching bootstrap for ownership trend: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch bootstrap data: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error in get_ownership_trend: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
-        # Get current gameweek from bootstrap
-        bootstrap_url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-        bootstrap_response = requests.get(bootstrap_url)
-        bootstrap_response.raise_for_status()
-        bootstrap_data = bootstrap_response.json()
+@app.get("/api/team/{team_id}")
+def get_team_data(team_id: int, db: Session = Depends(get_db)):
+    try:
+        # Copy: the cached payload is shared between requests
+        team_data = dict(get_entry(team_id))
 
         # Find current gameweek
-        current_gw = next((gw for gw in bootstrap_data['events'] if gw['is_current']), None)
+        current_gw = get_snapshot().current_event()
         if current_gw:
             team_data['current_event'] = current_gw['id']
             current_gw_id = current_gw['id']
@@ -290,27 +376,24 @@ async def get_team_data(team_id: int):
             # Get previous gameweek data if available
             if current_gw_id > 1:
                 try:
-                    # Fetch team history to get previous gameweek rank
-                    history_url = f"https://fantasy.premierleague.com/api/entry/{team_id}/history/"
-                    history_response = requests.get(history_url)
-                    history_response.raise_for_status()
-                    history_data = history_response.json()
+                    # Current and previous gameweek rows from the stored team history
+                    history_rows = {row.event: row for row in gameweek_history(db, team_id, [current_gw_id - 1, current_gw_id])}
 
                     # Get current gameweek data from history
-                    current_gw_history = next((gw for gw in history_data['current'] if gw['event'] == current_gw_id), None)
+                    current_gw_history = history_rows.get(current_gw_id)
 
                     if current_gw_history:
-                        team_data['current_event_rank'] = current_gw_history['overall_rank']
+                        team_data['current_event_rank'] = current_gw_history.overall_rank
 
                     # Get previous gameweek data
-                    prev_gw_history = next((gw for gw in history_data['current'] if gw['event'] == current_gw_id - 1), None)
+                    prev_gw_history = history_rows.get(current_gw_id - 1)
 
                     if prev_gw_history:
-                        team_data['previous_event_rank'] = prev_gw_history['overall_rank']
+                        team_data['previous_event_rank'] = prev_gw_history.overall_rank
 
                         # Calculate rank change (positive means improvement/rank went down, negative means rank went up)
-                        if current_gw_history:
-                            rank_change = prev_gw_history['overall_rank'] - current_gw_history['overall_rank']
+                        if current_gw_history and prev_gw_history.overall_rank is not None and current_gw_history.overall_rank is not None:
+                            rank_change = prev_gw_history.overall_rank - current_gw_history.overall_rank
                             team_data['rank_change'] = rank_change
 
                 except Exception as e:
@@ -327,16 +410,10 @@ async def get_team_data(team_id: int):
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
 @app.get("/api/team/{team_id}/history")
-async def get_team_history(team_id: int):
+def get_team_history(team_id: int, db: Session = Depends(get_db)):
     try:
-        # Fetch team history from FPL API
-        history_url = f"https://fantasy.premierleague.com/api/entry/{team_id}/history/"
-        history_response = requests.get(history_url)
-        history_response.raise_for_status()
-        history_data = history_response.json()
-
-        # Process current season data
-        current_season = history_data.get('current', [])
+        # Current season rows from the stored team history
+        current_season = gameweek_history(db, team_id)
 
         if not current_season:
             return {"ranks": [], "highest_rank": None, "lowest_rank": None, "highest_rank_gw": None, "lowest_rank_gw": None}
@@ -345,26 +422,27 @@ async def get_team_history(team_id: int):
         ranks = []
         for gw in current_season:
             ranks.append({
-                "gameweek": gw['event'],
-                "rank": gw['overall_rank'],
-                "points": gw['points'],
-                "total_points": gw['total_points']
+                "gameweek": gw.event,
+                "rank": gw.overall_rank,
+                "points": gw.points,
+                "total_points": gw.total_points
             })
 
-        # Find highest and lowest ranks
-        if ranks:
-            highest_rank_data = min(ranks, key=lambda x: x['rank'])  # Lower number = better rank
-            lowest_rank_data = max(ranks, key=lambda x: x['rank'])   # Higher number = worse rank
+        # Find highest and lowest ranks, over the gameweeks that have an overall rank
+        ranked = [(gw.overall_rank, gw.event) for gw in current_season if gw.overall_rank is not None]
+        if ranked:
+            highest_rank, highest_rank_gw = min(ranked)  # Lower number = better rank
+            lowest_rank, lowest_rank_gw = max(ranked, key=lambda rank: (rank[0], -rank[1]))  # Higher number = worse rank
 
             return {
                 "ranks": ranks,
-                "highest_rank": highest_rank_data['rank'],
-                "lowest_rank": lowest_rank_data['rank'],
-                "highest_rank_gw": highest_rank_data['gameweek'],
-                "lowest_rank_gw": lowest_rank_data['gameweek']
+                "highest_rank": highest_rank,
+                "lowest_rank": lowest_rank,
+                "highest_rank_gw": highest_rank_gw,
+                "lowest_rank_gw": lowest_rank_gw
             }
         else:
-            return {"ranks": [], "highest_rank": None, "lowest_rank": None, "highest_rank_gw": None, "lowest_rank_gw": None}
+            return {"ranks": ranks, "highest_rank": None, "lowest_rank": None, "highest_rank_gw": None, "lowest_rank_gw": None}
 
     except requests.RequestException as e:
         logger.error(f"Error fetching team history for team {team_id}: {e}")
@@ -374,16 +452,10 @@ async def get_team_history(team_id: int):
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
 @app.get("/api/team/{team_id}/previous-seasons")
-async def get_team_previous_seasons(team_id: int):
+def get_team_previous_seasons(team_id: int, db: Session = Depends(get_db)):
     try:
-        # Fetch team history from FPL API
-        history_url = f"https://fantasy.premierleague.com/api/entry/{team_id}/history/"
-        history_response = requests.get(history_url)
-        history_response.raise_for_status()
-        history_data = history_response.json()
-
-        # Process previous seasons data
-        previous_seasons = history_data.get('past', [])
+        # Previous seasons from the stored team history
+        previous_seasons = past_seasons(db, team_id)
 
         if not previous_seasons:
             return {"seasons": []}
@@ -404,10 +476,11 @@ async def get_team_previous_seasons(team_id: int):
             "2013/14": 3200000,
         }
 
-        for season in previous_seasons:
-            season_name = season['season_name']
+        # Most recent season first
+        for season in sorted(previous_seasons, key=lambda season: season.season_name, reverse=True):
+            season_name = season.season_name
             total_players = total_players_map.get(season_name, 10000000)  # Default fallback
-            percentage = (season['rank'] / total_players) * 100
+            percentage = (season.rank / total_players) * 100
 
             # Determine rank tier for styling
             if percentage <= 1:
@@ -433,17 +506,14 @@ async def get_team_previous_seasons(team_id: int):
 
             seasons.append({
                 "season": season_name,
-                "total_points": season['total_points'],
-                "rank": season['rank'],
+                "total_points": season.total_points,
+                "rank": season.rank,
                 "percentage": round(percentage, 2),
                 "tier": tier,
                 "tier_color": tier_color,
                 "tier_icon": tier_icon
             })
 
-        # Sort by season (most recent first)
-        seasons.sort(key=lambda x: x['season'], reverse=True)
-
         return {"seasons": seasons}
 
     except requests.RequestException as e:
@@ -454,34 +524,20 @@ async def get_team_previous_seasons(team_id: int):
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
 @app.get("/api/fixtures/{gameweek_id}")
-async def get_gameweek_fixtures(gameweek_id: int):
+def get_gameweek_fixtures(gameweek_id: int):
     try:
-        # First get bootstrap data for team mappings
-        bootstrap_url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-        bootstrap_response = requests.get(bootstrap_url)
-        bootstrap_response.raise_for_status()
-        bootstrap_data = bootstrap_response.json()
-
-        # Create team mapping
-        teams = {team['id']: team for team in bootstrap_data['teams']}
-
-        # Get fixtures for the specific gameweek
-        fixtures_url = "https://fantasy.premierleague.com/api/fixtures/"
-        fixtures_response = requests.get(fixtures_url)
-        fixtures_response.raise_for_status()
-        fixtures_data = fixtures_response.json()
-
-        # Filter fixtures for the specified gameweek
-        gameweek_fixtures = [
-            fixture for fixture in fixtures_data
-            if fixture['event'] == gameweek_id and fixture['finished']
-        ]
+        snapshot = get_snapshot()
+
+        # Finished fixtures for the specified gameweek. Scores come from the
+        # gameweek's fixtures payload, which is as fresh as the response's
+        # cache policy; the snapshot can lag it by a refresh interval
+        gameweek_fixtures = [fixture for fixture in get_event_fixtures(gameweek_id) if fixture['finished']]
 
         # Format the fixtures data
         results = []
         for fixture in gameweek_fixtures:
-            home_team = teams.get(fixture['team_h'])
-            away_team = teams.get(fixture['team_a'])
+            home_team = snapshot.team(fixture['team_h'])
+            away_team = snapshot.team(fixture['team_a'])
 
             if home_team and away_team:
                 results.append({
@@ -511,12 +567,9 @@ async def get_gameweek_fixtures(gameweek_id: int):
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
 @app.get("/api/entry/{team_id}/event/{event_id}/picks")
-async def get_team_picks(team_id: int, event_id: int):
+def get_team_picks(team_id: int, event_id: int):
     try:
-        url = f"https://fantasy.premierleague.com/api/entry/{team_id}/event/{event_id}/picks/"
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        return get_entry_picks(team_id, event_id)
     except Exception as e:
         logger.error(f"Error fetching picks for team {team_id} event {event_id}: {e}")
         raise HTTPException(
@@ -525,21 +578,12 @@ async def get_team_picks(team_id: int, event_id: int):
         )
 
 @app.get("/api/weekly-matchups/{league_id}")
-async def get_weekly_matchups(league_id: int, event: int):
+def get_weekly_matchups(league_id: int, event: int):
     try:
-        # Construct the FPL API URL
-        url = f"https://fantasy.premierleague.com/api/leagues-h2h-matches/league/{league_id}/?event={event}&page=1"
-        
-        # Make the request
-        response = requests.get(url)
-        response.raise_for_status()  # Raise exception for non-200 status codes
-        
-        # Get the data
-        data = response.json()
+        # Every page of the league's matches for the event (also fills the match
+        # index), with live points while the gameweek is in progress
+        return league_event_matches(league_id, event)
 
-        # Return only the results array
-        return data.get('results', [])
-        
     except requests.RequestException as e:
         logger.error(f"Error fetching weekly matchups: {e}")
         raise HTTPException(
@@ -554,117 +598,173 @@ async def get_weekly_matchups(league_id: int, event: int):
         )
 
 @app.get("/api/matchup/{match_id}")
-async def get_matchup_details(match_id: int, event: int):
+def get_matchup_details(match_id: int, event: int, league_id: Optional[int] = None):
     logger.info(f"Fetching matchup details for match_id: {match_id}, event: {event}")
-    
-    def process_team_data(entry_id, all_players, live_data):
-        picks_url = f"https://fantasy.premierleague.com/api/entry/{entry_id}/event/{event}/picks/"
-        picks_response = requests.get(picks_url)
-        picks_response.raise_for_status()
-        picks_data = picks_response.json()
 
+    def process_team_data(picks_data, snapshot, live_by_id, live_picks):
         processed_data = []
         for pick in picks_data['picks']:
-            player = next((p for p in all_players if p['id'] == pick['element']), None)
+            player = snapshot.player(pick['element'])
             if player is None:
                 continue
-            live_stats = next((p for p in live_data['elements'] if p['id'] == pick['element']), {})
+            live_stats = live_by_id.get(pick['element'], {})
+            live_pick = live_picks.get(pick['element'])
             processed_data.append({
                 "id": player['id'],
                 "name": player['web_name'],
                 "position": get_position(player['element_type']),
-                "points": live_stats.get('stats', {}).get('total_points', 0),
+                "points": live_pick['points'] if live_pick else live_stats.get('stats', {}).get('total_points', 0),
                 "isCaptain": pick['is_captain'],
-                "club": team_id_to_code[player['team']],
+                "club": snapshot.team(player['team'])['short_name'],
                 "yellowCards": live_stats.get('stats', {}).get('yellow_cards', 0),
                 "redCards": live_stats.get('stats', {}).get('red_cards', 0),
-                "isStarting": pick['position'] <= 11,
-                "multiplier": pick['multiplier']
+                "isStarting": live_pick['starting'] if live_pick else pick['position'] <= 11,
+                "multiplier": live_pick['multiplier'] if live_pick else pick['multiplier'],
+                "provisionalBonus": live_pick['provisional_bonus'] if live_pick else 0,
+                "subbedIn": live_pick['subbed_in'] if live_pick else False,
+                "subbedOut": live_pick['subbed_out'] if live_pick else False,
             })
         return processed_data
 
-    def get_manager_name(entry_id):
-        manager_url = f"https://fantasy.premierleague.com/api/entry/{entry_id}/"
-        manager_response = requests.get(manager_url)
-        manager_response.raise_for_status()
-        manager_data = manager_response.json()
+    def get_manager_name(entry_id, indexed_name):
+        if indexed_name:
+            return indexed_name
+        manager_data = get_entry(entry_id)
         return f"{manager_data['player_first_name']} {manager_data['player_last_name']}"
 
+    def event_score(picks_data):
+        history = picks_data.get('entry_history', {})
+        return history.get('points', 0) - history.get('event_transfers_cost', 0)
+
     try:
-        # Use environment variable for league ID
-        league_url = f"https://fantasy.premierleague.com/api/leagues-h2h-matches/league/{LEAGUE_ID}/?event={event}&page=1"
-        league_response = requests.get(league_url)
-        league_response.raise_for_status()
-        league_data = league_response.json()
-
-        match_data = next((match for match in league_data['results'] if match['id'] == match_id), None)
-        if not match_data:
+        # Resolve the match from the index; only a cold miss fetches the league's matches
+        match_data = resolve_match(match_id, event, league_id or LEAGUE_ID)
+        if not match_data or match_data['event'] != event:
             raise HTTPException(status_code=404, detail=f"Match with id {match_id} not found in league data")
 
         # Fetch live data for the specific gameweek
-        live_url = f"https://fantasy.premierleague.com/api/event/{event}/live/"
-        live_response = requests.get(live_url)
-        live_response.raise_for_status()
-        live_data = live_response.json()
-
-        # Fetch player static data
-        static_url = 'https://fantasy.premierleague.com/api/bootstrap-static/'
-        static_response = requests.get(static_url)
-        static_response.raise_for_status()
-        static_data = static_response.json()
-
-        # Create a mapping of team ID to team code
-        team_id_to_code = {team['id']: team['short_name'] for team in static_data['teams']}
-
-        team_h_manager = get_manager_name(match_data['entry_1_entry'])
-        team_a_manager = get_manager_name(match_data['entry_2_entry'])
+        live_data = get_event_live(event)
+        live_by_id = {element['id']: element for element in live_data['elements']}
+
+        snapshot = get_snapshot()
+
+        team_h_manager = get_manager_name(match_data['entry_1_entry'], match_data.get('entry_1_player_name'))
+        team_a_manager = get_manager_name(match_data['entry_2_entry'], match_data.get('entry_2_player_name'))
+
+        team_h_picks = get_entry_picks(match_data['entry_1_entry'], event)
+        team_a_picks = get_entry_picks(match_data['entry_2_entry'], event)
+
+        team_h_score, team_a_score = event_score(team_h_picks), event_score(team_a_picks)
+        team_h_live, team_a_live = {}, {}
+        if not event_finished(event):
+            # Upstream's totals lag during the gameweek: score both sides with
+            # automatic substitutions and provisional bonus applied
+            live_scores = score_event([match_data['entry_1_entry'], match_data['entry_2_entry']], event)
+            team_h_live = live_scores.pick_details(match_data['entry_1_entry'])
+            team_a_live = live_scores.pick_details(match_data['entry_2_entry'])
+            live_h_score = live_scores.score(match_data['entry_1_entry'])
+            live_a_score = live_scores.score(match_data['entry_2_entry'])
+            team_h_score = team_h_score if live_h_score is None else live_h_score
+            team_a_score = team_a_score if live_a_score is None else live_a_score
 
         result = {
             "team_h_name": match_data['entry_1_name'],
             "team_a_name": match_data['entry_2_name'],
             "team_h_manager": team_h_manager,
             "team_a_manager": team_a_manager,
-            "team_h_score": match_data['entry_1_points'],
-            "team_a_score": match_data['entry_2_points'],
-            "team_h_picks": process_team_data(match_data['entry_1_entry'], static_data['elements'], live_data),
-            "team_a_picks": process_team_data(match_data['entry_2_entry'], static_data['elements'], live_data),
+            "team_h_score": team_h_score,
+            "team_a_score": team_a_score,
+            "team_h_picks": process_team_data(team_h_picks, snapshot, live_by_id, team_h_live),
+            "team_a_picks": process_team_data(team_a_picks, snapshot, live_by_id, team_a_live),
         }
         return result
 
+    except HTTPException:
+        raise
     except requests.RequestException as e:
         logger.error(f"Error fetching data from FPL API: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching data from FPL API: {str(e)}")
     except Exception as e:
-        logger.error(f"An unexpected error occurred: {str(e)}")
-        logger.error(f"Current data structure: {json.dumps(locals(), default=str, indent=2)}")
+        logger.exception(
+            f"Unexpected error building matchup {match_id} for event {event}: {str(e)}",
+            extra={"fields": {"match": summarize(locals().get('match_data'))}},
+        )
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
 @app.get("/api/leagues/{league_id}/standings")
-async def get_fpl_standings(league_id: int):
+def get_fpl_standings(league_id: int):
     try:
-        standings_url = f"https://fantasy.premierleague.com/api/leagues-h2h/{league_id}/standings/"
-        standings_response = requests.get(standings_url)
-        standings_response.raise_for_status()
-        standings_data = standings_response.json()
+        standings_data = get_json(f"leagues-h2h/{league_id}/standings/")
         return standings_data['standings']['results']
     except Exception as e:
         logger.error(f"Error in get_fpl_standings: {str(e)}")
         raise HTTPException(status_code=500, detail=f"An error occurred while fetching standings: {str(e)}")
 
+@app.get("/api/leagues/{league_id}/live")
+def get_league_live(league_id: int, event: Optional[int] = None):
+    """Live H2H results and the projected table, computed from picks and live points"""
+    try:
+        if event is None:
+            current_gw = get_snapshot().current_event()
+            if not current_gw:
+                raise HTTPException(status_code=404, detail="No current gameweek found")
+            event = current_gw['id']
+        return league_live(league_id, event)
+    except HTTPException:
+        raise
+    except requests.RequestException as e:
+        logger.error(f"Error fetching live data for league {league_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch live league data: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error in get_league_live: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+@app.get("/api/leagues/{league_id}/transfers")
+def get_league_transfers(league_id: int, event: int, db: Session = Depends(get_db)):
+    """Transfers made by the league's managers in a gameweek, from the transfers ledger"""
+    try:
+        return league_transfers(db, league_id, event)
+    except requests.RequestException as e:
+        logger.error(f"Error syncing transfers for league {league_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch league transfers: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error in get_league_transfers: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+@app.get("/api/leagues/{league_id}/transfers/summary")
+def get_league_transfer_summary(league_id: int, event: Optional[int] = None, db: Session = Depends(get_db)):
+    """Most transferred in/out players and hits taken in the league, for a gameweek or the whole season"""
+    try:
+        return league_transfer_summary(db, league_id, event)
+    except requests.RequestException as e:
+        logger.error(f"Error syncing transfers for league {league_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch league transfers: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error in get_league_transfer_summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+@app.get("/api/leagues/{league_id}/ownership/{event}")
+def get_league_ownership(league_id: int, event: int):
+    """League ownership, captaincy, effective ownership and each manager's differentials for a gameweek"""
+    try:
+        return league_ownership(league_id, event)
+    except requests.RequestException as e:
+        logger.error(f"Error fetching ownership for league {league_id} event {event}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch league picks: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error in get_league_ownership: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
 # Database Routes
 @app.get("/api/leagues")
-async def get_leagues(db: Session = Depends(get_db)):
-    leagues = db.query(models.League).all()
-    return leagues
+def get_leagues(db: Session = Depends(get_db)):
+    return league_cache.get_leagues(db)
 
 @app.get("/api/leagues/{league_id}", response_model=schemas.League)
-async def get_league(league_id: int, db: Session = Depends(get_db)):
-    league = db.query(models.League).filter(models.League.id == league_id).first()
+def get_league(league_id: int, db: Session = Depends(get_db)):
+    league = league_cache.get_league(db, league_id)
     if league is None:
         raise HTTPException(status_code=404, detail="League not found")
-    if league.updated_at is None:
-        league.updated_at = league.created_at
-        db.commit()
     return league
 
 from sqlalchemy import text
@@ -685,7 +785,8 @@ def test_db_connection(db: Session = Depends(get_db)):
 
 @app.get("/debug/create_league")
 @app.post("/debug/create_league")
-def create_league(db: Session = Depends(get_db)):
+def create_league(league_id: Optional[int] = None, db: Session = Depends(get_db)):
+    league_id = league_id or LEAGUE_ID
     logger.info("Starting league creation process")
     try:
         # First test the connection
@@ -693,7 +794,7 @@ def create_league(db: Session = Depends(get_db)):
         
         # Check if league already exists
         logger.info("Checking for existing league")
-        existing_league = db.query(models.League).filter(models.League.id == LEAGUE_ID).first()
+        existing_league = db.query(models.League).filter(models.League.id == league_id).first()
         if existing_league:
             logger.info("League already exists")
             return {
@@ -708,7 +809,7 @@ def create_league(db: Session = Depends(get_db)):
         logger.info("Creating new league")
         current_time = datetime.utcnow()
         new_league = models.League(
-            id=LEAGUE_ID,
+            id=league_id,
             name="FPL League Hub",
             created_at=current_time,
             updated_at=current_time,
@@ -725,6 +826,7 @@ def create_league(db: Session = Depends(get_db)):
         
         logger.info("Refreshing league object")
         db.refresh(new_league)
+        league_cache.store(new_league)
         
         return {
             "message": "League created successfully",
@@ -746,7 +848,7 @@ def create_league(db: Session = Depends(get_db)):
         }
 
 @app.put("/api/leagues/{league_id}", response_model=schemas.League)
-async def update_league(league_id: int, league: schemas.LeagueUpdate, db: Session = Depends(get_db)):
+def update_league(league_id: int, league: schemas.LeagueUpdate, db: Session = Depends(get_db)):
     db_league = db.query(models.League).filter(models.League.id == league_id).first()
     if db_league is None:
         raise HTTPException(status_code=404, detail="League not found")
@@ -759,13 +861,15 @@ async def update_league(league_id: int, league: schemas.LeagueUpdate, db: Sessio
     
     db.commit()
     db.refresh(db_league)
+    league_cache.store(db_league)
     return db_league
 
 @app.delete("/api/leagues/{league_id}", response_model=schemas.League)
-async def delete_league(league_id: int, db: Session = Depends(get_db)):
+def delete_league(league_id: int, db: Session = Depends(get_db)):
     league = db.query(models.League).filter(models.League.id == league_id).first()
     if league is None:
         raise HTTPException(status_code=404, detail="League not found")
     db.delete(league)
     db.commit()
+    league_cache.forget(league_id)
     return league
\ No newline at end of file
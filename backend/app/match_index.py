@@ -0,0 +1,95 @@
+"""Index of H2H matches: match_id -> league, gameweek and the two entries.
+
+The index is filled whenever a league's weekly matchups are fetched and is
+kept in the shared cache, so any worker can resolve a match id without
+downloading and scanning the league's matches pages again. Each worker also
+keeps the ``MATCH_INDEX_MEMORY_SIZE`` most recently used matches in memory.
+"""
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .cache import get_cache
+from .upstream import get_league_matches
+
+logger = logging.getLogger(__name__)
+
+MATCH_INDEX_TTL = float(os.getenv("MATCH_INDEX_TTL", str(60 * 24 * 3600)))
+MATCH_INDEX_MEMORY_SIZE = int(os.getenv("MATCH_INDEX_MEMORY_SIZE", "50000"))
+
+# Fields kept per match; points are deliberately left out because they change
+# while the gameweek is live.
+INDEXED_FIELDS = (
+    "id", "event", "entry_1_entry", "entry_1_name", "entry_1_player_name",
+    "entry_2_entry", "entry_2_name", "entry_2_player_name", "is_knockout",
+)
+
+# Least recently used first
+_known: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_known_lock = threading.Lock()
+
+
+def _key(match_id: int) -> str:
+    return f"h2h-match:{match_id}"
+
+
+def _remember_locally(match_id: int, entry: Dict[str, Any]):
+    with _known_lock:
+        _known[match_id] = entry
+        _known.move_to_end(match_id)
+        while len(_known) > MATCH_INDEX_MEMORY_SIZE:
+            _known.popitem(last=False)
+
+
+def remember_matches(league_id: int, matches: List[Dict[str, Any]]):
+    cache = get_cache()
+    for match in matches:
+        with _known_lock:
+            if match["id"] in _known:
+                continue
+        entry = {field: match.get(field) for field in INDEXED_FIELDS}
+        entry["league"] = league_id
+        cache.set(_key(match["id"]), json.dumps(entry).encode(), MATCH_INDEX_TTL)
+        _remember_locally(match["id"], entry)
+
+
+def lookup_match(match_id: int) -> Optional[Dict[str, Any]]:
+    with _known_lock:
+        entry = _known.get(match_id)
+        if entry is not None:
+            _known.move_to_end(match_id)
+    if entry is not None:
+        return entry
+    cached = get_cache().get(_key(match_id))
+    if cached is None:
+        return None
+    entry = json.loads(cached[0])
+    _remember_locally(match_id, entry)
+    return entry
+
+
+def fetch_event_matches(league_id: int, event: int) -> List[Dict[str, Any]]:
+    """All of a league's H2H matches for a gameweek (every page), indexing them on the way."""
+    results: List[Dict[str, Any]] = []
+    page = 1
+    while True:
+        data = get_league_matches(league_id, event, page)
+        results.extend(data.get('results', []))
+        if not data.get('has_next'):
+            break
+        page += 1
+    remember_matches(league_id, results)
+    return results
+
+
+def resolve_match(match_id: int, event: int, league_id: int) -> Optional[Dict[str, Any]]:
+    """Look a match up in the index, filling it from ``league_id``'s matches on a miss."""
+    entry = lookup_match(match_id)
+    if entry is None:
+        logger.info(f"Match {match_id} not indexed, fetching league {league_id} matches for event {event}")
+        fetch_event_matches(league_id, event)
+        entry = lookup_match(match_id)
+    return entry
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Float, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -8,7 +10,69 @@ class League(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     total_teams = Column(Integer, default=0)
     average_score = Column(Float, default=0.0)
-    highest_score = Column(Integer, default=0)
\ No newline at end of file
+    highest_score = Column(Integer, default=0)
+
+class EntryTransfer(Base):
+    """One transfer made by an FPL entry, appended by the transfers ledger sync."""
+    __tablename__ = "entry_transfers"
+    __table_args__ = (
+        UniqueConstraint("entry_id", "event", "element_in", "element_out", "time", name="uq_entry_transfers_transfer"),
+        Index("ix_entry_transfers_entry_event", "entry_id", "event"),
+    )
+
+    id: int = Column(Integer, primary_key=True)
+    entry_id: int = Column(Integer, nullable=False)
+    event: int = Column(Integer, nullable=False, index=True)
+    element_in: int = Column(Integer, nullable=False)
+    element_in_cost: int = Column(Integer, nullable=False)
+    element_out: int = Column(Integer, nullable=False)
+    element_out_cost: int = Column(Integer, nullable=False)
+    time: str = Column(String, nullable=False)
+
+class EntryGameweekTransfers(Base):
+    """Per-entry, per-gameweek transfer totals; the latest event stored is the entry's sync watermark."""
+    __tablename__ = "entry_gameweek_transfers"
+
+    entry_id: int = Column(Integer, primary_key=True)
+    event: int = Column(Integer, primary_key=True, index=True)
+    transfers: int = Column(Integer, default=0, nullable=False)
+    transfers_cost: int = Column(Integer, default=0, nullable=False)
+    synced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class EntryHistory(Base):
+    """One row of an entry's ``history/`` ``current`` list: the entry's result for a gameweek."""
+    __tablename__ = "entry_history"
+
+    entry_id: int = Column(Integer, primary_key=True)
+    event: int = Column(Integer, primary_key=True)
+    points: int = Column(Integer, default=0, nullable=False)
+    total_points: int = Column(Integer, default=0, nullable=False)
+    rank = Column(Integer)
+    overall_rank = Column(Integer)
+    bank = Column(Integer, default=0)
+    value = Column(Integer, default=0)
+    event_transfers: int = Column(Integer, default=0, nullable=False)
+    event_transfers_cost: int = Column(Integer, default=0, nullable=False)
+    points_on_bench = Column(Integer, default=0)
+
+class EntryPastSeason(Base):
+    """One row of an entry's ``history/`` ``past`` list."""
+    __tablename__ = "entry_past_seasons"
+
+    entry_id: int = Column(Integer, primary_key=True)
+    season_name: str = Column(String, primary_key=True)
+    total_points: int = Column(Integer, nullable=False)
+    rank: int = Column(Integer, nullable=False)
+
+class EntryHistorySync(Base):
+    """Per-entry watermark for the history sync."""
+    __tablename__ = "entry_history_sync"
+
+    entry_id: int = Column(Integer, primary_key=True)
+    last_event: int = Column(Integer, default=0, nullable=False)
+    # The watermark gameweek's row keeps changing until upstream finishes the gameweek
+    last_event_final: bool = Column(Boolean, default=False, nullable=False)
+    synced_at: datetime = Column(DateTime(timezone=True), nullable=False)
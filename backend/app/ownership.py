@@ -0,0 +1,152 @@
+"""League ownership, captaincy and effective ownership for one gameweek.
+
+The league's picks (see :class:`app.live_scoring.LeaguePicks`) are scattered
+into ``(entries, elements)`` matrices of ownership and final multipliers
+(after vice-captain promotion and automatic substitutions). Then:
+
+* ownership, captaincy and bench counts are column sums;
+* effective ownership (EO) is the column mean of the multipliers (as a
+  percentage), so a player everyone captains has an EO of 200%;
+* each manager's gain over the league is ``(multipliers - EO) @ points``: what
+  their picks scored beyond what the average league manager got from them.
+
+Differentials are the players a manager started that at most
+``DIFFERENTIAL_MAX_OWNERSHIP`` percent of the league owns. Results are cached
+in the shared cache, for good once upstream has finished the gameweek, so
+they are only computed when every manager's picks could be fetched.
+"""
+import json
+from typing import Any, Dict
+
+import numpy as np
+import requests
+
+from .cache import get_cache
+from .live_scoring import score_event
+from .snapshot import get_snapshot
+from .transfers import league_entries
+from .upstream import FINISHED_EVENT_TTL, LIVE_EVENT_TTL, event_finished
+
+DIFFERENTIAL_MAX_OWNERSHIP = 25.0
+POSITION_NAMES = {1: "GKP", 2: "DEF", 3: "MID", 4: "FWD"}
+
+
+def _percent(count: np.ndarray, total: int) -> np.ndarray:
+    return np.round(count * 100.0 / total, 1) if total else np.zeros(count.shape)
+
+
+def compute_ownership(league_id: int, event: int) -> Dict[str, Any]:
+    entries = {row['entry']: row for row in league_entries(league_id)}
+    scored = score_event(list(entries), event)
+    picks, live = scored.picks, scored.live
+    if picks.failed:
+        # Counts over part of the league would be wrong, and cached for good once the gameweek is finished
+        raise requests.RequestException(f"Picks unavailable for {len(picks.failed)} of {len(entries)} entries")
+    count = len(picks)
+    finished = event_finished(event)
+    if not count:
+        return {"league_id": league_id, "event": event, "finished": finished, "managers": 0, "players": [], "captains": [], "entries": []}
+
+    size = len(live.points)
+    rows = np.repeat(np.arange(count), picks.elements.shape[1])
+    columns = picks.elements.ravel()
+    owned = np.zeros((count, size), dtype=bool)
+    owned[rows, columns] = True
+    multipliers = np.zeros((count, size), dtype=np.int8)
+    multipliers[rows, columns] = scored.scored.multipliers.ravel()
+    captained = np.zeros((count, size), dtype=bool)
+    captained[np.arange(count), picks.elements[np.arange(count), picks.captain]] = True
+    owned[:, 0] = multipliers[:, 0] = captained[:, 0] = False  # empty squad slots
+
+    owners = owned.sum(axis=0)
+    captains = captained.sum(axis=0)
+    benched = (owned & (multipliers == 0)).sum(axis=0)
+    effective = multipliers.sum(axis=0, dtype=np.int32) / count
+    ownership = _percent(owners, count)
+    points = live.points
+    # Per manager: points from their picks beyond the league-average return on the same players
+    gains = (multipliers - effective) @ points
+
+    snapshot = get_snapshot()
+    names: Dict[int, Dict[str, Any]] = {}
+
+    def player(element_id: int) -> Dict[str, Any]:
+        if element_id not in names:
+            found = snapshot.player(element_id)
+            team = snapshot.team(found['team']) if found else None
+            names[element_id] = {
+                "element": element_id,
+                "web_name": found['web_name'] if found else 'Unknown',
+                "team": team['short_name'] if team else None,
+                "position": POSITION_NAMES.get(found['element_type']) if found else None,
+            }
+        return names[element_id]
+
+    owned_ids = np.flatnonzero(owners)
+    owned_ids = owned_ids[np.lexsort((owned_ids, -owners[owned_ids], -effective[owned_ids]))]
+    players = [
+        {
+            **player(element_id),
+            "owners": int(owners[element_id]),
+            "ownership": float(ownership[element_id]),
+            "captains": int(captains[element_id]),
+            "captaincy": float(_percent(captains[element_id], count)),
+            "benched": int(benched[element_id]),
+            "effective_ownership": round(float(effective[element_id]) * 100, 1),
+            "points": int(points[element_id]),
+        }
+        for element_id in owned_ids.tolist()
+    ]
+
+    captain_ids = np.flatnonzero(captains)
+    captain_ids = captain_ids[np.lexsort((captain_ids, -captains[captain_ids]))]
+    captain_summary = [
+        {**player(element_id), "captains": int(captains[element_id]), "captaincy": float(_percent(captains[element_id], count))}
+        for element_id in captain_ids.tolist()
+    ]
+
+    differential = (multipliers > 0) & (ownership <= DIFFERENTIAL_MAX_OWNERSHIP)
+    entry_rows = []
+    for row, entry_id in enumerate(picks.entry_ids.tolist()):
+        standing = entries.get(entry_id, {})
+        captain_id = int(picks.elements[row, picks.captain[row]])
+        entry_rows.append({
+            "entry": entry_id,
+            "manager_name": standing.get('player_name'),
+            "team_name": standing.get('entry_name'),
+            "captain": player(captain_id),
+            "chip": picks.chips[row],
+            "gain_over_league": round(float(gains[row]), 1),
+            "differentials": [
+                {
+                    **player(element_id),
+                    "ownership": float(ownership[element_id]),
+                    "multiplier": int(multipliers[row, element_id]),
+                    "points": int(points[element_id]),
+                }
+                for element_id in np.flatnonzero(differential[row]).tolist()
+            ],
+        })
+    entry_rows.sort(key=lambda entry: (-entry["gain_over_league"], entry["entry"]))
+
+    return {
+        "league_id": league_id,
+        "event": event,
+        "finished": finished,
+        "managers": count,
+        "players": players,
+        "captains": captain_summary,
+        "entries": entry_rows,
+    }
+
+
+def league_ownership(league_id: int, event: int) -> Dict[str, Any]:
+    """Ownership analytics for ``league_id`` in ``event``; cached for good once the gameweek is finished."""
+    key = f"league-ownership:{league_id}:{event}"
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is not None:
+        return json.loads(entry[0])
+    result = compute_ownership(league_id, event)
+    cache.set(key, json.dumps(result).encode(), FINISHED_EVENT_TTL if result["finished"] else LIVE_EVENT_TTL)
+    return result
@@ -0,0 +1,140 @@
+"""Upcoming fixture difficulty for an entry's squad.
+
+:class:`DifficultyTable` turns the snapshot's fixtures into ``(teams,
+gameweeks)`` arrays holding each team's fixture count and summed difficulty
+(FDR) per gameweek. A blank gameweek is a 0 count and a double gameweek is
+2. The table is built once per snapshot. A planner request then only slices
+the next ``horizon`` gameweeks and gathers the rows of the squad's teams.
+Picks come from the cached picks payload.
+
+Difficulty totals add up every fixture, so a double gameweek counts twice
+and a blank counts nothing. ``average_difficulty`` is per fixture, which
+allows squads with different fixture counts to be compared.
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .live_scoring import STARTERS
+from .snapshot import Snapshot, get_snapshot
+from .upstream import get_entry_picks
+
+DEFAULT_HORIZON = 5
+POSITION_NAMES = {1: "GKP", 2: "DEF", 3: "MID", 4: "FWD"}
+
+
+class DifficultyTable:
+    """Per team and gameweek: fixture count, summed difficulty and the fixtures themselves."""
+
+    def __init__(self, snapshot: Snapshot):
+        teams = {team['id']: team for team in snapshot.teams()}
+        self.events = [event['id'] for event in snapshot.events()]
+        team_count = max(list(teams) + [0]) + 1
+        event_count = max(self.events + [0]) + 1
+        self.counts = np.zeros((team_count, event_count), dtype=np.int8)
+        self.difficulty = np.zeros((team_count, event_count), dtype=np.int16)
+        self.fixtures: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+
+        for fixture in snapshot.fixtures():
+            event = fixture['event']
+            if event is None:
+                # Postponed and not yet rescheduled
+                continue
+            sides = (
+                (fixture['team_h'], fixture['team_a'], True, fixture['team_h_difficulty']),
+                (fixture['team_a'], fixture['team_h'], False, fixture['team_a_difficulty']),
+            )
+            for team, opponent, home, difficulty in sides:
+                self.counts[team, event] += 1
+                self.difficulty[team, event] += difficulty
+                self.fixtures.setdefault((team, event), []).append({
+                    "event": event,
+                    "opponent": teams[opponent]['short_name'] if opponent in teams else None,
+                    "home": home,
+                    "difficulty": difficulty,
+                    "kickoff_time": fixture['kickoff_time'] or None,
+                })
+
+    def window(self, first_event: int, horizon: int) -> List[int]:
+        return [event for event in self.events if first_event <= event < first_event + horizon]
+
+
+_table_lock = threading.Lock()
+# (snapshot the table was built from, table)
+_table: Optional[Tuple[Snapshot, DifficultyTable]] = None
+
+
+def difficulty_table(snapshot: Optional[Snapshot] = None) -> DifficultyTable:
+    global _table
+    snapshot = snapshot or get_snapshot()
+    cached = _table
+    if cached is not None and cached[0] is snapshot:
+        return cached[1]
+    table = DifficultyTable(snapshot)
+    with _table_lock:
+        _table = (snapshot, table)
+    return table
+
+
+def _average(total: int, fixtures: int) -> Optional[float]:
+    return round(total / fixtures, 2) if fixtures else None
+
+
+def entry_planner(entry_id: int, horizon: int = DEFAULT_HORIZON) -> Dict[str, Any]:
+    """The entry's latest picks with each player's fixtures and difficulty over the next ``horizon`` gameweeks."""
+    snapshot = get_snapshot()
+    current = snapshot.current_event()
+    upcoming = snapshot.next_event()
+    picks_event = current['id'] if current else None
+    table = difficulty_table(snapshot)
+    events = table.window(upcoming['id'], horizon) if upcoming else []
+    result: Dict[str, Any] = {"entry": entry_id, "picks_event": picks_event, "horizon": horizon, "events": events, "players": [], "squad": None}
+    if picks_event is None:
+        return result
+
+    picks = sorted(get_entry_picks(entry_id, picks_event).get('picks', []), key=lambda pick: pick['position'])
+    players = [snapshot.player(pick['element']) for pick in picks]
+    team_ids = np.array([player['team'] if player else 0 for player in players], dtype=np.int64)
+    columns = np.array(events, dtype=np.int64)
+    # (picks, gameweeks) slices of the precomputed table
+    counts = table.counts[np.ix_(team_ids, columns)].astype(np.int32)
+    difficulty = table.difficulty[np.ix_(team_ids, columns)].astype(np.int32)
+    fixture_totals = counts.sum(axis=1)
+    difficulty_totals = difficulty.sum(axis=1)
+
+    for row, (pick, player) in enumerate(zip(picks, players)):
+        team = snapshot.team(player['team']) if player else None
+        result["players"].append({
+            "element": pick['element'],
+            "web_name": player['web_name'] if player else 'Unknown',
+            "team": team['short_name'] if team else None,
+            "position": POSITION_NAMES.get(player['element_type']) if player else None,
+            "squad_position": pick['position'],
+            "is_captain": pick['is_captain'],
+            "is_vice_captain": pick['is_vice_captain'],
+            "fixtures": [fixture for event in events for fixture in table.fixtures.get((int(team_ids[row]), event), [])],
+            "fixture_count": int(fixture_totals[row]),
+            "blanks": int((counts[row] == 0).sum()),
+            "doubles": int((counts[row] > 1).sum()),
+            "difficulty_total": int(difficulty_totals[row]),
+            "average_difficulty": _average(int(difficulty_totals[row]), int(fixture_totals[row])),
+        })
+
+    starting = np.array([pick['position'] <= STARTERS for pick in picks], dtype=bool)
+
+    def totals(mask: np.ndarray) -> Dict[str, Any]:
+        fixtures, total = int(fixture_totals[mask].sum()), int(difficulty_totals[mask].sum())
+        return {
+            "fixture_count": fixtures,
+            "difficulty_total": total,
+            "average_difficulty": _average(total, fixtures),
+            # Per gameweek across the group: fixtures its players have and their summed difficulty
+            "by_event": [
+                {"event": event, "fixtures": int(counts[mask, column].sum()), "difficulty": int(difficulty[mask, column].sum())}
+                for column, event in enumerate(events)
+            ],
+        }
+
+    result["squad"] = {"starting_xi": totals(starting), "bench": totals(~starting), "all": totals(np.ones(len(picks), dtype=bool))}
+    return result
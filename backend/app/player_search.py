@@ -0,0 +1,220 @@
+"""Player search over the bootstrap ``elements`` and ``teams``.
+
+The name index maps every normalised search term (words of ``web_name``,
+first and second names, the team's short and full names) to the players it
+belongs to. Terms are kept sorted for prefix lookups, and every term prefix
+of at least ``FUZZY_MIN_LENGTH`` characters is also stored with each of its
+single-character deletions. A query term deleted the same way then finds
+prefixes within one edit ("haalnd", "salha"), without a scan over all the
+terms.
+
+Normalisation folds case and accents ("Ødegaard" matches "odegaard").
+Building the index is the only costly step. It runs again only when a
+player's or team's name changes. Prices, positions and stats are read from
+the current bootstrap on every query.
+"""
+import bisect
+import hashlib
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .upstream import get_bootstrap
+
+FUZZY_MIN_LENGTH = 3
+SEARCH_MAX_RESULTS = 50
+
+# Letters that do not decompose into a base letter plus accents
+_FOLD = str.maketrans({"ø": "o", "ł": "l", "đ": "d", "ð": "d", "þ": "th", "æ": "ae", "œ": "oe", "ß": "ss", "ı": "i"})
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# Weight of a match by the field it was found in
+FIELD_WEIGHTS = {"web_name": 1.0, "second_name": 0.9, "first_name": 0.8, "team": 0.6}
+# Score of a query term by how it matched
+EXACT_SCORE = 100
+PREFIX_SCORE = 70
+FUZZY_SCORE = 40
+
+POSITIONS = {"GKP": 1, "DEF": 2, "MID": 3, "FWD": 4}
+
+
+def normalize(text: Optional[str]) -> str:
+    decomposed = unicodedata.normalize("NFKD", (text or "").casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", stripped.translate(_FOLD)).strip()
+
+
+def _deletions(term: str) -> Set[str]:
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class NameIndex:
+    """Search terms -> (player id, field weight) postings, with prefix and one-edit lookups."""
+
+    def __init__(self, elements: List[Dict[str, Any]], teams: List[Dict[str, Any]]):
+        team_terms = {
+            team['id']: set(normalize(f"{team.get('short_name', '')} {team.get('name', '')}").split())
+            for team in teams
+        }
+        postings: Dict[str, Dict[int, float]] = {}
+
+        def add(term: str, player_id: int, weight: float):
+            best = postings.setdefault(term, {})
+            best[player_id] = max(best.get(player_id, 0.0), weight)
+
+        for element in elements:
+            for field in ("web_name", "first_name", "second_name"):
+                for term in normalize(element.get(field)).split():
+                    add(term, element['id'], FIELD_WEIGHTS[field])
+            for term in team_terms.get(element.get('team'), ()):
+                add(term, element['id'], FIELD_WEIGHTS["team"])
+
+        self.postings = postings
+        self.terms = sorted(postings)
+        self.variants: Dict[str, Set[str]] = {}
+        for term in self.terms:
+            for end in range(FUZZY_MIN_LENGTH, len(term) + 1):
+                prefix = term[:end]
+                for variant in _deletions(prefix) | {prefix}:
+                    self.variants.setdefault(variant, set()).add(term)
+
+    def prefixed(self, query_term: str) -> List[str]:
+        start = bisect.bisect_left(self.terms, query_term)
+        end = bisect.bisect_left(self.terms, query_term + "\uffff")
+        return self.terms[start:end]
+
+    def near(self, query_term: str) -> Set[str]:
+        """Terms with a prefix within one edit of ``query_term``."""
+        if len(query_term) < FUZZY_MIN_LENGTH:
+            return set()
+        found: Set[str] = set()
+        for variant in _deletions(query_term) | {query_term}:
+            found |= self.variants.get(variant, set())
+        return found
+
+    def match(self, query_term: str) -> Dict[int, float]:
+        """Player id -> best score of ``query_term`` against that player's terms."""
+        scores: Dict[int, float] = {}
+
+        def credit(term: str, score: float):
+            for player_id, weight in self.postings[term].items():
+                if score * weight > scores.get(player_id, 0.0):
+                    scores[player_id] = score * weight
+
+        for term in self.prefixed(query_term):
+            credit(term, EXACT_SCORE if term == query_term else PREFIX_SCORE)
+        for term in self.near(query_term):
+            credit(term, FUZZY_SCORE)
+        return scores
+
+
+def _names_signature(bootstrap: Dict[str, Any]) -> str:
+    digest = hashlib.sha1()
+    for element in bootstrap['elements']:
+        digest.update(f"{element['id']}|{element.get('team')}|{element.get('web_name')}|{element.get('first_name')}|{element.get('second_name')}\n".encode())
+    for team in bootstrap['teams']:
+        digest.update(f"{team['id']}|{team.get('short_name')}|{team.get('name')}\n".encode())
+    return digest.hexdigest()
+
+
+class PlayerIndex:
+    """A bootstrap version's players (by id) and the name index for it."""
+
+    def __init__(self, bootstrap: Dict[str, Any], names: NameIndex):
+        self.names = names
+        self.players: Dict[int, Dict[str, Any]] = {element['id']: element for element in bootstrap['elements']}
+        self.teams = {team['id']: team for team in bootstrap['teams']}
+        self.positions = {position['id']: position['singular_name_short'] for position in bootstrap.get('element_types', [])}
+
+    def result(self, player: Dict[str, Any], score: float) -> Dict[str, Any]:
+        team = self.teams.get(player.get('team'), {})
+        return {
+            **player,
+            "teamShortName": team.get('short_name'),
+            "teamName": team.get('name'),
+            "position": self.positions.get(player.get('element_type')),
+            "score": round(score, 1),
+        }
+
+    def search(
+        self,
+        query: str,
+        position: Optional[int] = None,
+        min_cost: Optional[int] = None,
+        max_cost: Optional[int] = None,
+        limit: int = 10,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """(number of matches, best ``limit`` matches) for ``query``; costs are in tenths of a million.
+
+        Every query word has to match a player. Results are ranked by match
+        score, then by ownership.
+        """
+        scores: Optional[Dict[int, float]] = None
+        for query_term in normalize(query).split():
+            term_scores = self.names.match(query_term)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {player_id: score + term_scores[player_id] for player_id, score in scores.items() if player_id in term_scores}
+            if not scores:
+                return 0, []
+        if scores is None:
+            # No query: every player matches equally
+            scores = dict.fromkeys(self.players, 0.0)
+
+        def keep(player: Dict[str, Any]) -> bool:
+            if position is not None and player.get('element_type') != position:
+                return False
+            cost = player.get('now_cost', 0)
+            return (min_cost is None or cost >= min_cost) and (max_cost is None or cost <= max_cost)
+
+        matches: List[Tuple[float, Dict[str, Any]]] = []
+        for player_id, score in scores.items():
+            player = self.players.get(player_id)
+            if player is not None and keep(player):
+                matches.append((score, player))
+        matches.sort(key=lambda match: (-match[0], -float(match[1].get('selected_by_percent') or 0), match[1]['id']))
+        return len(matches), [self.result(player, score) for score, player in matches[:limit]]
+
+
+_index_lock = threading.Lock()
+# (bootstrap payload, its index) and (names signature, name index)
+_current: Optional[Tuple[Dict[str, Any], PlayerIndex]] = None
+_names: Optional[Tuple[str, NameIndex]] = None
+
+
+def get_player_index() -> PlayerIndex:
+    """The index for the current bootstrap payload; its name index is reused until a name changes."""
+    global _current, _names
+    bootstrap = get_bootstrap()
+    current = _current
+    if current is not None and current[0] is bootstrap:
+        return current[1]
+    with _index_lock:
+        if _current is not None and _current[0] is bootstrap:
+            return _current[1]
+        signature = _names_signature(bootstrap)
+        if _names is None or _names[0] != signature:
+            _names = (signature, NameIndex(bootstrap['elements'], bootstrap['teams']))
+        index = PlayerIndex(bootstrap, _names[1])
+        _current = (bootstrap, index)
+        return index
+
+
+def search_players(
+    query: str,
+    position: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = 10,
+) -> Dict[str, Any]:
+    """Ranked players matching ``query``; prices are in millions (``now_cost / 10``)."""
+    total, results = get_player_index().search(
+        query,
+        position=position,
+        min_cost=round(min_price * 10) if min_price is not None else None,
+        max_cost=round(max_price * 10) if max_price is not None else None,
+        limit=min(limit, SEARCH_MAX_RESULTS),
+    )
+    return {"query": query, "total": total, "results": results}
@@ -0,0 +1,253 @@
+"""Opt-in, per-request profiling.
+
+A request is profiled only when it carries the secret from ``PROFILE_TOKEN``,
+either in the ``X-Profile-Token`` header or the ``__profile`` query parameter.
+When ``PROFILE_TOKEN`` is unset profiling is disabled entirely and the
+middleware is a pass-through.
+
+Reports are kept in a small in-memory ring buffer (one per worker) and exposed
+through the ``/debug/profiles`` routes. The response of a profiled request
+carries an ``X-Profile-Id`` header pointing at its report.
+"""
+import asyncio
+import cProfile
+import contextvars
+import functools
+import hmac
+import inspect
+import io
+import itertools
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_HEADER = "x-profile-token"
+PROFILE_QUERY_PARAM = "__profile"
+MAX_STORED_PROFILES = int(os.getenv("PROFILE_MAX_STORED", "20"))
+TOP_FUNCTIONS = 25
+
+# Substrings of pstats function labels used to bucket self time in a report
+_UPSTREAM_IO_MARKERS = (
+    "/requests/", "/urllib3/", "/http/client.py", "/socket.py", "/ssl.py",
+    "'_socket.socket' objects", "'_ssl._SSLSocket' objects", "_socket.getaddrinfo",
+)
+_JSON_MARKERS = ("/json/", "_json.", "/fastapi/encoders.py")
+# Time the event loop spends parked in select() waiting on other work
+_WAIT_MARKERS = ("/selectors.py", "'select.epoll' objects", "'select.kqueue' objects")
+
+_active_profile = contextvars.ContextVar("active_profile", default=None)
+_profile_ids = itertools.count(1)
+_stored_profiles: Deque[Dict[str, Any]] = deque(maxlen=MAX_STORED_PROFILES)
+_stored_lock = threading.Lock()
+# cProfile allows one active profiler per thread, so only one request at a time
+# is profiled on the event loop thread; concurrent opt-ins are served unprofiled.
+_loop_profile_lock = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    return bool(PROFILE_TOKEN)
+
+
+def token_matches(candidate: Optional[str]) -> bool:
+    if not PROFILE_TOKEN or not candidate:
+        return False
+    return hmac.compare_digest(candidate.encode(), PROFILE_TOKEN.encode())
+
+
+class RequestProfile:
+    """Collects cProfile data for a single request across the threads it runs on."""
+
+    def __init__(self, method: str, path: str):
+        self.id = next(_profile_ids)
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.wall_time = 0.0
+        self.status_code: Optional[int] = None
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def add(self, profile: cProfile.Profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return self._summary(_empty_breakdown(), [])
+
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profile in profiles[1:]:
+            stats.add(profile)
+
+        breakdown = _empty_breakdown()
+        rows = []
+        for func, (_, ncalls, tottime, cumtime, _) in stats.stats.items():  # type: ignore[attr-defined]
+            label = _function_label(func)
+            breakdown[_categorize(label)] += tottime
+            rows.append({
+                "function": label,
+                "calls": ncalls,
+                "self_time": round(tottime, 6),
+                "cumulative_time": round(cumtime, 6),
+            })
+        rows.sort(key=lambda r: r["cumulative_time"], reverse=True)
+        return self._summary(breakdown, rows[:TOP_FUNCTIONS])
+
+    def _summary(self, breakdown: Dict[str, float], top: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "wall_time": round(self.wall_time, 6),
+            "breakdown": {key: round(value, 6) for key, value in breakdown.items()},
+            "top_functions": top,
+        }
+
+
+def _function_label(func: Tuple[str, int, str]) -> str:
+    """``file:line(name)`` for a pstats function key, formatted as pstats prints it (``{name}`` for built-ins)."""
+    filename, line, name = func
+    if filename == "~":
+        if name.startswith("<") and name.endswith(">"):
+            return "{%s}" % name[1:-1]
+        return name
+    return f"{filename}:{line}({name})"
+
+
+def _empty_breakdown() -> Dict[str, float]:
+    return {"upstream_io": 0.0, "json": 0.0, "python": 0.0, "loop_wait": 0.0}
+
+
+def _categorize(label: str) -> str:
+    if any(marker in label for marker in _UPSTREAM_IO_MARKERS):
+        return "upstream_io"
+    if any(marker in label for marker in _JSON_MARKERS):
+        return "json"
+    if any(marker in label for marker in _WAIT_MARKERS):
+        return "loop_wait"
+    return "python"
+
+
+@contextmanager
+def profiled():
+    """Profile the current thread if the current request opted in to profiling."""
+    request_profile = _active_profile.get()
+    if request_profile is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        request_profile.add(profile)
+
+
+def store_profile(request_profile: RequestProfile):
+    report = request_profile.report()
+    with _stored_lock:
+        _stored_profiles.append(report)
+    logger.info(
+        f"Stored profile {report['id']} for {report['method']} {report['path']} "
+        f"({report['wall_time']:.3f}s)"
+    )
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    with _stored_lock:
+        reports = list(_stored_profiles)
+    return [
+        {key: report[key] for key in ("id", "method", "path", "status_code", "started_at", "wall_time", "breakdown")}
+        for report in reversed(reports)
+    ]
+
+
+def get_profile(profile_id: int) -> Optional[Dict[str, Any]]:
+    with _stored_lock:
+        return next((report for report in _stored_profiles if report["id"] == profile_id), None)
+
+
+def _requested_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER.encode():
+            return value.decode("latin-1")
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    values = query.get(PROFILE_QUERY_PARAM)
+    return values[0] if values else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests carrying the profiling secret.
+
+    The event loop thread is profiled for the lifetime of the request, which
+    covers async endpoints, middleware and response serialisation. Sync
+    endpoints run in the threadpool and are profiled by :class:`ProfiledRoute`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_enabled() or not token_matches(_requested_token(scope)):
+            await self.app(scope, receive, send)
+            return
+        if not _loop_profile_lock.acquire(blocking=False):
+            logger.info(f"Profiler busy, serving {scope.get('path')} unprofiled")
+            await self.app(scope, receive, send)
+            return
+
+        request_profile = RequestProfile(scope.get("method", ""), scope.get("path", ""))
+        token = _active_profile.set(request_profile)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                request_profile.status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(request_profile.id).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            with profiled():
+                await self.app(scope, receive, send_with_profile_id)
+        finally:
+            request_profile.wall_time = time.perf_counter() - start
+            _active_profile.reset(token)
+            _loop_profile_lock.release()
+            store_profile(request_profile)
+
+
+def _profile_sync_endpoint(endpoint: Callable) -> Callable:
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with profiled():
+            return endpoint(*args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that profiles sync endpoints inside the threadpool worker."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        is_async = asyncio.iscoroutinefunction(endpoint) or inspect.iscoroutinefunction(endpoint)
+        if profiling_enabled() and not is_async:
+            endpoint = _profile_sync_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
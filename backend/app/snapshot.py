@@ -0,0 +1,365 @@
+"""Memory-mapped snapshot of the bootstrap and fixtures indexes.
+
+Workers map ``SNAPSHOT_PATH`` at startup and answer player, team, event and
+fixture lookups straight from the mapping, without downloading or parsing
+bootstrap first. A background thread rebuilds the snapshot from upstream
+(through the shared cache) and atomically replaces the file; other workers
+pick the new file up on their next refresh.
+
+File layout (little endian)::
+
+    header    magic "FPLSNAP\\0", format version, section count, built_at, source hash
+    sections  (name, offset, count, record size) for each section
+    tables    fixed-size records, sorted by id; strings are (offset, length)
+              references into the "strings" section
+
+``fixtures`` are sorted by gameweek and ``fxevents`` holds each gameweek's
+(start, count) slice of them. The source hash identifies the bootstrap and
+fixtures content the snapshot was built from, so derived indexes can be
+rebuilt only when it changes.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .cache import CACHE_DIR
+from .upstream import get_bootstrap, get_fixtures
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FPLSNAP\0"
+FORMAT_VERSION = 2
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(CACHE_DIR, "reference.snap"))
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "60"))
+
+_HEADER = struct.Struct("<8sHHdQ")
+_SECTION = struct.Struct("<8sQII")
+_STRING_REF = "IH"
+
+# Table schemas: (field, struct code). "s" is a string reference; "h" fields
+# store None as -1.
+TABLES: Dict[str, Sequence[Tuple[str, str]]] = {
+    "teams": (
+        ("id", "H"), ("code", "H"), ("strength", "B"), ("name", "s"), ("short_name", "s"),
+    ),
+    "players": (
+        ("id", "H"), ("team", "H"), ("element_type", "B"), ("now_cost", "H"), ("total_points", "i"),
+        ("selected_by_percent", "d"), ("form", "d"), ("status", "s"), ("web_name", "s"),
+        ("first_name", "s"), ("second_name", "s"),
+    ),
+    "events": (
+        ("id", "H"), ("finished", "?"), ("data_checked", "?"), ("is_previous", "?"), ("is_current", "?"),
+        ("is_next", "?"), ("name", "s"), ("deadline_time", "s"),
+    ),
+    "fixtures": (
+        ("id", "H"), ("event", "h"), ("team_h", "H"), ("team_a", "H"), ("team_h_difficulty", "B"),
+        ("team_a_difficulty", "B"), ("team_h_score", "h"), ("team_a_score", "h"), ("started", "?"),
+        ("finished", "?"), ("finished_provisional", "?"), ("kickoff_time", "s"),
+    ),
+    "fxevents": (("event", "h"), ("start", "I"), ("count", "I")),
+}
+
+
+class _Table:
+    def __init__(self, name: str, buffer, offset: int, count: int, strings: "_Strings"):
+        self.name = name
+        self.fields = TABLES[name]
+        self.struct = _table_struct(self.fields)
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.strings = strings
+        self._id_struct = struct.Struct("<" + self.fields[0][1])
+
+    def row(self, index: int) -> Dict[str, Any]:
+        values = iter(self.struct.unpack_from(self.buffer, self.offset + index * self.struct.size))
+        row: Dict[str, Any] = {}
+        for field, code in self.fields:
+            if code == "s":
+                row[field] = self.strings.get(next(values), next(values))
+            else:
+                value = next(values)
+                row[field] = None if code == "h" and value == -1 else value
+        return row
+
+    def find(self, record_id: int) -> Optional[int]:
+        """Binary search on the leading id field."""
+        low, high = 0, self.count - 1
+        while low <= high:
+            mid = (low + high) // 2
+            (value,) = self._id_struct.unpack_from(self.buffer, self.offset + mid * self.struct.size)
+            if value == record_id:
+                return mid
+            if value < record_id:
+                low = mid + 1
+            else:
+                high = mid - 1
+        return None
+
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        index = self.find(record_id)
+        return None if index is None else self.row(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.row(i) for i in range(self.count))
+
+
+class _Strings:
+    def __init__(self, buffer, offset: int, length: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.length = length
+
+    def get(self, offset: int, length: int) -> str:
+        start = self.offset + offset
+        return bytes(self.buffer[start:start + length]).decode("utf-8")
+
+
+class Snapshot:
+    """Read-only view over an encoded snapshot (an mmap or bytes)."""
+
+    def __init__(self, buffer, path: Optional[str] = None, mtime: float = 0.0):
+        magic, version, section_count, built_at, source_hash = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an FPL snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {version}")
+        self.buffer = buffer
+        self.path = path
+        self.mtime = mtime
+        self.built_at = built_at
+        self.source_hash = f"{source_hash:016x}"
+
+        sections = {}
+        for i in range(section_count):
+            name, offset, count, _ = _SECTION.unpack_from(buffer, _HEADER.size + i * _SECTION.size)
+            sections[name.rstrip(b"\0").decode()] = (offset, count)
+        strings_offset, strings_length = sections["strings"]
+        self._strings = _Strings(buffer, strings_offset, strings_length)
+        self._tables = {
+            name: _Table(name, buffer, *sections[name], self._strings) for name in TABLES
+        }
+
+    def team(self, team_id: int) -> Optional[Dict[str, Any]]:
+        return self._tables["teams"].get(team_id)
+
+    def player(self, player_id: int) -> Optional[Dict[str, Any]]:
+        return self._tables["players"].get(player_id)
+
+    def event(self, event_id: int) -> Optional[Dict[str, Any]]:
+        return self._tables["events"].get(event_id)
+
+    def teams(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._tables["teams"])
+
+    def players(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._tables["players"])
+
+    def events(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._tables["events"])
+
+    def current_event(self) -> Optional[Dict[str, Any]]:
+        return next((event for event in self.events() if event["is_current"]), None)
+
+    def next_event(self) -> Optional[Dict[str, Any]]:
+        return next((event for event in self.events() if event["is_next"]), None)
+
+    def fixtures(self, event: Optional[int] = None) -> List[Dict[str, Any]]:
+        table = self._tables["fixtures"]
+        if event is None:
+            return list(table)
+        fxevents = self._tables["fxevents"]
+        index = fxevents.find(event)
+        if index is None:
+            return []
+        entry = fxevents.row(index)
+        return [table.row(i) for i in range(entry["start"], entry["start"] + entry["count"])]
+
+
+def _table_struct(fields: Sequence[Tuple[str, str]]) -> struct.Struct:
+    return struct.Struct("<" + "".join(_STRING_REF if code == "s" else code for _, code in fields))
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_snapshot(bootstrap: Dict[str, Any], fixtures: List[Dict[str, Any]], built_at: Optional[float] = None) -> bytes:
+    """Encode the bootstrap and fixtures payloads into snapshot bytes."""
+    string_heap = bytearray()
+    string_refs: Dict[str, Tuple[int, int]] = {}
+
+    def encode_table(name: str, rows: List[Dict[str, Any]]) -> bytes:
+        fields = TABLES[name]
+        table_struct = _table_struct(fields)
+        out = bytearray()
+        for row in rows:
+            values: List[Any] = []
+            for field, code in fields:
+                value = row.get(field)
+                if code == "s":
+                    text = value or ""
+                    if text not in string_refs:
+                        encoded = text.encode("utf-8")
+                        string_refs[text] = (len(string_heap), len(encoded))
+                        string_heap.extend(encoded)
+                    values.extend(string_refs[text])
+                elif code == "d":
+                    values.append(_as_float(value))
+                elif code == "?":
+                    values.append(bool(value))
+                elif code == "h" and value is None:
+                    values.append(-1)
+                else:
+                    values.append(value or 0)
+            out.extend(table_struct.pack(*values))
+        return bytes(out)
+
+    # Stable sort: keeps the upstream (kickoff) order within each gameweek
+    sorted_fixtures = sorted(fixtures, key=lambda f: (f.get("event") is None, f.get("event") or 0))
+    fxevents: List[Dict[str, Any]] = []
+    for index, fixture in enumerate(sorted_fixtures):
+        event = fixture.get("event")
+        if event is None:
+            continue
+        if fxevents and fxevents[-1]["event"] == event:
+            fxevents[-1]["count"] += 1
+        else:
+            fxevents.append({"event": event, "start": index, "count": 1})
+
+    tables = {
+        "teams": (encode_table("teams", sorted(bootstrap["teams"], key=lambda t: t["id"])), len(bootstrap["teams"])),
+        "players": (encode_table("players", sorted(bootstrap["elements"], key=lambda e: e["id"])), len(bootstrap["elements"])),
+        "events": (encode_table("events", sorted(bootstrap["events"], key=lambda e: e["id"])), len(bootstrap["events"])),
+        "fixtures": (encode_table("fixtures", sorted_fixtures), len(sorted_fixtures)),
+        "fxevents": (encode_table("fxevents", fxevents), len(fxevents)),
+    }
+    tables["strings"] = (bytes(string_heap), len(string_heap))
+
+    digest = hashlib.sha1()
+    for name in sorted(tables):
+        digest.update(name.encode())
+        digest.update(tables[name][0])
+    source_hash = int.from_bytes(digest.digest()[:8], "little")
+
+    offset = _HEADER.size + _SECTION.size * len(tables)
+    directory, body = bytearray(), bytearray()
+    for name, (data, count) in tables.items():
+        record_size = _table_struct(TABLES[name]).size if name in TABLES else 1
+        directory.extend(_SECTION.pack(name.encode(), offset + len(body), count, record_size))
+        body.extend(data)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(tables), time.time() if built_at is None else built_at, source_hash)
+    return bytes(header + directory + body)
+
+
+def load_snapshot(path: str) -> Optional[Snapshot]:
+    """Map the snapshot at ``path``; returns None if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            mtime = os.fstat(f.fileno()).st_mtime
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return Snapshot(mapping, path, mtime)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def write_snapshot(path: str, data: bytes):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # Workers that mapped the previous file keep reading it until they remap
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+_current: Optional[Snapshot] = None
+_current_lock = threading.Lock()
+_refresh_thread: Optional[threading.Thread] = None
+
+
+def refresh_snapshot() -> Snapshot:
+    """Adopt a fresher snapshot written by another worker, or rebuild from upstream."""
+    global _current
+    current = _current
+    if current is not None and time.time() - current.built_at < SNAPSHOT_REFRESH_INTERVAL:
+        return current
+    try:
+        disk_mtime = os.stat(SNAPSHOT_PATH).st_mtime
+    except FileNotFoundError:
+        disk_mtime = None
+    if disk_mtime is not None and (current is None or disk_mtime > current.mtime):
+        loaded = load_snapshot(SNAPSHOT_PATH)
+        if loaded is not None and time.time() - loaded.built_at < SNAPSHOT_REFRESH_INTERVAL:
+            with _current_lock:
+                _current = loaded
+            return loaded
+
+    data = build_snapshot(get_bootstrap(), get_fixtures())
+    # Rewrite even if unchanged, so the fresh built_at lets other workers adopt it
+    write_snapshot(SNAPSHOT_PATH, data)
+    loaded = load_snapshot(SNAPSHOT_PATH) or Snapshot(data)
+    with _current_lock:
+        _current = loaded
+    if current is None or current.source_hash != loaded.source_hash:
+        logger.info(f"Rebuilt reference snapshot {loaded.source_hash}")
+    return loaded
+
+
+def get_snapshot() -> Snapshot:
+    """The current snapshot: the mapped file if there is one, else built synchronously."""
+    global _current
+    if _current is not None:
+        return _current
+    with _current_lock:
+        if _current is None:
+            _current = load_snapshot(SNAPSHOT_PATH)
+    if _current is not None:
+        return _current
+    return refresh_snapshot()
+
+
+def loaded_snapshot() -> Optional[Snapshot]:
+    """The snapshot this worker has already mapped, if any (no I/O, safe on the event loop)."""
+    return _current
+
+
+def _refresh_loop():
+    while True:
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            logger.warning(f"Reference snapshot refresh failed: {e}")
+        time.sleep(SNAPSHOT_REFRESH_INTERVAL)
+
+
+def start_background_refresh():
+    """Map the on-disk snapshot (if any) and keep it fresh from a daemon thread."""
+    global _refresh_thread
+    snapshot = None
+    try:
+        snapshot = get_snapshot()
+    except Exception as e:
+        logger.warning(f"No reference snapshot available yet: {e}")
+    if snapshot is not None:
+        logger.info(f"Serving reference snapshot {snapshot.source_hash} built at {snapshot.built_at:.0f}")
+    if _refresh_thread is None:
+        _refresh_thread = threading.Thread(target=_refresh_loop, name="snapshot-refresh", daemon=True)
+        _refresh_thread.start()
@@ -0,0 +1,277 @@
+"""Transfers ledger for league entries.
+
+Upstream only serves an entry's transfers as the whole season's list, so
+showing one gameweek's transfers for a league meant downloading every
+entry's full history on every view. The ledger keeps them in the database
+instead:
+
+* ``entry_gameweek_transfers`` holds each entry's transfer count and hit cost
+  per gameweek; the latest gameweek stored is the entry's watermark.
+* ``entry_transfers`` holds the individual transfers.
+
+A sync reads the entry's stored history (see :mod:`app.entry_history`) for
+the gameweeks past its watermark and only downloads the transfers list when
+one of those gameweeks had transfers, appending just the rows for those
+gameweeks. Reads sync stale entries first and then aggregate in SQL.
+
+The ledger stops at the current gameweek. Transfers already made for the
+next one can still be changed before its deadline, so an entry's transfers
+list takes those from upstream.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+import requests
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import entry_history, models
+from .snapshot import get_snapshot
+from .upstream import ENTRY_TTL, UpstreamPool, get_json, league_standings
+
+logger = logging.getLogger(__name__)
+
+# Upstream fetches for a league's stale entries run concurrently; database writes stay on the caller's session
+SYNC_FETCH_WORKERS = 8
+
+MOST_TRANSFERRED_LIMIT = 10
+
+
+def league_entries(league_id: int) -> List[Dict[str, Any]]:
+    """The league's standings rows (entry, entry_name, player_name, ...)."""
+    return [row for row in league_standings(league_id) if row.get('entry')]
+
+
+def synced_events(db: Session, entry_ids: List[int]) -> Dict[int, int]:
+    """Entry id -> latest gameweek in the ledger (0 when never synced)."""
+    rows = (
+        db.query(models.EntryGameweekTransfers.entry_id, func.max(models.EntryGameweekTransfers.event))
+        .filter(models.EntryGameweekTransfers.entry_id.in_(entry_ids))
+        .group_by(models.EntryGameweekTransfers.entry_id)
+        .all()
+    )
+    watermarks = {entry_id: 0 for entry_id in entry_ids}
+    watermarks.update({entry_id: event for entry_id, event in rows})
+    return watermarks
+
+
+def sync_entries(db: Session, entry_ids: List[int], up_to_event: Optional[int] = None) -> int:
+    """Bring the ledger for ``entry_ids`` up to ``up_to_event`` (default: the current gameweek).
+
+    Returns the number of transfers appended.
+    """
+    if up_to_event is None:
+        current_gw = get_snapshot().current_event()
+        if not current_gw:
+            return 0
+        up_to_event = current_gw['id']
+
+    watermarks = synced_events(db, entry_ids)
+    stale = [entry_id for entry_id, watermark in watermarks.items() if watermark < up_to_event]
+    if not stale:
+        return 0
+
+    entry_history.sync_entries(db, stale)
+    history_rows: Dict[int, List[models.EntryHistory]] = {entry_id: [] for entry_id in stale}
+    for row in (
+        db.query(models.EntryHistory)
+        .filter(models.EntryHistory.entry_id.in_(stale), models.EntryHistory.event <= up_to_event)
+        .order_by(models.EntryHistory.event)
+    ):
+        if row.event > watermarks[row.entry_id]:
+            history_rows[row.entry_id].append(row)
+
+    def fetch(entry_id: int):
+        # Only entries that made transfers since their watermark need the season's list
+        new_events = {row.event for row in history_rows[entry_id] if row.event_transfers}
+        if not new_events:
+            return entry_id, []
+        try:
+            transfers = get_json(f"entry/{entry_id}/transfers/")
+        except Exception as e:
+            logger.warning(f"Could not sync transfers for entry {entry_id}: {e}")
+            return entry_id, None
+        return entry_id, [transfer for transfer in transfers if transfer['event'] in new_events]
+
+    with UpstreamPool(max_workers=SYNC_FETCH_WORKERS) as pool:
+        fetched = list(pool.map(fetch, [entry_id for entry_id in stale if history_rows[entry_id]]))
+
+    appended = 0
+    for entry_id, transfers in fetched:
+        if transfers is None:
+            continue
+        db.add_all(
+            models.EntryGameweekTransfers(
+                entry_id=entry_id,
+                event=row.event,
+                transfers=row.event_transfers,
+                transfers_cost=row.event_transfers_cost,
+            )
+            for row in history_rows[entry_id]
+        )
+        db.add_all(
+            models.EntryTransfer(
+                entry_id=entry_id,
+                event=transfer['event'],
+                element_in=transfer['element_in'],
+                element_in_cost=transfer['element_in_cost'],
+                element_out=transfer['element_out'],
+                element_out_cost=transfer['element_out_cost'],
+                time=transfer['time'],
+            )
+            for transfer in transfers
+        )
+        try:
+            db.commit()
+            appended += len(transfers)
+        except IntegrityError:
+            # Another worker synced the same gameweeks first
+            db.rollback()
+            logger.info(f"Transfers for entry {entry_id} already synced by another worker")
+    if appended:
+        logger.info(f"Appended {appended} transfers for {len(stale)} entries up to event {up_to_event}")
+    return appended
+
+
+def _player_name(snapshot, element_id: int) -> str:
+    player = snapshot.player(element_id)
+    return player['web_name'] if player else 'Unknown'
+
+
+def _transfer_row(transfer: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "element_in": transfer['element_in'],
+        "element_in_cost": transfer['element_in_cost'],
+        "element_out": transfer['element_out'],
+        "element_out_cost": transfer['element_out_cost'],
+        "entry": transfer['entry'],
+        "event": transfer['event'],
+        "time": transfer['time'],
+    }
+
+
+def pending_transfers(entry_id: int) -> List[Dict[str, Any]]:
+    """Transfers already made for the next gameweek, newest first.
+
+    They can still change until its deadline, so they are read from upstream
+    (cached for ``ENTRY_TTL``) rather than stored in the ledger.
+    """
+    upcoming = get_snapshot().next_event()
+    if not upcoming:
+        return []
+    transfers = get_json(f"entry/{entry_id}/transfers/", ttl=ENTRY_TTL)
+    pending = [_transfer_row(transfer) for transfer in transfers if transfer['event'] >= upcoming['id']]
+    return sorted(pending, key=lambda transfer: (transfer['event'], transfer['time']), reverse=True)
+
+
+def entry_transfers(db: Session, entry_id: int, event: Optional[int] = None) -> List[Dict[str, Any]]:
+    """An entry's transfers, newest first, in upstream's ``entry/{id}/transfers/`` shape.
+
+    Completed gameweeks come from the ledger; transfers for the next
+    gameweek come from :func:`pending_transfers`.
+    """
+    sync_entries(db, [entry_id])
+    query = db.query(models.EntryTransfer).filter(models.EntryTransfer.entry_id == entry_id)
+    if event is not None:
+        query = query.filter(models.EntryTransfer.event == event)
+    stored = [
+        {
+            "element_in": transfer.element_in,
+            "element_in_cost": transfer.element_in_cost,
+            "element_out": transfer.element_out,
+            "element_out_cost": transfer.element_out_cost,
+            "entry": transfer.entry_id,
+            "event": transfer.event,
+            "time": transfer.time,
+        }
+        for transfer in query.order_by(models.EntryTransfer.event.desc(), models.EntryTransfer.time.desc()).all()
+    ]
+
+    current_gw = get_snapshot().current_event()
+    if event is not None and current_gw and event <= current_gw['id']:
+        return stored
+    try:
+        pending = pending_transfers(entry_id)
+    except requests.RequestException as e:
+        logger.warning(f"Could not fetch pending transfers for entry {entry_id}: {e}")
+        return stored
+    if event is not None:
+        pending = [transfer for transfer in pending if transfer['event'] == event]
+    return pending + stored
+
+
+def league_transfers(db: Session, league_id: int, event: int) -> List[Dict[str, Any]]:
+    """Every transfer made by the league's entries in ``event``, sorted by manager."""
+    entries = {row['entry']: row for row in league_entries(league_id)}
+    sync_entries(db, list(entries))
+    snapshot = get_snapshot()
+    transfers = (
+        db.query(models.EntryTransfer)
+        .filter(models.EntryTransfer.entry_id.in_(list(entries)), models.EntryTransfer.event == event)
+        .all()
+    )
+    results = [
+        {
+            "entry": transfer.entry_id,
+            "event": transfer.event,
+            "time": transfer.time,
+            "element_in": transfer.element_in,
+            "element_in_name": _player_name(snapshot, transfer.element_in),
+            "element_in_cost": transfer.element_in_cost,
+            "element_out": transfer.element_out,
+            "element_out_name": _player_name(snapshot, transfer.element_out),
+            "element_out_cost": transfer.element_out_cost,
+            "manager_name": entries[transfer.entry_id]['player_name'],
+            "team_name": entries[transfer.entry_id]['entry_name'],
+        }
+        for transfer in transfers
+    ]
+    results.sort(key=lambda transfer: (transfer['manager_name'], transfer['time']))
+    return results
+
+
+def league_transfer_summary(db: Session, league_id: int, event: Optional[int] = None) -> Dict[str, Any]:
+    """Most transferred in/out players and hits taken across the league, for one gameweek or the season."""
+    entries = {row['entry']: row for row in league_entries(league_id)}
+    entry_ids = list(entries)
+    sync_entries(db, entry_ids)
+    snapshot = get_snapshot()
+
+    def most_transferred(column):
+        query = (
+            db.query(column, func.count().label('count'))
+            .filter(models.EntryTransfer.entry_id.in_(entry_ids))
+        )
+        if event is not None:
+            query = query.filter(models.EntryTransfer.event == event)
+        rows = query.group_by(column).order_by(func.count().desc(), column).limit(MOST_TRANSFERRED_LIMIT).all()
+        return [{"element": element_id, "name": _player_name(snapshot, element_id), "count": count} for element_id, count in rows]
+
+    totals = db.query(
+        models.EntryGameweekTransfers.entry_id,
+        func.sum(models.EntryGameweekTransfers.transfers),
+        func.sum(models.EntryGameweekTransfers.transfers_cost),
+    ).filter(models.EntryGameweekTransfers.entry_id.in_(entry_ids))
+    if event is not None:
+        totals = totals.filter(models.EntryGameweekTransfers.event == event)
+    by_entry = [
+        {
+            "entry": entry_id,
+            "manager_name": entries[entry_id]['player_name'],
+            "team_name": entries[entry_id]['entry_name'],
+            "transfers": int(transfers or 0),
+            "hits_cost": int(cost or 0),
+        }
+        for entry_id, transfers, cost in totals.group_by(models.EntryGameweekTransfers.entry_id).all()
+    ]
+    by_entry.sort(key=lambda row: (-row['hits_cost'], -row['transfers'], row['manager_name']))
+
+    return {
+        "event": event,
+        "most_transferred_in": most_transferred(models.EntryTransfer.element_in),
+        "most_transferred_out": most_transferred(models.EntryTransfer.element_out),
+        "managers": by_entry,
+        "total_transfers": sum(row['transfers'] for row in by_entry),
+        "total_hits_cost": sum(row['hits_cost'] for row in by_entry),
+    }
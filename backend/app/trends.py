@@ -0,0 +1,323 @@
+"""Player price and ownership history.
+
+Bootstrap only has the current ``now_cost``, ``selected_by_percent``,
+transfers and form. A background job records them every
+``TRENDS_SNAPSHOT_INTERVAL`` seconds into an append-only columnar store
+under ``TRENDS_DIR``, which must be on persistent storage for the history
+to outlive a deploy (the default, under ``CACHE_DIR``, is only for local runs):
+
+* ``times.f8`` and ``events.i2``: one value per snapshot (unix time, current gameweek).
+* ``<column>.<type>``: one fixed-width row per snapshot, with the value for
+  element id ``i`` at position ``i``. Elements missing from a snapshot hold
+  -1 (integers) or NaN (floats).
+
+Rows are written to the column files first and then committed by appending
+to ``times.f8``, so readers only see complete rows. Readers memory-map the
+files: a time range is a binary search over ``times.f8``, and queries read
+just the rows (or the single element's cells) they need. They never load
+the whole history.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import CACHE_DIR
+from .snapshot import get_snapshot
+from .upstream import get_bootstrap
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+TRENDS_DIR = os.getenv("TRENDS_DIR", os.path.join(CACHE_DIR, "trends"))
+TRENDS_SNAPSHOT_INTERVAL = float(os.getenv("TRENDS_SNAPSHOT_INTERVAL", "3600"))
+# Element ids are indexes into each row, so the width caps the largest id recorded
+TRENDS_WIDTH = 1024
+TRENDS_DEFAULT_RANGE = 7 * 24 * 3600
+# Rows read at a time when scanning a range for price changes
+SCAN_CHUNK_ROWS = 256
+FORMAT_VERSION = 1
+
+COLUMNS: Dict[str, str] = {
+    "now_cost": "<i2",
+    "selected_by_percent": "<f4",
+    "transfers_in_event": "<i4",
+    "transfers_out_event": "<i4",
+    "form": "<f4",
+}
+
+
+def _missing(dtype: np.dtype):
+    return np.nan if dtype.kind == "f" else -1
+
+
+def _value(value):
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else round(float(value), 2)
+    return None if value < 0 else int(value)
+
+
+class TrendStore:
+    """Append-only columnar snapshots of per-element values (see module docstring)."""
+
+    def __init__(self, directory: str, width: int = TRENDS_WIDTH):
+        self.directory = directory
+        self.width = width
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        meta = {"version": FORMAT_VERSION, "width": width, "columns": COLUMNS}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                existing = json.load(f)
+            if existing != meta:
+                raise ValueError(f"Trend store at {directory} has a different layout: {existing}")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+
+    def _path(self, name: str, dtype: str) -> str:
+        return os.path.join(self.directory, f"{name}.{dtype[1:]}")
+
+    def __len__(self) -> int:
+        try:
+            return os.path.getsize(self._path("times", "<f8")) // 8
+        except FileNotFoundError:
+            return 0
+
+    def times(self) -> np.ndarray:
+        rows = len(self)
+        if not rows:
+            return np.empty(0, dtype="<f8")
+        return np.memmap(self._path("times", "<f8"), dtype="<f8", mode="r", shape=(rows,))
+
+    def events(self) -> np.ndarray:
+        rows = len(self)
+        if not rows:
+            return np.empty(0, dtype="<i2")
+        return np.memmap(self._path("events", "<i2"), dtype="<i2", mode="r", shape=(rows,))
+
+    def column(self, name: str) -> np.ndarray:
+        """The column as a (snapshots, width) array backed by the file."""
+        dtype = COLUMNS[name]
+        rows = len(self)
+        if not rows:
+            return np.empty((0, self.width), dtype=dtype)
+        return np.memmap(self._path(name, dtype), dtype=dtype, mode="r", shape=(rows, self.width))
+
+    def span(self, start: float, end: float) -> Tuple[int, int]:
+        """Row indexes ``[first, last)`` of the snapshots taken between ``start`` and ``end``."""
+        times = self.times()
+        return int(np.searchsorted(times, start, side="left")), int(np.searchsorted(times, end, side="right"))
+
+    @contextmanager
+    def _writer(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_row(self, name: str, dtype: str, row: np.ndarray, index: int):
+        path = self._path(name, dtype)
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            # Overwrites whatever an interrupted append left past the committed rows
+            f.seek(index * row.nbytes)
+            f.write(row.tobytes())
+            f.truncate()
+
+    def append(self, timestamp: float, event: int, elements: List[Dict[str, Any]], min_interval: float = 0) -> bool:
+        """Record one snapshot of ``elements``; skipped (False) if the last one is under ``min_interval`` old."""
+        with self._writer():
+            rows = len(self)
+            if rows and timestamp - float(self.times()[-1]) < min_interval:
+                return False
+            for name, dtype in COLUMNS.items():
+                row = np.full(self.width, _missing(np.dtype(dtype)), dtype=dtype)
+                for element in elements:
+                    if element['id'] < self.width and element.get(name) is not None:
+                        row[element['id']] = float(element[name]) if row.dtype.kind == "f" else int(element[name])
+                self._write_row(name, dtype, row, rows)
+            self._write_row("events", "<i2", np.array([event], dtype="<i2"), rows)
+            self._write_row("times", "<f8", np.array([timestamp], dtype="<f8"), rows)
+        skipped = sum(1 for element in elements if element['id'] >= self.width)
+        if skipped:
+            logger.warning(f"{skipped} elements have ids beyond the trend store width {self.width}")
+        return True
+
+
+_store: Optional[TrendStore] = None
+_store_lock = threading.Lock()
+_recorder_thread: Optional[threading.Thread] = None
+
+
+def get_store() -> TrendStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TrendStore(TRENDS_DIR)
+    return _store
+
+
+def record_snapshot() -> bool:
+    """Append the current bootstrap values, unless another worker recorded one recently."""
+    bootstrap = get_bootstrap()
+    current = next((event for event in bootstrap['events'] if event['is_current']), None)
+    recorded = get_store().append(
+        time.time(),
+        current['id'] if current else 0,
+        bootstrap['elements'],
+        min_interval=TRENDS_SNAPSHOT_INTERVAL / 2,
+    )
+    if recorded:
+        logger.info(f"Recorded trend snapshot {len(get_store())} for {len(bootstrap['elements'])} players")
+    return recorded
+
+
+def _recorder_loop():
+    while True:
+        try:
+            record_snapshot()
+        except Exception as e:
+            logger.warning(f"Trend snapshot failed: {e}")
+        time.sleep(TRENDS_SNAPSHOT_INTERVAL)
+
+
+def start_trend_recorder():
+    """Record a snapshot now and then every ``TRENDS_SNAPSHOT_INTERVAL`` seconds (0 disables) from a daemon thread."""
+    global _recorder_thread
+    if TRENDS_SNAPSHOT_INTERVAL <= 0:
+        return
+    if "TRENDS_DIR" not in os.environ:
+        logger.warning(f"TRENDS_DIR is not set: recording history to {TRENDS_DIR}, which is lost on restart")
+    if _recorder_thread is None:
+        _recorder_thread = threading.Thread(target=_recorder_loop, name="trend-recorder", daemon=True)
+        _recorder_thread.start()
+
+
+def _timestamp(moment: Optional[datetime], default: float) -> float:
+    if moment is None:
+        return default
+    return (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def time_range(start: Optional[datetime], end: Optional[datetime]) -> Tuple[float, float]:
+    """Unix bounds for a query; defaults to the ``TRENDS_DEFAULT_RANGE`` before ``end`` (now)."""
+    end_ts = _timestamp(end, time.time())
+    return _timestamp(start, end_ts - TRENDS_DEFAULT_RANGE), end_ts
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def _player_fields(snapshot, element_id: int) -> Dict[str, Any]:
+    player = snapshot.player(element_id)
+    team = snapshot.team(player['team']) if player else None
+    return {
+        "element": element_id,
+        "web_name": player['web_name'] if player else 'Unknown',
+        "team": team['short_name'] if team else None,
+    }
+
+
+def price_changes(start: float, end: float) -> Dict[str, Any]:
+    """Every ``now_cost`` change between ``start`` and ``end``, grouped by player, biggest net move first."""
+    store = get_store()
+    first, last = store.span(start, end)
+    times = store.times()
+    costs = store.column("now_cost")
+    changes: Dict[int, List[Dict[str, Any]]] = {}
+    # Compare each snapshot in range with the one before it (the first with the last before the range)
+    for chunk_start in range(max(first, 1), last, SCAN_CHUNK_ROWS):
+        chunk_end = min(chunk_start + SCAN_CHUNK_ROWS, last)
+        block = np.asarray(costs[chunk_start - 1:chunk_end])
+        before, after = block[:-1], block[1:]
+        rows, elements = np.nonzero((before != after) & (before >= 0) & (after >= 0))
+        for row, element_id in zip(rows.tolist(), elements.tolist()):
+            changes.setdefault(element_id, []).append({
+                "time": _iso(float(times[chunk_start + row])),
+                "from": int(before[row, element_id]),
+                "to": int(after[row, element_id]),
+            })
+
+    snapshot = get_snapshot()
+    players = []
+    for element_id, moves in changes.items():
+        net = moves[-1]["to"] - moves[0]["from"]
+        players.append({**_player_fields(snapshot, element_id), "start_cost": moves[0]["from"], "end_cost": moves[-1]["to"], "net_change": net, "changes": moves})
+    players.sort(key=lambda player: (-abs(player["net_change"]), -player["net_change"], player["element"]))
+    return {
+        "start": _iso(start),
+        "end": _iso(end),
+        "snapshots": last - first,
+        "risers": sum(1 for player in players if player["net_change"] > 0),
+        "fallers": sum(1 for player in players if player["net_change"] < 0),
+        "players": players,
+    }
+
+
+def ownership_trend(start: float, end: float, limit: int = 20) -> Dict[str, Any]:
+    """Biggest ``selected_by_percent`` risers and fallers between the first and last snapshots in range."""
+    store = get_store()
+    first, last = store.span(start, end)
+    if last - first < 2:
+        return {"start": _iso(start), "end": _iso(end), "snapshots": max(last - first, 0), "risers": [], "fallers": []}
+    times = store.times()
+    ownership = store.column("selected_by_percent")
+    before, after = np.asarray(ownership[first]), np.asarray(ownership[last - 1])
+    delta = after - before
+    valid = np.flatnonzero(~np.isnan(delta))
+    order = valid[np.argsort(delta[valid], kind="stable")]
+
+    snapshot = get_snapshot()
+
+    def describe(element_id: int) -> Dict[str, Any]:
+        return {
+            **_player_fields(snapshot, element_id),
+            "from": _value(before[element_id]),
+            "to": _value(after[element_id]),
+            "change": _value(delta[element_id]),
+        }
+
+    return {
+        "start": _iso(float(times[first])),
+        "end": _iso(float(times[last - 1])),
+        "snapshots": last - first,
+        "risers": [describe(int(element_id)) for element_id in order[::-1][:limit] if delta[element_id] > 0],
+        "fallers": [describe(int(element_id)) for element_id in order[:limit] if delta[element_id] < 0],
+    }
+
+
+def player_trend(element_id: int, start: float, end: float, max_points: int = 200) -> Dict[str, Any]:
+    """One player's recorded values between ``start`` and ``end``, thinned to at most ``max_points``."""
+    store = get_store()
+    if not 0 <= element_id < store.width:
+        raise ValueError(f"Player {element_id} is not tracked")
+    first, last = store.span(start, end)
+    step = max(1, math.ceil((last - first) / max_points))
+    rows = slice(first, last, step)
+    series: Dict[str, Any] = {
+        "time": [_iso(timestamp) for timestamp in store.times()[rows].tolist()],
+        "event": store.events()[rows].tolist(),
+    }
+    for name in COLUMNS:
+        series[name] = [_value(value) for value in store.column(name)[rows, element_id]]
+    return {**_player_fields(get_snapshot(), element_id), "step": step, "series": series}
@@ -0,0 +1,308 @@
+"""Access to the Fantasy Premier League API.
+
+Every upstream call goes through :func:`get_json`, so the API host can be
+swapped (``FPL_API_BASE``) for a local stand-in when benchmarking, and
+responses can be recorded to or replayed from an archive
+(see :mod:`app.upstream_archive`).
+
+Payloads that are shared by many requests (bootstrap, fixtures, finished
+gameweek data) are cached in the shared cache backend (see :mod:`app.cache`)
+and parsed at most once per worker per cache lifetime. Cached payloads are
+shared between requests and must not be mutated.
+
+At most ``UPSTREAM_MAX_CONCURRENCY`` requests per upstream host are in
+flight from a worker. A fetch waits for a slot only as long as the calling
+request's :class:`RequestBudget` allows (``UPSTREAM_TIMEOUT`` outside a
+request), then raises :class:`UpstreamBusy`. Fan-outs use :class:`UpstreamPool`
+so their fetches stay within the request's budget.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from . import upstream_archive
+from .cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+FPL_API_BASE = os.getenv("FPL_API_BASE", "https://fantasy.premierleague.com/api").rstrip("/")
+
+# Cache lifetimes in seconds
+BOOTSTRAP_TTL = float(os.getenv("FPL_BOOTSTRAP_TTL", "60"))
+FIXTURES_TTL = float(os.getenv("FPL_FIXTURES_TTL", "300"))
+LIVE_EVENT_TTL = float(os.getenv("FPL_LIVE_EVENT_TTL", "30"))
+FINISHED_EVENT_TTL = float(os.getenv("FPL_FINISHED_EVENT_TTL", str(7 * 24 * 3600)))
+STANDINGS_TTL = float(os.getenv("FPL_STANDINGS_TTL", "60"))
+ENTRY_TTL = float(os.getenv("FPL_ENTRY_TTL", "60"))
+
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "16"))
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "10"))
+
+# cache key -> (expires_at, parsed payload)
+_parsed: Dict[str, Tuple[float, Any]] = {}
+_parsed_lock = threading.Lock()
+
+
+def fpl_url(path: str) -> str:
+    return f"{FPL_API_BASE}/{path.lstrip('/')}"
+
+
+class UpstreamBusy(requests.RequestException):
+    """No upstream slot became free within the request's budget."""
+
+
+class RequestBudget:
+    """Time left for one request's upstream calls; ``shed`` records that one was refused."""
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.shed = False
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+
+_budget: "contextvars.ContextVar[Optional[RequestBudget]]" = contextvars.ContextVar("upstream_budget", default=None)
+
+
+@contextmanager
+def request_budget(seconds: float):
+    """Bound the upstream calls made in this context (and :class:`UpstreamPool` jobs submitted from it) to ``seconds``."""
+    budget = RequestBudget(time.monotonic() + seconds)
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+class UpstreamPool(ThreadPoolExecutor):
+    """A thread pool for concurrent upstream fetches.
+
+    Each job runs in a copy of the submitting thread's context, so fetches
+    made from it share the request's budget (and its logging request id).
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class _HostSlots:
+    def __init__(self, limit: int):
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.limit = limit
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+
+
+_hosts: Dict[str, _HostSlots] = {}
+_hosts_lock = threading.Lock()
+
+
+def _host_slots(host: str) -> _HostSlots:
+    with _hosts_lock:
+        slots = _hosts.get(host)
+        if slots is None:
+            slots = _hosts[host] = _HostSlots(UPSTREAM_MAX_CONCURRENCY)
+        return slots
+
+
+def upstream_stats() -> Dict[str, Dict[str, int]]:
+    """Per-host slot usage for the metrics endpoint."""
+    with _hosts_lock:
+        return {
+            host: {"limit": slots.limit, "in_flight": slots.in_flight, "waiting": slots.waiting, "shed": slots.shed}
+            for host, slots in _hosts.items()
+        }
+
+
+def fetch_bytes(path: str) -> bytes:
+    """GET ``path`` (relative to FPL_API_BASE) and return the raw response body.
+
+    Raises ``requests.RequestException`` on transport errors and non-2xx
+    responses, and :class:`UpstreamBusy` when the host has no free slot in time.
+    """
+    mode = upstream_archive.upstream_mode()
+    if mode == "replay":
+        return upstream_archive.replay(path)
+
+    url = fpl_url(path)
+    host = urlsplit(url).netloc
+    slots = _host_slots(host)
+    budget = _budget.get()
+    wait = budget.remaining() if budget else UPSTREAM_TIMEOUT
+    with _hosts_lock:
+        slots.waiting += 1
+    acquired = wait > 0 and slots.semaphore.acquire(timeout=wait)
+    with _hosts_lock:
+        slots.waiting -= 1
+        if acquired:
+            slots.in_flight += 1
+        else:
+            slots.shed += 1
+    if not acquired:
+        if budget:
+            budget.shed = True
+        raise UpstreamBusy(f"Upstream {host} is saturated")
+    timeout = min(UPSTREAM_TIMEOUT, budget.remaining()) if budget else UPSTREAM_TIMEOUT
+    try:
+        response = requests.get(url, timeout=max(timeout, 0.1))
+    except requests.Timeout:
+        if budget and timeout < UPSTREAM_TIMEOUT:
+            # Cut short by the request's deadline rather than by upstream's own timeout
+            budget.shed = True
+        raise
+    finally:
+        slots.semaphore.release()
+        with _hosts_lock:
+            slots.in_flight -= 1
+    response.raise_for_status()
+    if mode == "record":
+        upstream_archive.get_writer().record(path, response.content, response.status_code)
+    return response.content
+
+
+def get_json(path: str, ttl: Optional[float] = None) -> Any:
+    """GET ``path`` and return the decoded JSON body, cached for ``ttl`` seconds if given.
+
+    Concurrent misses for the same path are collapsed: one caller fetches while
+    the others (in this worker, and in other workers with a shared backend)
+    wait for the cache to be filled.
+    """
+    if not ttl:
+        return json.loads(fetch_bytes(path))
+
+    key = f"fpl:{path}"
+    parsed = _parsed_get(key)
+    if parsed is not None:
+        return parsed
+
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is None:
+        with cache.lock(key):
+            entry = cache.get(key)
+            if entry is None:
+                body = fetch_bytes(path)
+                cache.set(key, body, ttl)
+                entry = (body, time.time() + ttl)
+    return _parsed_put(key, entry)
+
+
+def get_cached(path: str) -> Any:
+    """The fresh parsed payload this worker holds for ``path``, else None (no I/O, safe on the event loop)."""
+    return _parsed_get(f"fpl:{path}")
+
+
+def is_cached(path: str) -> bool:
+    return get_cached(path) is not None
+
+
+def _parsed_get(key: str) -> Any:
+    with _parsed_lock:
+        cached = _parsed.get(key)
+    if cached is not None and cached[0] > time.time():
+        return cached[1]
+    return None
+
+
+def _parsed_put(key: str, entry: Tuple[bytes, float]) -> Any:
+    body, expires_at = entry
+    payload = json.loads(body)
+    with _parsed_lock:
+        _parsed[key] = (expires_at, payload)
+        # Drop expired payloads so one-off keys do not accumulate
+        for stale_key in [k for k, (expiry, _) in _parsed.items() if expiry <= time.time()]:
+            del _parsed[stale_key]
+    return payload
+
+
+def get_bootstrap() -> Dict[str, Any]:
+    return get_json("bootstrap-static/", ttl=BOOTSTRAP_TTL)
+
+
+# (parsed bootstrap, its JSON body); the parsed payload is only replaced when
+# the cache refreshes it, so the body is encoded once per refresh
+_bootstrap_body: Optional[Tuple[Any, bytes]] = None
+
+
+def get_bootstrap_body() -> bytes:
+    """``bootstrap-static/`` as a JSON body, for routes that return it unchanged."""
+    global _bootstrap_body
+    bootstrap = get_bootstrap()
+    cached = _bootstrap_body
+    if cached is None or cached[0] is not bootstrap:
+        cached = (bootstrap, json.dumps(bootstrap, separators=(",", ":")).encode())
+        _bootstrap_body = cached
+    return cached[1]
+
+
+def get_fixtures():
+    return get_json("fixtures/", ttl=FIXTURES_TTL)
+
+
+def event_state(event: int) -> Optional[Dict[str, Any]]:
+    return next((gw for gw in get_bootstrap()["events"] if gw["id"] == event), None)
+
+
+def state_finished(state: Optional[Dict[str, Any]]) -> bool:
+    """Whether a gameweek (a bootstrap or snapshot event row) is finished and its data checked."""
+    return bool(state and state.get("finished") and state.get("data_checked"))
+
+
+def event_finished(event: int) -> bool:
+    return state_finished(event_state(event))
+
+
+def event_ttl(event: int) -> float:
+    """Cache lifetime for gameweek data: long once the gameweek is finished and checked."""
+    return FINISHED_EVENT_TTL if event_finished(event) else LIVE_EVENT_TTL
+
+
+def get_entry(entry_id: int) -> Dict[str, Any]:
+    return get_json(f"entry/{entry_id}/", ttl=ENTRY_TTL)
+
+
+def get_event_fixtures(event: int) -> List[Dict[str, Any]]:
+    # Carries each fixture's live stats (BPS, bonus) until the gameweek is finished
+    return get_json(f"fixtures/?event={event}", ttl=event_ttl(event))
+
+
+def get_event_live(event: int) -> Dict[str, Any]:
+    return get_json(f"event/{event}/live/", ttl=event_ttl(event))
+
+
+def get_entry_picks(entry_id: int, event: int) -> Dict[str, Any]:
+    # The embedded entry_history keeps changing until the gameweek is finished
+    return get_json(f"entry/{entry_id}/event/{event}/picks/", ttl=event_ttl(event))
+
+
+def get_league_matches(league_id: int, event: int, page: int = 1) -> Dict[str, Any]:
+    return get_json(f"leagues-h2h-matches/league/{league_id}/?event={event}&page={page}", ttl=event_ttl(event))
+
+
+def get_league_standings(league_id: int, page: int = 1) -> Dict[str, Any]:
+    query = f"?page_standings={page}" if page > 1 else ""
+    return get_json(f"leagues-h2h/{league_id}/standings/{query}", ttl=STANDINGS_TTL)
+
+
+def league_standings(league_id: int) -> List[Dict[str, Any]]:
+    """Every row of a league's H2H table (all pages)."""
+    results: List[Dict[str, Any]] = []
+    page = 1
+    while True:
+        standings = get_league_standings(league_id, page)['standings']
+        results.extend(standings.get('results', []))
+        if not standings.get('has_next'):
+            return results
+        page += 1
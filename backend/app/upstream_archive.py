@@ -0,0 +1,273 @@
+"""Record and replay upstream FPL responses.
+
+``FPL_UPSTREAM_MODE`` selects how :func:`app.upstream.get_json` behaves:
+
+* ``live`` (default): talk to the FPL API.
+* ``record``: talk to the FPL API and append every successful response to the
+  archive in ``FPL_ARCHIVE_DIR``.
+* ``replay``: serve every request from the archive, never touching the network.
+  Recorded timelines are replayed ``FPL_REPLAY_SPEED`` times faster than real
+  time, so a whole recorded gameweek can be pushed through the live endpoints
+  in minutes.
+
+The archive holds one pair of files per gameweek (``gw-07``) plus ``common``
+for URLs that are not tied to a gameweek:
+
+* ``<bucket>.data``: zlib-compressed response bodies, back to back. A body
+  identical to the previous one recorded for the same URL is stored once.
+* ``<bucket>.index.jsonl``: one line per response with the URL, gameweek,
+  timestamp and the body's offset/length in the data file.
+
+Record a live gameweek with::
+
+    python -m app.upstream_archive record-gameweek --event 7 --league 738279 --interval 60
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MODES = ("live", "record", "replay")
+UPSTREAM_MODE = os.getenv("FPL_UPSTREAM_MODE", "live").lower()
+ARCHIVE_DIR = os.getenv("FPL_ARCHIVE_DIR", "fpl_archive")
+REPLAY_SPEED = float(os.getenv("FPL_REPLAY_SPEED", "1"))
+
+_EVENT_PATTERNS = (re.compile(r"(?:^|/)event/(\d+)/"), re.compile(r"[?&]event=(\d+)"))
+
+
+class ArchiveMiss(requests.RequestException):
+    """Raised in replay mode for a URL that was never recorded."""
+
+
+def event_for_path(path: str) -> Optional[int]:
+    for pattern in _EVENT_PATTERNS:
+        match = pattern.search(path)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def bucket_for_event(event: Optional[int]) -> str:
+    return f"gw-{event:02d}" if event is not None else "common"
+
+
+class ArchiveWriter:
+    """Appends responses to the archive; safe to share between threads and worker processes."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # url -> (body digest, bucket, offset, length) of the last stored body
+        self._last: Dict[str, Tuple[str, str, int, int]] = {}
+
+    def record(self, path: str, body: bytes, status: int = 200, timestamp: Optional[float] = None):
+        event = event_for_path(path)
+        bucket = bucket_for_event(event)
+        digest = hashlib.sha1(body).hexdigest()
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self._lock, open(self._path(bucket, "data"), "ab") as data_file:
+            # Workers recording into the same archive take turns on the bucket,
+            # so the offset read here is where this body actually lands
+            if fcntl is not None:
+                fcntl.flock(data_file, fcntl.LOCK_EX)
+            try:
+                previous = self._last.get(path)
+                if previous and previous[0] == digest and previous[1] == bucket:
+                    offset, length = previous[2], previous[3]
+                else:
+                    compressed = zlib.compress(body, 6)
+                    offset = data_file.seek(0, os.SEEK_END)
+                    data_file.write(compressed)
+                    data_file.flush()
+                    length = len(compressed)
+                    self._last[path] = (digest, bucket, offset, length)
+
+                entry = {"url": path, "event": event, "ts": timestamp, "status": status, "offset": offset, "length": length}
+                with open(self._path(bucket, "index.jsonl"), "a", encoding="utf-8") as index_file:
+                    index_file.write(json.dumps(entry) + "\n")
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(data_file, fcntl.LOCK_UN)
+
+    def _path(self, bucket: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{bucket}.{suffix}")
+
+
+class ArchiveReader:
+    """Serves recorded responses on a (possibly accelerated) replay clock.
+
+    The clock starts at the earliest recorded timestamp when the reader is
+    created. A request is answered with the latest body recorded for its URL at
+    or before the current replay time, or the earliest one if the URL was first
+    recorded later.
+    """
+
+    def __init__(self, directory: str, speed: float = 1.0, start: Optional[float] = None):
+        self.directory = directory
+        self.speed = speed
+        # url -> (sorted timestamps, [(bucket, offset, length)])
+        self._timelines: Dict[str, Tuple[List[float], List[Tuple[str, int, int]]]] = {}
+        self._load_indexes()
+        timestamps = [ts for stamps, _ in self._timelines.values() for ts in stamps[:1]]
+        self.recorded_start = start if start is not None else (min(timestamps) if timestamps else time.time())
+        self._started = time.time()
+        self._handles: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _load_indexes(self):
+        if not os.path.isdir(self.directory):
+            raise FileNotFoundError(f"FPL archive directory {self.directory!r} does not exist")
+        entries: Dict[str, List[Tuple[float, str, int, int]]] = {}
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".index.jsonl"):
+                continue
+            bucket = filename[: -len(".index.jsonl")]
+            with open(os.path.join(self.directory, filename), encoding="utf-8") as index_file:
+                for line in index_file:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    entries.setdefault(entry["url"], []).append((entry["ts"], bucket, entry["offset"], entry["length"]))
+        for url, records in entries.items():
+            records.sort()
+            self._timelines[url] = ([r[0] for r in records], [r[1:] for r in records])
+        logger.info(f"Loaded FPL archive with {len(self._timelines)} URLs from {self.directory}")
+
+    def replay_time(self) -> float:
+        return self.recorded_start + (time.time() - self._started) * self.speed
+
+    def urls(self) -> List[str]:
+        return list(self._timelines)
+
+    def lookup(self, path: str, at: Optional[float] = None) -> Optional[bytes]:
+        timeline = self._timelines.get(path)
+        if timeline is None:
+            return None
+        timestamps, locations = timeline
+        at = self.replay_time() if at is None else at
+        index = max(0, bisect.bisect_right(timestamps, at) - 1)
+        bucket, offset, length = locations[index]
+        return zlib.decompress(self._read(bucket, offset, length))
+
+    def _read(self, bucket: str, offset: int, length: int) -> bytes:
+        with self._lock:
+            handle = self._handles.get(bucket)
+            if handle is None:
+                handle = open(os.path.join(self.directory, f"{bucket}.data"), "rb")
+                self._handles[bucket] = handle
+            handle.seek(offset)  # type: ignore[attr-defined]
+            return handle.read(length)  # type: ignore[attr-defined]
+
+
+_writer: Optional[ArchiveWriter] = None
+_reader: Optional[ArchiveReader] = None
+_init_lock = threading.Lock()
+
+
+def upstream_mode() -> str:
+    if UPSTREAM_MODE not in ARCHIVE_MODES:
+        raise ValueError(f"FPL_UPSTREAM_MODE must be one of {ARCHIVE_MODES}, got {UPSTREAM_MODE!r}")
+    return UPSTREAM_MODE
+
+
+def get_writer() -> ArchiveWriter:
+    global _writer
+    with _init_lock:
+        if _writer is None:
+            _writer = ArchiveWriter(ARCHIVE_DIR)
+            logger.info(f"Recording upstream responses to {ARCHIVE_DIR}")
+        return _writer
+
+
+def get_reader() -> ArchiveReader:
+    global _reader
+    with _init_lock:
+        if _reader is None:
+            _reader = ArchiveReader(ARCHIVE_DIR, speed=REPLAY_SPEED)
+            logger.info(f"Replaying upstream responses from {ARCHIVE_DIR} at {REPLAY_SPEED}x")
+        return _reader
+
+
+def replay(path: str) -> bytes:
+    body = get_reader().lookup(path)
+    if body is None:
+        raise ArchiveMiss(f"{path} is not in the FPL archive")
+    return body
+
+
+def record_gameweek(event: int, league_ids: List[int], interval: float, max_hours: float):
+    """Poll everything the live endpoints need for ``event`` until it is finished.
+
+    Responses are recorded through :func:`app.upstream.get_json`, so this must
+    run with ``FPL_UPSTREAM_MODE=record``.
+    """
+    from .upstream import get_json
+
+    if upstream_mode() != "record":
+        raise SystemExit("Set FPL_UPSTREAM_MODE=record to record a gameweek")
+
+    deadline = time.time() + max_hours * 3600
+    recorded_picks = set()
+    while time.time() < deadline:
+        try:
+            bootstrap = get_json("bootstrap-static/")
+            get_json("fixtures/")
+            get_json(f"fixtures/?event={event}")
+            get_json(f"event/{event}/live/")
+            for league_id in league_ids:
+                standings = get_json(f"leagues-h2h/{league_id}/standings/")
+                get_json(f"leagues-h2h-matches/league/{league_id}/?event={event}&page=1")
+                for row in standings["standings"]["results"]:
+                    entry_id = row["entry"]
+                    get_json(f"entry/{entry_id}/")
+                    # Picks are fixed once the deadline has passed
+                    if entry_id not in recorded_picks:
+                        get_json(f"entry/{entry_id}/event/{event}/picks/")
+                        get_json(f"entry/{entry_id}/history/")
+                        get_json(f"entry/{entry_id}/transfers/")
+                        recorded_picks.add(entry_id)
+        except requests.RequestException as e:
+            logger.warning(f"Recording pass failed, retrying next interval: {e}")
+        else:
+            state = next((gw for gw in bootstrap["events"] if gw["id"] == event), None)
+            if state and state.get("finished") and state.get("data_checked"):
+                logger.info(f"Gameweek {event} is finished, stopping recording")
+                return
+        time.sleep(interval)
+    logger.info(f"Stopped recording gameweek {event} after {max_hours}h")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record FPL upstream responses to the archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record_parser = sub.add_parser("record-gameweek", help="poll a live gameweek until it is finished")
+    record_parser.add_argument("--event", type=int, required=True)
+    record_parser.add_argument("--league", type=int, action="append", required=True, help="H2H league id (repeatable)")
+    record_parser.add_argument("--interval", type=float, default=60.0, help="seconds between polling passes")
+    record_parser.add_argument("--max-hours", type=float, default=96.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    record_gameweek(args.event, args.league, args.interval, args.max_hours)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,535 @@
+"""Local stand-in for the FPL API used by the benchmarks.
+
+Serves either payloads recorded from the real API (``record``) or a
+deterministic synthetic season, with configurable injected latency:
+
+    python -m benchmarks.fake_fpl record --league 738279 --event 7 --out payloads.json.gz
+    python -m benchmarks.fake_fpl serve --payloads payloads.json.gz --latency-ms 80
+    python -m benchmarks.fake_fpl serve --synthetic --event 10 --latency-ms 80
+    python -m benchmarks.fake_fpl serve --archive fpl_archive --replay-speed 60
+
+Point the backend at it with ``FPL_API_BASE=http://127.0.0.1:<port>/api``.
+"""
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from app.upstream_archive import ArchiveReader
+
+REAL_FPL_API = "https://fantasy.premierleague.com/api"
+
+TEAM_NAMES = [
+    ("Arsenal", "ARS"), ("Aston Villa", "AVL"), ("Bournemouth", "BOU"), ("Brentford", "BRE"),
+    ("Brighton", "BHA"), ("Chelsea", "CHE"), ("Crystal Palace", "CRY"), ("Everton", "EVE"),
+    ("Fulham", "FUL"), ("Ipswich", "IPS"), ("Leicester", "LEI"), ("Liverpool", "LIV"),
+    ("Man City", "MCI"), ("Man Utd", "MUN"), ("Newcastle", "NEW"), ("Nott'm Forest", "NFO"),
+    ("Southampton", "SOU"), ("Spurs", "TOT"), ("West Ham", "WHU"), ("Wolves", "WOL"),
+]
+# (element_type, players per team)
+SQUAD_SHAPE = [(1, 3), (2, 11), (3, 13), (4, 8)]
+SYLLABLES = ["ka", "lo", "mé", "ri", "son", "van", "de", "ber", "ø", "gar", "tin", "ez", "ni", "ham", "ro", "çu", "li", "mar"]
+# Extra bootstrap element fields, so synthetic payloads are about as heavy to parse as real ones
+ELEMENT_PADDING_FIELDS = [
+    "chance_of_playing_next_round", "chance_of_playing_this_round", "cost_change_event",
+    "cost_change_event_fall", "cost_change_start", "cost_change_start_fall", "dreamteam_count",
+    "ep_next", "ep_this", "event_points", "points_per_game", "value_form", "value_season",
+    "influence", "creativity", "threat", "ict_index", "starts", "expected_goals",
+    "expected_assists", "expected_goal_involvements", "expected_goals_conceded",
+    "influence_rank", "influence_rank_type", "creativity_rank", "creativity_rank_type",
+    "threat_rank", "threat_rank_type", "ict_index_rank", "ict_index_rank_type",
+    "now_cost_rank", "now_cost_rank_type", "form_rank", "form_rank_type",
+    "points_per_game_rank", "points_per_game_rank_type", "selected_rank", "selected_rank_type",
+    "corners_and_indirect_freekicks_order", "direct_freekicks_order", "penalties_order",
+]
+
+
+class PayloadStore:
+    """Maps an upstream path (with query string) to an encoded JSON body."""
+
+    def lookup(self, path: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+
+class RecordedPayloads(PayloadStore):
+    def __init__(self, filename: str):
+        with gzip.open(filename, "rt", encoding="utf-8") as f:
+            payloads = json.load(f)
+        self.bodies = {key: json.dumps(body).encode() for key, body in payloads.items()}
+
+    def lookup(self, path: str) -> Optional[bytes]:
+        return self.bodies.get(path)
+
+
+class ArchivePayloads(PayloadStore):
+    """Replays an archive written with FPL_UPSTREAM_MODE=record (see app.upstream_archive)."""
+
+    def __init__(self, directory: str, speed: float = 1.0):
+        self.reader = ArchiveReader(directory, speed=speed)
+
+    def lookup(self, path: str) -> Optional[bytes]:
+        return self.reader.lookup(path)
+
+
+class SyntheticPayloads(PayloadStore):
+    """A deterministic synthetic season: one H2H league, ``entries`` managers, 38 gameweeks."""
+
+    def __init__(self, current_event: int = 10, league_id: int = 1, entries: int = 20, seed: int = 7):
+        self.current_event = current_event
+        self.league_id = league_id
+        self.entry_ids = [1000 + i for i in range(entries)]
+        self.seed = seed
+        self.teams = self._teams()
+        self.elements = self._elements()
+        self.fixtures = self._fixtures()
+        self._cache: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self.routes: List[Tuple[re.Pattern, Callable[..., object]]] = [
+            (re.compile(r"^bootstrap-static/$"), self.bootstrap),
+            (re.compile(r"^fixtures/$"), lambda: self.fixtures),
+            (re.compile(r"^fixtures/\?event=(\d+)$"), self.event_fixtures),
+            (re.compile(r"^event/(\d+)/live/$"), self.live),
+            (re.compile(r"^entry/(\d+)/$"), self.entry),
+            (re.compile(r"^entry/(\d+)/history/$"), self.history),
+            (re.compile(r"^entry/(\d+)/transfers/$"), self.transfers),
+            (re.compile(r"^entry/(\d+)/event/(\d+)/picks/$"), self.picks),
+            (re.compile(r"^element-summary/(\d+)/$"), self.element_summary),
+            (re.compile(r"^leagues-h2h/(\d+)/standings/$"), self.standings),
+            (re.compile(r"^leagues-h2h-matches/league/(\d+)/\?event=(\d+)&page=(\d+)$"), self.matches),
+        ]
+
+    def lookup(self, path: str) -> Optional[bytes]:
+        with self._lock:
+            if path in self._cache:
+                return self._cache[path]
+        for pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                body = handler(*(int(group) for group in match.groups()))
+                if body is None:
+                    return None
+                encoded = json.dumps(body).encode()
+                with self._lock:
+                    self._cache[path] = encoded
+                return encoded
+        return None
+
+    def _rng(self, *key) -> random.Random:
+        # String seeds are hashed with SHA-512, so they are stable across processes
+        return random.Random(":".join(str(part) for part in (self.seed,) + key))
+
+    # Static data
+
+    def _teams(self):
+        return [
+            {"id": i + 1, "code": 100 + i, "name": name, "short_name": short, "strength": 2 + i % 4}
+            for i, (name, short) in enumerate(TEAM_NAMES)
+        ]
+
+    def _elements(self):
+        rng = self._rng("elements")
+        elements = []
+        for team in self.teams:
+            for element_type, count in SQUAD_SHAPE:
+                for _ in range(count):
+                    first = "".join(rng.choice(SYLLABLES) for _ in range(2)).capitalize()
+                    second = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+                    element = {
+                        "id": len(elements) + 1,
+                        "team": team["id"],
+                        "team_code": team["code"],
+                        "element_type": element_type,
+                        "first_name": first,
+                        "second_name": second,
+                        "web_name": second,
+                        "now_cost": rng.randint(40, 130),
+                        "selected_by_percent": f"{rng.uniform(0, 60):.1f}",
+                        "total_points": rng.randint(0, 120),
+                        "form": f"{rng.uniform(0, 10):.1f}",
+                        "status": "a",
+                        "transfers_in_event": rng.randint(0, 300000),
+                        "transfers_out_event": rng.randint(0, 300000),
+                        "news": "",
+                    }
+                    for field in ELEMENT_PADDING_FIELDS:
+                        element[field] = f"{rng.uniform(0, 100):.1f}"
+                    elements.append(element)
+        return elements
+
+    def _fixtures(self):
+        rng = self._rng("fixtures")
+        team_ids = [team["id"] for team in self.teams]
+        start = datetime(2024, 8, 16, 19, tzinfo=timezone.utc)
+        fixtures = []
+        for event in range(1, 39):
+            # Circle-method round robin, mirrored for the second half of the season
+            rotation = event - 1 if event <= 19 else event - 20
+            teams = [team_ids[0]] + (team_ids[1:][-rotation:] + team_ids[1:][:-rotation] if rotation else team_ids[1:])
+            for i in range(10):
+                home, away = teams[i], teams[-1 - i]
+                if event > 19:
+                    home, away = away, home
+                finished = event < self.current_event
+                fixtures.append({
+                    "id": len(fixtures) + 1,
+                    "code": 2400000 + len(fixtures),
+                    "event": event,
+                    "team_h": home,
+                    "team_a": away,
+                    "team_h_difficulty": rng.randint(2, 5),
+                    "team_a_difficulty": rng.randint(2, 5),
+                    "team_h_score": rng.randint(0, 4) if finished else None,
+                    "team_a_score": rng.randint(0, 4) if finished else None,
+                    "finished": finished,
+                    "finished_provisional": finished,
+                    "started": event <= self.current_event,
+                    "minutes": 90 if finished else 0,
+                    "kickoff_time": (start + timedelta(days=7 * (event - 1), hours=i % 3)).isoformat().replace("+00:00", "Z"),
+                    "stats": [],
+                })
+        return fixtures
+
+    def bootstrap(self):
+        start = datetime(2024, 8, 16, 17, 30, tzinfo=timezone.utc)
+        events = [
+            {
+                "id": event,
+                "name": f"Gameweek {event}",
+                "deadline_time": (start + timedelta(days=7 * (event - 1))).isoformat().replace("+00:00", "Z"),
+                "finished": event < self.current_event,
+                "data_checked": event < self.current_event,
+                "is_previous": event == self.current_event - 1,
+                "is_current": event == self.current_event,
+                "is_next": event == self.current_event + 1,
+                "average_entry_score": 50,
+                "highest_score": 120,
+            }
+            for event in range(1, 39)
+        ]
+        return {
+            "events": events,
+            "teams": self.teams,
+            "elements": self.elements,
+            "element_types": [
+                {"id": 1, "singular_name_short": "GKP"}, {"id": 2, "singular_name_short": "DEF"},
+                {"id": 3, "singular_name_short": "MID"}, {"id": 4, "singular_name_short": "FWD"},
+            ],
+            "total_players": 11000000,
+        }
+
+    def event_fixtures(self, event):
+        return [fixture for fixture in self.fixtures if fixture["event"] == event]
+
+    # Gameweek data
+
+    def live(self, event):
+        if event > self.current_event:
+            return {"elements": []}
+        rng = self._rng("live", event)
+        fixture_by_team = {}
+        for fixture in self.event_fixtures(event):
+            fixture_by_team[fixture["team_h"]] = fixture["id"]
+            fixture_by_team[fixture["team_a"]] = fixture["id"]
+        elements = []
+        for element in self.elements:
+            minutes = rng.choice([0, 0, 90, 90, 90, 90, 75, 23])
+            points = 0 if minutes == 0 else rng.randint(1, 15)
+            bonus = rng.choice([0, 0, 0, 0, 1, 2, 3]) if minutes else 0
+            elements.append({
+                "id": element["id"],
+                "stats": {
+                    "minutes": minutes,
+                    "goals_scored": 0,
+                    "assists": 0,
+                    "yellow_cards": rng.choice([0, 0, 0, 1]) if minutes else 0,
+                    "red_cards": 0,
+                    "bonus": bonus,
+                    "bps": rng.randint(0, 40) if minutes else 0,
+                    "total_points": points,
+                },
+                "explain": [{"fixture": fixture_by_team[element["team"]], "stats": []}],
+            })
+        return {"elements": elements}
+
+    def _squad(self, entry_id):
+        rng = self._rng("squad", entry_id)
+        by_type = {element_type: [e["id"] for e in self.elements if e["element_type"] == element_type] for element_type, _ in SQUAD_SHAPE}
+        squad = {1: rng.sample(by_type[1], 2), 2: rng.sample(by_type[2], 5), 3: rng.sample(by_type[3], 5), 4: rng.sample(by_type[4], 3)}
+        # Starting 4-4-2 followed by the bench (GK first)
+        ordered = [(squad[1][0], 1)] + [(e, 2) for e in squad[2][:4]] + [(e, 3) for e in squad[3][:4]] + [(e, 4) for e in squad[4][:2]]
+        ordered += [(squad[1][1], 1), (squad[2][4], 2), (squad[3][4], 3), (squad[4][2], 4)]
+        return ordered
+
+    def picks(self, entry_id, event):
+        if entry_id not in self.entry_ids or event > self.current_event:
+            return None
+        rng = self._rng("picks", entry_id, event)
+        captain_slot, vice_slot = rng.sample(range(1, 12), 2)
+        picks = [
+            {
+                "element": element,
+                "position": slot,
+                "multiplier": 0 if slot > 11 else (2 if slot == captain_slot else 1),
+                "is_captain": slot == captain_slot,
+                "is_vice_captain": slot == vice_slot,
+                "element_type": element_type,
+            }
+            for slot, (element, element_type) in enumerate(self._squad(entry_id), start=1)
+        ]
+        history = self._history_rows(entry_id)[event - 1]
+        return {"active_chip": None, "automatic_subs": [], "entry_history": history, "picks": picks}
+
+    def _history_rows(self, entry_id):
+        rng = self._rng("history", entry_id)
+        rows, total, overall_rank = [], 0, rng.randint(10000, 5000000)
+        for event in range(1, self.current_event + 1):
+            points = rng.randint(25, 110)
+            total += points
+            overall_rank = max(1, int(overall_rank * rng.uniform(0.7, 1.3)))
+            rows.append({
+                "event": event, "points": points, "total_points": total, "rank": rng.randint(1, 9000000),
+                "rank_sort": 0, "overall_rank": overall_rank, "percentile_rank": 50, "bank": rng.randint(0, 30),
+                "value": rng.randint(990, 1050), "event_transfers": rng.randint(0, 2),
+                "event_transfers_cost": rng.choice([0, 0, 0, 4]), "points_on_bench": rng.randint(0, 20),
+            })
+        return rows
+
+    def entry(self, entry_id):
+        if entry_id not in self.entry_ids:
+            return None
+        index = self.entry_ids.index(entry_id)
+        return {
+            "id": entry_id,
+            "name": f"Team {index + 1}",
+            "player_first_name": f"Manager{index + 1}",
+            "player_last_name": "Synthetic",
+            "player_region_name": "England",
+            "summary_overall_points": self._history_rows(entry_id)[-1]["total_points"],
+            "summary_overall_rank": self._history_rows(entry_id)[-1]["overall_rank"],
+            "current_event": self.current_event,
+            "last_deadline_total_transfers": len(self.transfers(entry_id)),
+            "leagues": {"h2h": [{"id": self.league_id, "name": "Synthetic League"}]},
+        }
+
+    def history(self, entry_id):
+        if entry_id not in self.entry_ids:
+            return None
+        rng = self._rng("past", entry_id)
+        past = [
+            {"season_name": f"{year}/{(year + 1) % 100:02d}", "total_points": rng.randint(1800, 2600), "rank": rng.randint(1000, 8000000)}
+            for year in range(2016, 2024)
+        ]
+        return {"current": self._history_rows(entry_id), "past": past, "chips": []}
+
+    def transfers(self, entry_id):
+        if entry_id not in self.entry_ids:
+            return None
+        rng = self._rng("transfers", entry_id)
+        transfers = []
+        for event in range(2, self.current_event + 1):
+            for _ in range(rng.choice([0, 1, 1, 2])):
+                element_in, element_out = rng.sample(self.elements, 2)
+                transfers.append({
+                    "element_in": element_in["id"], "element_in_cost": element_in["now_cost"],
+                    "element_out": element_out["id"], "element_out_cost": element_out["now_cost"],
+                    "entry": entry_id, "event": event, "time": f"2024-09-{event:02d}T10:00:00Z",
+                })
+        return list(reversed(transfers))
+
+    def element_summary(self, element_id):
+        if not 1 <= element_id <= len(self.elements):
+            return None
+        element = self.elements[element_id - 1]
+        rng = self._rng("summary", element_id)
+        return {
+            "fixtures": [f for f in self.fixtures if element["team"] in (f["team_h"], f["team_a"]) and not f["finished"]][:5],
+            "history": [
+                {"element": element_id, "round": event, "total_points": rng.randint(0, 12), "minutes": rng.choice([0, 90])}
+                for event in range(1, self.current_event)
+            ],
+            "history_past": [],
+        }
+
+    # League data
+
+    def _pairings(self, event):
+        rng = self._rng("pairings", event)
+        entries = list(self.entry_ids)
+        rng.shuffle(entries)
+        return [(entries[i], entries[i + 1]) for i in range(0, len(entries) - 1, 2)]
+
+    def _event_points(self, entry_id, event):
+        # H2H scores are net of transfer hits
+        row = self._history_rows(entry_id)[event - 1]
+        return row["points"] - row["event_transfers_cost"]
+
+    def matches(self, league_id, event, page):
+        if league_id != self.league_id or event > self.current_event:
+            return {"has_next": False, "page": page, "results": []}
+        results = []
+        for i, (entry_1, entry_2) in enumerate(self._pairings(event)):
+            points_1, points_2 = self._event_points(entry_1, event), self._event_points(entry_2, event)
+            winner = entry_1 if points_1 > points_2 else entry_2 if points_2 > points_1 else None
+            results.append({
+                "id": event * 1000 + i + 1,
+                "entry_1_entry": entry_1, "entry_1_name": self.entry(entry_1)["name"],
+                "entry_1_player_name": f"Manager{self.entry_ids.index(entry_1) + 1} Synthetic",
+                "entry_1_points": points_1, "entry_1_win": int(winner == entry_1),
+                "entry_1_draw": int(winner is None), "entry_1_loss": int(winner == entry_2), "entry_1_total": 0,
+                "entry_2_entry": entry_2, "entry_2_name": self.entry(entry_2)["name"],
+                "entry_2_player_name": f"Manager{self.entry_ids.index(entry_2) + 1} Synthetic",
+                "entry_2_points": points_2, "entry_2_win": int(winner == entry_2),
+                "entry_2_draw": int(winner is None), "entry_2_loss": int(winner == entry_1), "entry_2_total": 0,
+                "is_knockout": False, "league": league_id, "winner": winner, "seed_value": None,
+                "event": event, "tiebreak": None, "is_bye": False, "knockout_name": "",
+            })
+        return {"has_next": False, "page": page, "results": results}
+
+    def standings(self, league_id):
+        if league_id != self.league_id:
+            return None
+        table = {entry: {"won": 0, "drawn": 0, "lost": 0, "points_for": 0} for entry in self.entry_ids}
+        for event in range(1, self.current_event):
+            for match in self.matches(league_id, event, 1)["results"]:
+                for side, other in (("1", "2"), ("2", "1")):
+                    row = table[match[f"entry_{side}_entry"]]
+                    row["points_for"] += match[f"entry_{side}_points"]
+                    row["won"] += match[f"entry_{side}_win"]
+                    row["drawn"] += match[f"entry_{side}_draw"]
+                    row["lost"] += match[f"entry_{side}_loss"]
+        ordered = sorted(table.items(), key=lambda item: (item[1]["won"] * 3 + item[1]["drawn"], item[1]["points_for"]), reverse=True)
+        results = []
+        for rank, (entry_id, row) in enumerate(ordered, start=1):
+            entry = self.entry(entry_id)
+            results.append({
+                "id": entry_id * 10, "entry": entry_id, "entry_name": entry["name"],
+                "player_name": f"{entry['player_first_name']} {entry['player_last_name']}",
+                "rank": rank, "last_rank": rank, "rank_sort": rank,
+                "matches_played": row["won"] + row["drawn"] + row["lost"], "matches_won": row["won"],
+                "matches_drawn": row["drawn"], "matches_lost": row["lost"],
+                "points_for": row["points_for"], "total": row["won"] * 3 + row["drawn"],
+            })
+        return {
+            "league": {"id": league_id, "name": "Synthetic League", "scoring": "h"},
+            "standings": {"has_next": False, "page": 1, "results": results},
+        }
+
+
+def load_store(payloads: Optional[str], archive: Optional[str], replay_speed: float, event: int, **synthetic) -> PayloadStore:
+    if payloads:
+        return RecordedPayloads(payloads)
+    if archive:
+        return ArchivePayloads(archive, replay_speed)
+    return SyntheticPayloads(event, **synthetic)
+
+
+def make_handler(store: PayloadStore, latency_ms: float, jitter_ms: float):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+            if delay:
+                time.sleep(delay)
+            path = self.path
+            if path.startswith("/api/"):
+                path = path[len("/api/"):]
+            body = store.lookup(path)
+            if body is None:
+                body, status = b'{"detail": "Not found."}', 404
+            else:
+                status = 200
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInHandler
+
+
+def start_server(store: PayloadStore, port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread; the bound port is ``server.server_address[1]``."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(store, latency_ms, jitter_ms))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def record(league_id: int, event: int, out: str, max_entries: int):
+    """Download the payloads the backend needs for one league and gameweek from the real API."""
+    session = requests.Session()
+    payloads: Dict[str, object] = {}
+
+    def fetch(path):
+        response = session.get(f"{REAL_FPL_API}/{path}")
+        response.raise_for_status()
+        payloads[path] = response.json()
+        return payloads[path]
+
+    fetch("bootstrap-static/")
+    fetch("fixtures/")
+    fetch(f"fixtures/?event={event}")
+    fetch(f"event/{event}/live/")
+    standings = fetch(f"leagues-h2h/{league_id}/standings/")
+    fetch(f"leagues-h2h-matches/league/{league_id}/?event={event}&page=1")
+    entries = [row["entry"] for row in standings["standings"]["results"]][:max_entries]
+    for entry_id in entries:
+        fetch(f"entry/{entry_id}/")
+        fetch(f"entry/{entry_id}/history/")
+        fetch(f"entry/{entry_id}/transfers/")
+        fetch(f"entry/{entry_id}/event/{event}/picks/")
+    with gzip.open(out, "wt", encoding="utf-8") as f:
+        json.dump(payloads, f)
+    print(f"Recorded {len(payloads)} payloads to {out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="serve recorded or synthetic payloads")
+    source = serve_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--payloads", help="gzip JSON file written by 'record'")
+    source.add_argument("--archive", help="archive directory recorded by the backend")
+    source.add_argument("--synthetic", action="store_true", help="serve a generated season")
+    serve_parser.add_argument("--replay-speed", type=float, default=1.0, help="archive replay speed-up")
+    serve_parser.add_argument("--event", type=int, default=10, help="current gameweek of the synthetic season")
+    serve_parser.add_argument("--entries", type=int, default=20, help="managers in the synthetic league")
+    serve_parser.add_argument("--port", type=int, default=8100)
+    serve_parser.add_argument("--latency-ms", type=float, default=0.0)
+    serve_parser.add_argument("--jitter-ms", type=float, default=0.0)
+
+    record_parser = sub.add_parser("record", help="record payloads from the real FPL API")
+    record_parser.add_argument("--league", type=int, required=True)
+    record_parser.add_argument("--event", type=int, required=True)
+    record_parser.add_argument("--out", required=True)
+    record_parser.add_argument("--max-entries", type=int, default=50)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.league, args.event, args.out, args.max_entries)
+        return
+
+    store = load_store(args.payloads, args.archive, args.replay_speed, args.event, entries=args.entries)
+    server = start_server(store, args.port, args.latency_ms, args.jitter_ms)
+    print(f"Stand-in FPL API on http://127.0.0.1:{server.server_address[1]}/api")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
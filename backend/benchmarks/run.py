@@ -0,0 +1,241 @@
+"""Offline load test of the backend routes against the stand-in FPL API.
+
+Starts the stand-in (see ``benchmarks.fake_fpl``) and a uvicorn server for
+``app.main:app`` pointed at it, then drives every upstream-bound route (and
+``/api/batch`` with one dashboard view's routes) with a fixed number of
+concurrent clients and reports throughput and p50/p95/p99 latency:
+
+    python -m benchmarks.run --latency-ms 50 --duration 10 --save results/base.json
+    python -m benchmarks.run --latency-ms 50 --duration 10 --compare results/base.json
+
+``--target`` benchmarks an already running server instead (for example the
+multi-worker gunicorn setup); it must already be pointed at a stand-in.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from .fake_fpl import load_store, start_server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYNTHETIC_LEAGUE_ID = 1
+
+
+def route_paths(league_id: int, event: int, entry_id: int, match_id: int, element_id: int) -> Dict[str, str]:
+    """Route name -> concrete request path for every upstream-bound GET route in app/main.py."""
+    return {
+        "bootstrap-static": "/api/bootstrap-static",
+        "current-gameweek": "/api/current-gameweek",
+        "player-search": "/api/players/search?q=sa",
+        "team": f"/api/team/{entry_id}",
+        "team-history": f"/api/team/{entry_id}/history",
+        "team-previous-seasons": f"/api/team/{entry_id}/previous-seasons",
+        "team-transfers": f"/api/entry/{entry_id}/transfers",
+        "team-picks": f"/api/entry/{entry_id}/event/{event}/picks",
+        "team-planner": f"/api/entry/{entry_id}/planner",
+        "element-summary": f"/api/element-summary/{element_id}",
+        "player-trend": f"/api/players/{element_id}/trend",
+        "trends-prices": "/api/trends/prices",
+        "trends-ownership": "/api/trends/ownership",
+        "fixtures": f"/api/fixtures/{event - 1}",
+        "weekly-matchups": f"/api/weekly-matchups/{league_id}?event={event}",
+        "matchup": f"/api/matchup/{match_id}?event={event}",
+        "league-standings": f"/api/leagues/{league_id}/standings",
+        "league-live": f"/api/leagues/{league_id}/live?event={event}",
+        "league-ownership": f"/api/leagues/{league_id}/ownership/{event}",
+        "league-transfers": f"/api/leagues/{league_id}/transfers?event={event}",
+        "league-transfer-summary": f"/api/leagues/{league_id}/transfers/summary?event={event}",
+    }
+
+
+def batch_requests(paths: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Route name -> JSON body for ``POST /api/batch``: one dashboard view's worth of routes."""
+    view = ["bootstrap-static", "team", "team-history", "team-picks", "weekly-matchups", "league-live"]
+    return {"batch": {"requests": [{"id": name, "path": paths[name]} for name in view]}}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def load_test(base_url: str, path: str, concurrency: int, duration: float, warmup: float, body: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """Hammer one path (GET, or POST ``body``) with ``concurrency`` keep-alive clients for ``duration`` seconds."""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def client(deadline: float, record: bool):
+        nonlocal errors
+        session = requests.Session()
+        local_latencies, local_errors = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if body is None:
+                    response = session.get(base_url + path, timeout=60)
+                else:
+                    response = session.post(base_url + path, json=body, timeout=60)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            local_latencies.append(time.perf_counter() - start)
+            local_errors += 0 if ok else 1
+        if record:
+            with lock:
+                latencies.extend(local_latencies)
+                errors += local_errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if warmup:
+            list(pool.map(lambda _: client(time.perf_counter() + warmup, False), range(concurrency)))
+        started = time.perf_counter()
+        list(pool.map(lambda _: client(started + duration, True), range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(upstream_base: str, league_id: int, port: int, database_dir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "FPL_API_BASE": upstream_base,
+        "LEAGUE_ID": str(league_id),
+        "DATABASE_URL": f"sqlite:///{os.path.join(database_dir, 'bench.db')}",
+        "PYTHONPATH": BACKEND_DIR,
+    })
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Backend did not start within 30s")
+
+
+def print_report(results: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]]):
+    header = f"{'route':<24}{'req':>7}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    if baseline:
+        header += f"{'Δrps':>9}{'Δp95':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in results.items():
+        line = (
+            f"{name:<24}{row['requests']:>7}{row['errors']:>5}{row['throughput_rps']:>9.1f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+        )
+        base = (baseline or {}).get(name)
+        if base:
+            line += f"{_change(base['throughput_rps'], row['throughput_rps']):>9}{_change(base['p95_ms'], row['p95_ms']):>9}"
+        print(line)
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", help="recorded payload file (default: synthetic season)")
+    parser.add_argument("--archive", help="upstream archive directory recorded by the backend")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="archive replay speed-up")
+    parser.add_argument("--event", type=int, default=10, help="gameweek to benchmark")
+    parser.add_argument("--league", type=int, default=SYNTHETIC_LEAGUE_ID, help="H2H league id present in the payloads")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="injected upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per route")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds per route before measuring")
+    parser.add_argument("--routes", help="comma separated subset of route names")
+    parser.add_argument("--target", help="benchmark an already running backend at this base URL")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON results from an earlier run to diff against")
+    args = parser.parse_args()
+
+    store = load_store(args.payloads, args.archive, args.replay_speed, args.event, league_id=args.league)
+    matches = json.loads(store.lookup(f"leagues-h2h-matches/league/{args.league}/?event={args.event}&page=1") or b"{}")
+    first_match = (matches.get("results") or [{}])[0]
+    paths = route_paths(
+        league_id=args.league,
+        event=args.event,
+        entry_id=first_match.get("entry_1_entry", 0),
+        match_id=first_match.get("id", 0),
+        element_id=1,
+    )
+    bodies = batch_requests(paths)
+    paths.update({name: "/api/batch" for name in bodies})
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        paths = {name: path for name, path in paths.items() if name in wanted}
+
+    upstream = start_server(store, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    backend = None
+    with tempfile.TemporaryDirectory() as database_dir:
+        try:
+            if args.target:
+                base_url = args.target.rstrip("/")
+            else:
+                port = free_port()
+                backend = start_backend(f"http://127.0.0.1:{upstream.server_address[1]}/api", args.league, port, database_dir)
+                base_url = f"http://127.0.0.1:{port}"
+
+            results = {}
+            for name, path in paths.items():
+                results[name] = load_test(base_url, path, args.concurrency, args.duration, args.warmup, bodies.get(name))
+                print(f"  {name}: {results[name]['throughput_rps']:.1f} req/s", file=sys.stderr)
+        finally:
+            if backend is not None:
+                backend.terminate()
+                backend.wait(timeout=10)
+            upstream.shutdown()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Gunicorn settings for the multi-worker deployment.
+
+    gunicorn -c gunicorn_config.py app.main:app
+
+Run with ``CACHE_BACKEND=disk`` (or ``redis``) so the workers share one cache
+and upstream payloads are fetched once per host instead of once per worker.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master and fork workers from it
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# Request lines (with correlation ids) come from the app's structured logs;
+# set GUNICORN_ACCESS_LOG=- to also get gunicorn's own access log
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Connections opened by the master (create_all at import) must not be
+    # shared with forked workers; drop them without closing the parent's sockets.
+    from app.database import engine
+
+    engine.dispose(close=False)
@@ -25,4 +25,4 @@ except Exception as e:
 "
 
 # Start the server
-exec uvicorn app.main:app --host 0.0.0.0 --port $PORT --log-level debug
\ No newline at end of file
+exec uvicorn app.main:app --host 0.0.0.0 --port $PORT --log-level info
\ No newline at end of file
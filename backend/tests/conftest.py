@@ -0,0 +1,81 @@
+"""Shared fixtures.
+
+The app reads its settings at import time, so the environment is pointed at
+a scratch directory (SQLite database, memory cache, no trend recorder)
+before anything from ``app`` is imported. Tests never reach the real FPL
+API: upstream points at a closed port unless a test asks for the synthetic
+stand-in from :mod:`benchmarks.fake_fpl` through the ``fpl`` fixture.
+"""
+import os
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="fpl-hub-tests-")
+os.environ.update({
+    "CACHE_BACKEND": "memory",
+    "CACHE_DIR": _scratch,
+    "DATABASE_URL": f"sqlite:///{os.path.join(_scratch, 'test.db')}",
+    "TRENDS_DIR": os.path.join(_scratch, "trends"),
+    "TRENDS_SNAPSHOT_INTERVAL": "0",
+})
+
+import pytest  # noqa: E402
+
+from app import cache as cache_module, models, snapshot, upstream  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from benchmarks.fake_fpl import SyntheticPayloads, start_server  # noqa: E402
+
+LEAGUE_ID = 5
+
+models.Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch, tmp_path):
+    """A fresh memory cache, with no parsed payloads or snapshot left over from another test."""
+    backend = cache_module.MemoryCache()
+    monkeypatch.setattr(cache_module, "_cache", backend)
+    monkeypatch.setattr(upstream, "FPL_API_BASE", "http://127.0.0.1:9/api")
+    monkeypatch.setattr(snapshot, "SNAPSHOT_PATH", str(tmp_path / "reference.snap"))
+    monkeypatch.setattr(snapshot, "_current", None)
+    upstream._parsed.clear()
+    yield backend
+    upstream._parsed.clear()
+
+
+@pytest.fixture(scope="session")
+def fpl_server():
+    payloads = SyntheticPayloads(10, league_id=LEAGUE_ID)
+    server = start_server(payloads)
+    yield payloads, server
+    server.shutdown()
+
+
+@pytest.fixture
+def fpl(fpl_server, monkeypatch) -> SyntheticPayloads:
+    """Upstream pointed at a synthetic season: gameweek 10 of 38 is live, entries 1000-1019 play league 5."""
+    payloads, server = fpl_server
+    monkeypatch.setattr(upstream, "FPL_API_BASE", f"http://127.0.0.1:{server.server_address[1]}/api")
+    return payloads
+
+
+@pytest.fixture(autouse=True)
+def empty_database():
+    """Delete every row a test stored, through the routes or the ``db`` session."""
+    yield
+    session = SessionLocal()
+    try:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
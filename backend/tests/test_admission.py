@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from app import admission, profiling, upstream
+from app.admission import AdmissionGate, AdmissionMiddleware, cache_servable, route_class
+from app.main import app
+from app.snapshot import get_snapshot
+
+
+class Route:
+    """An ASGI app that holds each request until ``release`` is set."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.started = 0
+
+    async def __call__(self, scope, receive, send):
+        self.started += 1
+        await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def call(app, path: str):
+    """(status, headers) of a GET to ``path``."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}, receive, send)
+    start = messages[0]
+    return start["status"], dict(start["headers"])
+
+
+@pytest.fixture
+def gates(monkeypatch):
+    """One slot per route class and no queue, unless a test resizes them."""
+    gates = {name: AdmissionGate(name, 1, 0) for name in ("upstream", "league")}
+    monkeypatch.setattr(admission, "_gates", gates)
+    monkeypatch.setattr(admission, "ADMISSION_QUEUE_TIMEOUT", 0.2)
+    return gates
+
+
+def test_route_classes():
+    assert route_class("/api/leagues/5/live") == "league"
+    assert route_class("/api/weekly-matchups/5") == "league"
+    assert route_class("/api/team/1000") == "upstream"
+    assert route_class("/api/leagues/5") is None
+    assert route_class("/api/trends/prices") is None
+    assert route_class("/api/batch") is None
+    assert route_class("/health") is None
+
+
+def test_request_over_the_limit_is_shed_with_retry_after(gates):
+    async def scenario():
+        route = Route()
+        app = AdmissionMiddleware(route)
+        first = asyncio.create_task(call(app, "/api/team/1000"))
+        await asyncio.sleep(0)
+        shed = await call(app, "/api/team/1001")
+        route.release.set()
+        return await first, shed, route.started
+
+    (status, _), (shed_status, shed_headers), started = asyncio.run(scenario())
+    assert status == 200
+    assert shed_status == 503
+    assert shed_headers[b"retry-after"] == str(admission.ADMISSION_RETRY_AFTER).encode()
+    assert started == 1
+    assert gates["upstream"].rejected_full == 1
+
+
+def test_route_classes_have_separate_limits(gates):
+    async def scenario():
+        route = Route()
+        app = AdmissionMiddleware(route)
+        league = asyncio.create_task(call(app, "/api/leagues/5/live"))
+        single = asyncio.create_task(call(app, "/api/team/1000"))
+        await asyncio.sleep(0)
+        assert route.started == 2
+        route.release.set()
+        return await league, await single
+
+    (league_status, _), (status, _) = asyncio.run(scenario())
+    assert league_status == status == 200
+
+
+def test_queued_request_is_admitted_when_a_slot_frees(gates):
+    gates["upstream"].queue_size = 1
+
+    async def scenario():
+        route = Route()
+        app = AdmissionMiddleware(route)
+        first = asyncio.create_task(call(app, "/api/team/1000"))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(call(app, "/api/team/1001"))
+        await asyncio.sleep(0.05)
+        assert gates["upstream"].queued() == 1
+        route.release.set()
+        return await first, await queued
+
+    (status, _), (queued_status, _) = asyncio.run(scenario())
+    assert status == queued_status == 200
+    assert gates["upstream"].active == 0
+
+
+def test_queued_request_times_out(gates):
+    gates["upstream"].queue_size = 1
+
+    async def scenario():
+        route = Route()
+        app = AdmissionMiddleware(route)
+        first = asyncio.create_task(call(app, "/api/team/1000"))
+        await asyncio.sleep(0)
+        queued = await call(app, "/api/team/1001")
+        route.release.set()
+        await first
+        return queued
+
+    status, _ = asyncio.run(scenario())
+    assert status == 503
+    assert gates["upstream"].rejected_timeout == 1
+
+
+def test_cache_servable_request_skips_the_queue(gates, fpl):
+    upstream.get_bootstrap()
+
+    async def scenario():
+        route = Route()
+        app = AdmissionMiddleware(route)
+        first = asyncio.create_task(call(app, "/api/team/1000"))
+        cached = asyncio.create_task(call(app, "/api/bootstrap-static"))
+        await asyncio.sleep(0)
+        assert route.started == 2
+        route.release.set()
+        return await first, await cached
+
+    (status, _), (cached_status, _) = asyncio.run(scenario())
+    assert status == cached_status == 200
+    assert gates["upstream"].bypassed == 1
+
+
+def test_cache_servable_matches_what_the_route_reads(fpl):
+    upstream.get_event_fixtures(10)
+    upstream.get_entry(1000)
+    # The fixtures route also reads the snapshot, which is not mapped yet
+    assert not cache_servable("/api/fixtures/10")
+    get_snapshot()
+    assert cache_servable("/api/fixtures/10")
+    assert not cache_servable("/api/fixtures/9")
+    # Serving an entry may sync its history from upstream
+    assert not cache_servable("/api/team/1000")
+
+
+def test_upstream_call_past_the_deadline_is_answered_503(gates, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_REQUEST_DEADLINE", 0)
+
+    async def route(scope, receive, send):
+        try:
+            upstream.fetch_bytes("bootstrap-static/")
+            status = 200
+        except requests.RequestException:
+            status = 500
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    status, headers = asyncio.run(call(AdmissionMiddleware(route), "/api/team/1000"))
+    assert status == 503
+    assert b"retry-after" in headers
+    assert gates["upstream"].shed_upstream == 1
+
+
+def test_metrics_need_the_debug_token(monkeypatch):
+    client = TestClient(app)
+    assert client.get("/debug/metrics").status_code == 403
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    assert client.get("/debug/metrics", headers={"X-Profile-Token": "wrong"}).status_code == 403
+    metrics = client.get("/debug/metrics", headers={"X-Profile-Token": "secret"}).json()
+    assert set(metrics["admission"]) == {"upstream", "league"}
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import admission, batch
+from app.admission import AdmissionGate
+from app.main import app
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(app)
+
+
+def post_batch(client, *items):
+    response = client.post("/api/batch", json={"requests": list(items)})
+    assert response.status_code == 200
+    return response.json()["results"]
+
+
+def test_results_come_back_in_order(client, fpl):
+    results = post_batch(
+        client,
+        {"id": "team", "path": "/api/team/1000"},
+        {"id": "fixtures", "path": "/api/fixtures/10"},
+        {"id": "missing", "path": "/api/leagues/999"},
+    )
+    assert [(result["id"], result["status"]) for result in results] == [("team", 200), ("fixtures", 200), ("missing", 404)]
+    assert results[0]["body"]["id"] == 1000
+    assert results[0]["body"] == client.get("/api/team/1000").json()
+    assert results[2]["body"] == {"detail": "League not found"}
+
+
+def test_only_get_sub_requests_to_api_routes(client):
+    results = post_batch(
+        client,
+        {"method": "POST", "path": "/api/leagues"},
+        {"path": "/api/batch"},
+        {"path": "/health"},
+    )
+    assert [result["status"] for result in results] == [405, 400, 400]
+
+
+def test_query_is_merged_into_the_path(client, monkeypatch):
+    dispatched = []
+
+    async def recording_dispatch(app, parent_scope, path, query):
+        dispatched.append((path, query))
+        return 200, None
+
+    monkeypatch.setattr(batch, "_dispatch", recording_dispatch)
+    post_batch(client, {"path": "/api/players/search?q=sal", "query": {"limit": 3, "position": "MID"}})
+    assert dispatched == [("/api/players/search", "q=sal&limit=3&position=MID")]
+
+
+def test_oversized_batch_is_refused(client):
+    items = [{"path": "/api/leagues"}] * (batch.BATCH_MAX_ITEMS + 1)
+    assert client.post("/api/batch", json={"requests": items}).status_code == 400
+
+
+def test_items_take_admission_slots_of_their_route_class(client, fpl, monkeypatch):
+    monkeypatch.setattr(admission, "_gates", {name: AdmissionGate(name, 0, 0) for name in ("upstream", "league")})
+    results = post_batch(client, {"path": "/api/team/1000"}, {"path": "/api/leagues"})
+    assert [result["status"] for result in results] == [503, 200]
+
+
+def test_identical_sub_requests_are_dispatched_once(client, monkeypatch):
+    dispatched = []
+
+    async def slow_dispatch(app, parent_scope, path, query):
+        dispatched.append((path, query))
+        await asyncio.sleep(0.05)
+        return 200, {"path": path}
+
+    monkeypatch.setattr(batch, "_dispatch", slow_dispatch)
+    results = post_batch(client, {"path": "/api/team/1000"}, {"path": "/api/team/1000"}, {"path": "/api/team/1001"})
+    assert sorted(dispatched) == [("/api/team/1000", ""), ("/api/team/1001", "")]
+    assert [result["body"] for result in results] == [{"path": "/api/team/1000"}] * 2 + [{"path": "/api/team/1001"}]
+    assert batch._inflight == {}
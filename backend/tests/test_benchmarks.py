@@ -0,0 +1,29 @@
+import json
+
+from fastapi.routing import APIRoute
+
+from app import upstream
+from app.main import app
+from benchmarks.run import batch_requests, route_paths
+
+# Served from our own database, so there is no upstream work to measure
+DATABASE_ROUTES = {"/api/leagues", "/api/leagues/{league_id}"}
+
+
+def test_every_upstream_bound_route_is_benchmarked():
+    paths = route_paths(league_id=5, event=10, entry_id=1000, match_id=10001, element_id=1)
+    benchmarked = set(paths.values()) | {"/api/batch"}
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or not route.path.startswith("/api/") or route.path in DATABASE_ROUTES:
+            continue
+        assert any(route.path_regex.match(path.split("?")[0]) for path in benchmarked), route.path
+    for body in batch_requests(paths).values():
+        assert all(item["path"] in paths.values() for item in body["requests"])
+
+
+def test_bootstrap_body_is_encoded_once_per_payload(fpl):
+    body = upstream.get_bootstrap_body()
+    assert json.loads(body) == fpl.bootstrap()
+    assert upstream.get_bootstrap_body() is body
+    upstream._parsed.clear()
+    assert upstream.get_bootstrap_body() is not body
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app.cache import DiskCache, MemoryCache
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache()
+    cache.set("key", b"value", 60)
+    value, expires_at = cache.get("key")
+    assert value == b"value" and expires_at > time.time()
+    cache.set("gone", b"value", -1)
+    assert cache.get("gone") is None
+    cache.delete("key")
+    assert cache.get("key") is None
+
+
+def test_memory_cache_evicts_least_recently_used_past_its_size():
+    cache = MemoryCache(max_bytes=10)
+    cache.set("a", b"1234", 60)
+    cache.set("b", b"1234", 60)
+    cache.get("a")
+    cache.set("c", b"1234", 60)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size == 8
+
+
+def test_memory_cache_evicts_expired_entries_first():
+    cache = MemoryCache(max_bytes=10)
+    cache.set("expired", b"1234", 0.01)
+    cache.set("old", b"1234", 60)
+    time.sleep(0.02)
+    cache.set("new", b"1234", 60)
+    assert cache.get("old") is not None
+    assert cache.size == 8
+
+
+@pytest.fixture
+def disk(tmp_path) -> DiskCache:
+    return DiskCache(str(tmp_path / "cache"), max_bytes=1000, sweep_interval=0)
+
+
+def test_disk_cache_round_trip(disk):
+    disk.set("key", b"value", 60)
+    assert disk.get("key")[0] == b"value"
+    disk.set("expired", b"value", -1)
+    assert disk.get("expired") is None
+    disk.delete("key")
+    disk.delete("key")
+    assert disk.get("key") is None
+
+
+def test_disk_cache_is_shared_between_instances(disk):
+    disk.set("key", b"value", 60)
+    assert DiskCache(disk.directory, sweep_interval=0).get("key")[0] == b"value"
+
+
+def test_sweep_removes_expired_entries_and_stale_temporary_files(disk):
+    disk.set("live", b"value", 60)
+    disk.set("expired", b"value", -1)
+    stale = os.path.join(disk.directory, "left-behind.tmp")
+    fresh = os.path.join(disk.directory, "in-progress.tmp")
+    for path in (stale, fresh):
+        open(path, "wb").close()
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+    os.makedirs(os.path.join(disk.directory, "trends"))
+    disk.sweep()
+    assert sorted(os.listdir(disk.directory)) == sorted([os.path.basename(disk._path("live")), "in-progress.tmp", "trends"])
+
+
+def test_sweep_drops_the_entries_closest_to_expiry_past_the_size_cap(disk):
+    for i, ttl in enumerate((300, 100, 200)):
+        disk.set(f"key{i}", b"x" * 400, ttl)
+    disk.sweep()
+    assert disk.get("key1") is None
+    assert disk.get("key0") is not None and disk.get("key2") is not None
+
+
+def test_disk_lock_serialises_fills_and_cleans_up(disk):
+    inside, overlaps = [], []
+
+    def fill():
+        with disk.lock("key"):
+            if inside:
+                overlaps.append(True)
+            inside.append(True)
+            time.sleep(0.01)
+            inside.pop()
+
+    threads = [threading.Thread(target=fill) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == []
+    assert not os.path.exists(disk._path("key", ".lock"))
+    assert disk._key_locks == {}
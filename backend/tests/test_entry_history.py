@@ -0,0 +1,88 @@
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from app import entry_history, models
+from app.entry_history import gameweek_history, past_seasons, sync_entries
+from app.main import app
+
+ENTRY = 1000
+
+
+@pytest.fixture
+def history_fetches(monkeypatch):
+    """Entry ids whose history was downloaded."""
+    fetched = []
+    get_json = entry_history.get_json
+
+    def recording_get_json(path, ttl=None):
+        fetched.append(int(path.split("/")[1]))
+        return get_json(path, ttl=ttl)
+
+    monkeypatch.setattr(entry_history, "get_json", recording_get_json)
+    return fetched
+
+
+def stored_row(db, event) -> models.EntryHistory:
+    return db.get(models.EntryHistory, (ENTRY, event))
+
+
+def test_sync_stores_the_season_and_past_seasons(fpl, db):
+    assert sync_entries(db, [ENTRY]) == [ENTRY]
+    rows = gameweek_history(db, ENTRY)
+    assert [(row.event, row.points, row.overall_rank) for row in rows] == [
+        (row["event"], row["points"], row["overall_rank"]) for row in fpl.history(ENTRY)["current"]
+    ]
+    assert len(past_seasons(db, ENTRY)) == len(fpl.history(ENTRY)["past"])
+    state = db.get(models.EntryHistorySync, ENTRY)
+    # Gameweek 10 is still being played
+    assert (state.last_event, state.last_event_final) == (10, False)
+
+
+def test_synced_entries_are_not_fetched_again_within_the_refresh_interval(fpl, db, history_fetches):
+    sync_entries(db, [ENTRY])
+    assert sync_entries(db, [ENTRY]) == []
+    assert gameweek_history(db, ENTRY, [9, 10])[0].event == 9
+    assert history_fetches == [ENTRY]
+
+
+def test_refresh_rewrites_only_the_unfinished_watermark_gameweek(fpl, db, monkeypatch):
+    sync_entries(db, [ENTRY])
+    stored_row(db, 5).points = stored_row(db, 10).points = -1
+    db.commit()
+    monkeypatch.setattr(entry_history, "HISTORY_REFRESH_INTERVAL", 0)
+    assert sync_entries(db, [ENTRY]) == [ENTRY]
+    db.expire_all()
+    assert stored_row(db, 5).points == -1
+    assert stored_row(db, 10).points == fpl.history(ENTRY)["current"][9]["points"]
+
+
+def test_failed_fetch_keeps_stored_rows(fpl, db, monkeypatch):
+    sync_entries(db, [ENTRY])
+
+    def get_json(path, ttl=None):
+        raise requests.ConnectionError("upstream down")
+
+    monkeypatch.setattr(entry_history, "get_json", get_json)
+    monkeypatch.setattr(entry_history, "HISTORY_REFRESH_INTERVAL", 0)
+    assert sync_entries(db, [ENTRY, 1001]) == []
+    assert len(gameweek_history(db, ENTRY)) == 10
+    # An entry that has never been synced has nothing to fall back on
+    with pytest.raises(requests.ConnectionError):
+        gameweek_history(db, 1001)
+
+
+def test_history_route_ranks_over_gameweeks_with_an_overall_rank(fpl, db, monkeypatch):
+    history = fpl.history(ENTRY)
+    history["current"][3]["overall_rank"] = None
+    monkeypatch.setattr(entry_history, "get_json", lambda path, ttl=None: history)
+    body = TestClient(app).get(f"/api/team/{ENTRY}/history").json()
+    ranked = [(row["overall_rank"], row["event"]) for row in history["current"] if row["overall_rank"] is not None]
+    assert len(body["ranks"]) == 10 and body["ranks"][3]["rank"] is None
+    assert (body["highest_rank"], body["highest_rank_gw"]) == min(ranked)
+    assert body["lowest_rank"] == max(ranked)[0]
+
+
+def test_previous_seasons_route_lists_the_newest_first(fpl, db):
+    seasons = TestClient(app).get(f"/api/team/{ENTRY}/previous-seasons").json()["seasons"]
+    assert [season["season"] for season in seasons] == [f"{year}/{(year + 1) % 100:02d}" for year in range(2023, 2015, -1)]
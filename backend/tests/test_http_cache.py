@@ -0,0 +1,126 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.http_cache import NO_STORE, REVALIDATE, CachePolicy, HttpCacheMiddleware, make_etag, policy_for
+from app.upstream import get_bootstrap
+
+REMEMBERED = CachePolicy("public, max-age=60", 60)
+
+
+class Route:
+    """An ASGI app answering every request with ``body``, counting the calls."""
+
+    def __init__(self, body: bytes = b'{"points": 1}', status: int = 200):
+        self.body = body
+        self.status = status
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        await send({"type": "http.response.start", "status": self.status, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+def client_for(route: Route, policy: CachePolicy) -> TestClient:
+    return TestClient(HttpCacheMiddleware(route, policy=lambda path, query_string: policy))
+
+
+def test_response_gets_etag_and_cache_control():
+    route = Route()
+    response = client_for(route, REMEMBERED).get("/api/fixtures")
+    assert response.status_code == 200
+    assert response.headers["etag"] == make_etag(route.body)
+    assert response.headers["cache-control"] == "public, max-age=60"
+    assert response.content == route.body
+
+
+def test_remembered_etag_is_answered_without_running_the_route():
+    route = Route()
+    client = client_for(route, REMEMBERED)
+    etag = client.get("/api/fixtures").headers["etag"]
+    response = client.get("/api/fixtures", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+    assert route.calls == 1
+
+
+def test_unremembered_etag_runs_the_route_and_still_answers_304():
+    route = Route()
+    client = client_for(route, REVALIDATE)
+    etag = client.get("/api/leagues").headers["etag"]
+    response = client.get("/api/leagues", headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+    assert route.calls == 2
+
+
+def test_changed_body_gets_a_new_etag():
+    route = Route()
+    client = client_for(route, REMEMBERED)
+    etag = client.get("/api/fixtures").headers["etag"]
+    route.body = b'{"points": 2}'
+    # The remembered ETag is replaced once the route runs again (e.g. without If-None-Match)
+    fresh = client.get("/api/fixtures")
+    assert fresh.headers["etag"] != etag
+    response = client.get("/api/fixtures", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.content == route.body
+
+
+def test_errors_and_non_api_paths_are_passed_through():
+    route = Route(status=500)
+    response = client_for(route, REMEMBERED).get("/api/fixtures")
+    assert response.status_code == 500
+    assert "etag" not in response.headers
+    route = Route()
+    assert "etag" not in client_for(route, REMEMBERED).get("/health").headers
+
+
+def test_finished_gameweek_is_immutable_and_live_one_is_short_lived(fpl):
+    get_bootstrap()
+    assert "immutable" in policy_for("/api/fixtures/9", "").header
+    assert "stale-while-revalidate" in policy_for("/api/fixtures/10", "").header
+    assert "immutable" in policy_for("/api/weekly-matchups/5", "event=3").header
+    assert "immutable" not in policy_for("/api/weekly-matchups/5", "").header
+
+
+def test_league_transfers_are_never_immutable(fpl):
+    get_bootstrap()
+    assert "stale-while-revalidate" in policy_for("/api/leagues/5/transfers", "event=3").header
+
+
+def test_policy_does_no_io_when_nothing_is_loaded():
+    # Upstream is unreachable here, so a fetch would raise rather than fall back to live
+    assert "stale-while-revalidate" in policy_for("/api/fixtures/3", "").header
+
+
+def test_database_and_debug_routes():
+    assert policy_for("/api/leagues", "") is REVALIDATE
+    assert policy_for("/api/leagues/5", "") is REVALIDATE
+    assert policy_for("/debug/db-test", "") is NO_STORE
+
+
+def test_etags_are_read_and_written_off_the_event_loop(cache, monkeypatch):
+    calls = []
+
+    def on_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    for name in ("get", "set"):
+        method = getattr(cache, name)
+
+        def recording(*args, name=name, method=method):
+            calls.append((name, on_event_loop()))
+            return method(*args)
+
+        monkeypatch.setattr(cache, name, recording)
+
+    client = client_for(Route(), REMEMBERED)
+    etag = client.get("/api/fixtures").headers["etag"]
+    assert client.get("/api/fixtures", headers={"If-None-Match": etag}).status_code == 304
+    assert calls == [("set", False), ("get", False)]
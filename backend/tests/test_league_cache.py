@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import league_cache, models
+from app.main import app
+
+LEAGUE = 7
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(app)
+
+
+@pytest.fixture
+def league(db) -> models.League:
+    league = models.League(id=LEAGUE, name="Original", created_at=datetime(2024, 8, 1), updated_at=datetime(2024, 8, 1), total_teams=20)
+    db.add(league)
+    db.commit()
+    return league
+
+
+def test_reads_are_served_from_the_cache(client, db, league):
+    assert client.get(f"/api/leagues/{LEAGUE}").json()["name"] == "Original"
+    # A change behind the routes' back is not seen until the entry expires
+    league.name = "Changed directly"
+    db.commit()
+    assert client.get(f"/api/leagues/{LEAGUE}").json()["name"] == "Original"
+    assert [row["name"] for row in client.get("/api/leagues").json()] == ["Changed directly"]
+
+
+def test_update_is_written_through(client, league):
+    client.get(f"/api/leagues/{LEAGUE}")
+    client.get("/api/leagues")
+    response = client.put(f"/api/leagues/{LEAGUE}", json={"name": "Renamed"})
+    assert response.status_code == 200
+    assert client.get(f"/api/leagues/{LEAGUE}").json()["name"] == "Renamed"
+    assert [row["name"] for row in client.get("/api/leagues").json()] == ["Renamed"]
+
+
+def test_delete_is_written_through(client, league):
+    client.get(f"/api/leagues/{LEAGUE}")
+    client.get("/api/leagues")
+    assert client.delete(f"/api/leagues/{LEAGUE}").status_code == 200
+    assert client.get(f"/api/leagues/{LEAGUE}").status_code == 404
+    assert client.get("/api/leagues").json() == []
+
+
+def test_created_league_replaces_a_cached_miss(client, db):
+    assert client.get(f"/api/leagues/{LEAGUE}").status_code == 404
+    assert client.post(f"/debug/create_league?league_id={LEAGUE}").json()["message"] == "League created successfully"
+    assert client.get(f"/api/leagues/{LEAGUE}").json()["name"] == "FPL League Hub"
+
+
+def test_rows_are_json_ready(db, league):
+    row = league_cache.league_row(league)
+    assert row["created_at"] == "2024-08-01T00:00:00"
+    assert league_cache.store(league) == row
+    assert league_cache.get_league(db, LEAGUE) == row
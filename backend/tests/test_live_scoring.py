@@ -0,0 +1,295 @@
+import pytest
+
+from app import live_scoring, upstream
+from app.live_scoring import LeaguePicks, LiveVectors, fetch_league_picks, provisional_bonus, score_league
+from app.snapshot import Snapshot, build_snapshot
+from app.transfers import league_entries
+
+EVENT = 1
+ENTRY = 1
+
+# Element id -> (element type, team). Player 13 is the only one on team 2,
+# so his fixture can be left unfinished while everyone else's is over.
+PLAYERS = {
+    1: (1, 1), 12: (1, 1),
+    2: (2, 1), 3: (2, 1), 4: (2, 1), 5: (2, 1), 13: (2, 2), 16: (2, 1),
+    6: (3, 1), 7: (3, 1), 8: (3, 1), 9: (3, 1), 14: (3, 1), 17: (3, 1),
+    10: (4, 1), 11: (4, 1), 15: (4, 1), 18: (4, 1),
+}
+# Squad order: starting XI, then the bench (keeper first)
+FOUR_FOUR_TWO = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
+THREE_FIVE_TWO = [1, 2, 3, 4, 6, 7, 8, 9, 17, 10, 11, 12, 16, 14, 15]
+
+
+def make_snapshot(team_2_finished: bool = True, deadline: str = "2024-08-16T17:30:00Z") -> Snapshot:
+    bootstrap = {
+        "teams": [{"id": team, "code": team, "name": f"Team {team}", "short_name": f"T{team}"} for team in (1, 2, 3, 4)],
+        "elements": [
+            {"id": element, "element_type": element_type, "team": team, "web_name": f"Player {element}"}
+            for element, (element_type, team) in PLAYERS.items()
+        ],
+        "events": [{"id": EVENT, "is_current": True, "deadline_time": deadline}],
+    }
+    fixtures = [
+        {"id": 1, "event": EVENT, "team_h": 1, "team_a": 3, "finished": True, "finished_provisional": True},
+        {"id": 2, "event": EVENT, "team_h": 2, "team_a": 4, "finished": team_2_finished, "finished_provisional": team_2_finished},
+    ]
+    return Snapshot(build_snapshot(bootstrap, fixtures))
+
+
+def make_live(minutes, snapshot=None, fixtures=None) -> LiveVectors:
+    """Live vectors where everyone played 90 minutes unless ``minutes`` says otherwise.
+
+    A player who played scores his element id in points, so totals show who counted.
+    """
+    elements = [
+        {"id": element, "stats": {"minutes": minutes.get(element, 90), "total_points": element if minutes.get(element, 90) else 0}}
+        for element in PLAYERS
+    ]
+    return LiveVectors({"elements": elements}, snapshot or make_snapshot(), EVENT, fixtures)
+
+
+def make_picks(squad, captain=6, vice_captain=7, chip=None, hits=0) -> LeaguePicks:
+    picks = [
+        {"element": element, "position": position, "is_captain": element == captain, "is_vice_captain": element == vice_captain}
+        for position, element in enumerate(squad, start=1)
+    ]
+    return LeaguePicks(EVENT, {ENTRY: {"picks": picks, "active_chip": chip, "entry_history": {"event_transfers_cost": hits}}})
+
+
+def starting_elements(picks: LeaguePicks, live: LiveVectors):
+    scored = score_league(picks, live)
+    return sorted(picks.elements[0][scored.starting[0]].tolist())
+
+
+def test_everyone_played_scores_the_xi_with_double_captain():
+    picks = make_picks(FOUR_FOUR_TWO, hits=4)
+    scores = score_league(picks, make_live({})).scores
+    assert scores.tolist() == [sum(range(1, 12)) + 6 - 4]
+
+
+def test_absent_starter_is_replaced_by_the_first_bench_player():
+    picks = make_picks(FOUR_FOUR_TWO)
+    live = make_live({2: 0})
+    assert starting_elements(picks, live) == [1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 13]
+
+
+def test_bench_players_who_did_not_play_are_skipped():
+    picks = make_picks(FOUR_FOUR_TWO)
+    live = make_live({2: 0, 13: 0})
+    assert starting_elements(picks, live) == [1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 14]
+
+
+def test_substitution_must_keep_a_valid_formation():
+    # Three defenders: the absent one can only be replaced by a defender, and the bench one did not play
+    picks = make_picks(THREE_FIVE_TWO)
+    live = make_live({2: 0, 16: 0})
+    assert starting_elements(picks, live) == sorted(THREE_FIVE_TWO[:11])
+
+
+def test_keepers_only_replace_keepers():
+    picks = make_picks(FOUR_FOUR_TWO)
+    assert starting_elements(picks, make_live({1: 0, 12: 0})) == sorted(FOUR_FOUR_TWO[:11])
+    assert starting_elements(picks, make_live({1: 0})) == [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+
+
+def test_bench_player_yet_to_play_holds_up_the_substitution():
+    picks = make_picks(FOUR_FOUR_TWO)
+    live = make_live({2: 0, 13: 0}, snapshot=make_snapshot(team_2_finished=False))
+    assert starting_elements(picks, live) == sorted(FOUR_FOUR_TWO[:11])
+
+
+def test_starter_yet_to_play_is_not_substituted():
+    squad = [1, 13, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 2, 14, 15]
+    picks = make_picks(squad)
+    live = make_live({13: 0}, snapshot=make_snapshot(team_2_finished=False))
+    assert 13 in starting_elements(picks, live)
+
+
+def test_bench_boost_scores_the_bench_without_substitutions():
+    picks = make_picks(FOUR_FOUR_TWO, chip="bboost")
+    live = make_live({2: 0})
+    scored = score_league(picks, live)
+    assert scored.starting[0].tolist() == [True] * 11 + [False] * 4
+    assert scored.scores.tolist() == [sum(range(1, 16)) - 2 + 6]
+
+
+def test_vice_captain_takes_the_armband_when_the_captain_did_not_play():
+    picks = make_picks(FOUR_FOUR_TWO, captain=6, vice_captain=7)
+    scored = score_league(picks, make_live({6: 0}))
+    multipliers = dict(zip(picks.elements[0].tolist(), scored.multipliers[0].tolist()))
+    assert multipliers[6] == 0
+    assert multipliers[7] == 2
+    # 6 is replaced from the bench by 13 (the first outfield substitute)
+    assert scored.scores.tolist() == [sum(range(1, 12)) - 6 + 13 + 7]
+
+
+def test_triple_captain_passes_to_the_vice_captain():
+    picks = make_picks(FOUR_FOUR_TWO, captain=6, vice_captain=7, chip="3xc")
+    scored = score_league(picks, make_live({6: 0}))
+    assert dict(zip(picks.elements[0].tolist(), scored.multipliers[0].tolist()))[7] == 3
+
+
+def test_captain_yet_to_play_keeps_the_armband():
+    squad = [1, 2, 3, 4, 13, 6, 7, 8, 9, 10, 11, 12, 5, 14, 15]
+    picks = make_picks(squad, captain=13, vice_captain=7)
+    scored = score_league(picks, make_live({13: 0}, snapshot=make_snapshot(team_2_finished=False)))
+    multipliers = dict(zip(picks.elements[0].tolist(), scored.multipliers[0].tolist()))
+    assert multipliers[13] == 2
+    assert multipliers[7] == 1
+
+
+def bps_fixture(fixture_id, home, away=(), bonus=()):
+    stats = [{"identifier": "bps", "h": [{"element": e, "value": v} for e, v in home], "a": [{"element": e, "value": v} for e, v in away]}]
+    if bonus:
+        stats.append({"identifier": "bonus", "h": [{"element": e, "value": v} for e, v in bonus], "a": []})
+    return {"id": fixture_id, "stats": stats}
+
+
+def test_provisional_bonus_ranks_each_fixture_by_bps():
+    fixtures = [bps_fixture(1, [(2, 40), (3, 30)], [(4, 20), (5, 10)])]
+    bonus = provisional_bonus([], fixtures, 20)
+    assert {element: int(bonus[element]) for element in (2, 3, 4, 5)} == {2: 3, 3: 2, 4: 1, 5: 0}
+
+
+@pytest.mark.parametrize("scores, expected", [
+    ([40, 40, 30, 20], [3, 3, 1, 0]),
+    ([40, 30, 30, 20], [3, 2, 2, 0]),
+    ([40, 30, 20, 20], [3, 2, 1, 1]),
+])
+def test_provisional_bonus_ties_share_a_rank(scores, expected):
+    fixtures = [bps_fixture(1, list(zip([2, 3, 4, 5], scores)))]
+    bonus = provisional_bonus([], fixtures, 20)
+    assert [int(bonus[element]) for element in (2, 3, 4, 5)] == expected
+
+
+def test_provisional_bonus_skips_confirmed_fixtures():
+    fixtures = [bps_fixture(1, [(2, 40), (3, 30)], bonus=[(2, 3)]), bps_fixture(2, [(13, 25)])]
+    bonus = provisional_bonus([], fixtures, 20)
+    assert int(bonus[2]) == 0 and int(bonus[3]) == 0
+    assert int(bonus[13]) == 3
+
+
+def test_provisional_bonus_counts_both_fixtures_of_a_double_gameweek():
+    fixtures = [bps_fixture(1, [(2, 40), (3, 30)]), bps_fixture(2, [(3, 50), (4, 20), (2, 10)])]
+    bonus = provisional_bonus([], fixtures, 20)
+    assert int(bonus[2]) == 3 + 1 and int(bonus[3]) == 2 + 3
+
+
+def test_provisional_bonus_falls_back_to_explain_without_fixture_stats():
+    elements = [
+        {"id": element, "stats": {"minutes": 90, "bps": bps}, "explain": [{"fixture": 1, "stats": []}]}
+        for element, bps in ((2, 12), (3, 25), (4, 18))
+    ]
+    bonus = provisional_bonus(elements, [{"id": 1, "stats": []}], 20)
+    assert [int(bonus[element]) for element in (3, 4, 2)] == [3, 2, 1]
+
+
+def test_live_points_include_provisional_bonus():
+    live = make_live({}, fixtures=[bps_fixture(1, [(6, 40)])])
+    assert int(live.points[6]) == 6 + 3
+    assert int(live.provisional_bonus[6]) == 3
+
+
+def test_fetch_league_picks_leaves_out_entries_without_picks(fpl, cache):
+    picks = fetch_league_picks([1000, 1001, 999999], 10)
+    assert picks.entry_ids.tolist() == [1000, 1001]
+    assert picks.failed == []
+    # The 404 is remembered for the gameweek rather than fetched again
+    assert cache.get("no-picks:999999:10") is not None
+
+
+def test_fetch_league_picks_reports_failed_fetches(fpl, monkeypatch):
+    def get_entry_picks(entry_id, event):
+        if entry_id == 1001:
+            raise live_scoring.requests.ConnectionError("upstream down")
+        return fpl.picks(entry_id, event)
+
+    monkeypatch.setattr(live_scoring, "get_entry_picks", get_entry_picks)
+    picks = fetch_league_picks([1000, 1001], 10)
+    assert picks.entry_ids.tolist() == [1000]
+    assert picks.failed == [1001]
+
+
+def test_fetch_league_picks_before_the_deadline_fetches_nothing(monkeypatch):
+    fetched = []
+    monkeypatch.setattr(live_scoring, "get_snapshot", lambda: make_snapshot(deadline="2999-01-01T00:00:00Z"))
+    monkeypatch.setattr(live_scoring, "get_entry_picks", lambda entry_id, event: fetched.append(entry_id))
+    picks = fetch_league_picks([1000, 1001], EVENT)
+    assert len(picks) == 0 and picks.failed == []
+    assert fetched == []
+
+
+def test_score_event_scores_every_entry_with_picks(fpl):
+    scored = live_scoring.score_event(fpl.entry_ids, 10)
+    assert sorted(scored.scores()) == fpl.entry_ids
+    assert all(isinstance(score, int) for score in scored.scores().values())
+
+
+def match(match_id, entry_1, entry_2, points_1=0, points_2=0):
+    return {"id": match_id, "entry_1_entry": entry_1, "entry_2_entry": entry_2, "entry_1_points": points_1, "entry_2_points": points_2}
+
+
+def test_live_matches_take_live_scores_and_set_results():
+    matches = live_scoring.live_matches([match(1, 10, 20, 5, 7), match(2, 30, None, 0, 40)], {10: 60, 20: 55, 30: 40})
+    assert (matches[0]["entry_1_points"], matches[0]["entry_2_points"], matches[0]["winner"]) == (60, 55, 10)
+    assert (matches[0]["entry_1_win"], matches[0]["entry_2_loss"]) == (1, 1)
+    # The AVERAGE opponent keeps upstream's points
+    assert (matches[1]["entry_2_points"], matches[1]["winner"], matches[1]["entry_1_draw"]) == (40, None, 1)
+
+
+def test_projected_standings_add_live_results_and_rerank():
+    standings = [
+        {"entry": 10, "rank": 1, "total": 9, "points_for": 200, "matches_played": 3, "matches_won": 3},
+        {"entry": 20, "rank": 2, "total": 9, "points_for": 150, "matches_played": 3, "matches_won": 3},
+        {"entry": 30, "rank": 3, "total": 7, "points_for": 180, "matches_played": 3, "matches_won": 2},
+    ]
+    matches = live_scoring.live_matches([match(1, 10, 30), match(2, 20, None)], {10: 40, 30: 70, 20: 50})
+    table = live_scoring.projected_standings(standings, matches, include_event=True)
+    assert [(row["entry"], row["rank"], row["last_rank"], row["total"]) for row in table] == [(20, 1, 2, 12), (30, 2, 3, 10), (10, 3, 1, 9)]
+    assert table[1]["matches_won"] == 3 and table[1]["live_points"] == 70
+
+    # Once upstream has folded the gameweek in, only the live points are shown
+    folded = live_scoring.projected_standings(standings, matches, include_event=False)
+    assert [(row["entry"], row["total"], row["live_points"]) for row in folded] == [(10, 9, 40), (20, 9, 50), (30, 7, 70)]
+
+
+def test_league_live_scores_the_whole_league(fpl):
+    result = live_scoring.league_live(5, 10)
+    assert result["event"] == 10 and not result["finished"]
+    assert len(result["matches"]) == len(fpl.entry_ids) // 2
+    assert sorted(row["entry"] for row in result["standings"]) == fpl.entry_ids
+    assert [row["rank"] for row in result["standings"]] == list(range(1, len(fpl.entry_ids) + 1))
+    assert all(row["matches_played"] == 10 for row in result["standings"])
+
+
+def test_league_live_reads_every_page_of_the_standings(fpl, monkeypatch):
+    rows = fpl.standings(5)["standings"]["results"]
+
+    def get_league_standings(league_id, page=1):
+        return {"standings": {"has_next": page * 8 < len(rows), "page": page, "results": rows[(page - 1) * 8:page * 8]}}
+
+    monkeypatch.setattr(upstream, "get_league_standings", get_league_standings)
+    result = live_scoring.league_live(5, 10)
+    assert sorted(row["entry"] for row in result["standings"]) == fpl.entry_ids
+    assert [row["entry"] for row in league_entries(5)] == [row["entry"] for row in rows]
+
+
+@pytest.fixture
+def upcoming(fpl, monkeypatch):
+    """Gameweek 10 with its deadline still to come."""
+    bootstrap = fpl.bootstrap()
+    bootstrap["events"] = [dict(gw, deadline_time="2999-01-01T00:00:00Z") if gw["id"] == 10 else gw for gw in bootstrap["events"]]
+    monkeypatch.setattr(live_scoring, "get_snapshot", lambda: Snapshot(build_snapshot(bootstrap, fpl.fixtures)))
+    monkeypatch.setattr(live_scoring, "score_event", lambda entry_ids, event: pytest.fail("scored before the deadline"))
+
+
+def test_matches_before_the_deadline_are_left_as_upstream_has_them(fpl, upcoming):
+    upstream_matches = fpl.matches(5, 10, 1)["results"]
+    assert live_scoring.league_event_matches(5, 10) == upstream_matches
+    result = live_scoring.league_live(5, 10)
+    assert result["started"] is False and result["matches"] == upstream_matches
+    standings = fpl.standings(5)["standings"]["results"]
+    assert [(row["entry"], row["total"], row["rank"], row["live_points"]) for row in result["standings"]] == [
+        (row["entry"], row["total"], row["rank"], None) for row in standings
+    ]
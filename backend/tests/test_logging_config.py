@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+import queue
+from types import SimpleNamespace
+
+import pytest
+
+from app import logging_config
+from app.logging_config import ContextFilter, DroppingQueueHandler, JsonFormatter, RequestContextMiddleware, summarize
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+        self.addFilter(ContextFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def capture():
+    handler = Capture()
+    # Kept away from the root handler the app installs, which filters (and samples) records too
+    loggers = {logger: (logger.level, logger.propagate) for logger in (logging.getLogger("app.tests"), logging_config.access_logger)}
+    for logger in loggers:
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        logger.addHandler(handler)
+    yield handler
+    for logger, (level, propagate) in loggers.items():
+        logger.setLevel(level)
+        logger.propagate = propagate
+        logger.removeHandler(handler)
+
+
+@pytest.fixture
+def sample_rate(monkeypatch):
+    """Debug sampling at 50%, with the coin flips taken from ``flips``."""
+    flips = []
+    monkeypatch.setattr(logging_config, "LOG_DEBUG_SAMPLE_RATE", 0.5)
+    monkeypatch.setattr(logging_config, "random", SimpleNamespace(random=lambda: flips.pop(0)))
+    return flips
+
+
+def call(headers=()):
+    """Response headers of a request whose route logs two debug lines."""
+    messages = []
+    logger = logging.getLogger("app.tests")
+
+    async def route(scope, receive, send):
+        logger.debug("first")
+        logger.debug("second")
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/example", "query_string": b"", "headers": list(headers)}
+    asyncio.run(RequestContextMiddleware(route)(scope, receive, send))
+    return dict(messages[0]["headers"])
+
+
+def test_summarize_keeps_small_values():
+    assert summarize({"a": [1, 2.5, None, True], "b": "text"}) == {"a": [1, 2.5, None, True], "b": "text"}
+
+
+def test_summarize_cuts_long_containers_and_strings():
+    assert summarize(list(range(8)), max_items=3) == [0, 1, 2, "+5 items"]
+    assert summarize({str(i): i for i in range(4)}, max_items=2) == {"0": 0, "1": 1, "...": "+2 keys"}
+    assert summarize("x" * 10, max_chars=4) == "xxxx...(+6 chars)"
+
+
+def test_summarize_stops_at_the_depth_limit():
+    nested = {"elements": [{"id": 1, "stats": {"minutes": 90}}]}
+    assert summarize(nested, depth=2) == {"elements": ["<dict of 2>"]}
+    assert summarize([[1, 2], (3,)], depth=1) == ["<list of 2>", "<tuple of 1>"]
+    assert summarize(object(), max_chars=8).startswith("<object ")
+
+
+def test_requests_get_an_id_that_is_stamped_on_their_records(capture):
+    generated = call()[b"x-request-id"]
+    assert len(generated) == 16
+    assert call(headers=[(b"x-request-id", b"abc")])[b"x-request-id"] == b"abc"
+    assert [record.request_id for record in capture.records] == [generated.decode()] * 3 + ["abc"] * 3
+    access = capture.records[-1]
+    assert access.name == "app.access" and access.fields["status"] == 204 and access.fields["path"] == "/api/example"
+    assert logging_config.current_request_id() is None
+
+
+def test_debug_sampling_is_decided_once_per_request(capture, sample_rate):
+    sample_rate.extend([0.9, 0.1])
+    call()
+    call()
+    # The first request is left out whole, the second kept whole; info lines always pass
+    assert [(record.request_id is not None, record.getMessage()) for record in capture.records] == [
+        (True, "GET /api/example 204"), (True, "first"), (True, "second"), (True, "GET /api/example 204"),
+    ]
+    assert capture.records[0].request_id != capture.records[1].request_id
+
+
+def test_debug_records_outside_a_request_are_sampled_one_by_one(capture, sample_rate):
+    sample_rate.extend([0.9, 0.1])
+    logger = logging.getLogger("app.tests")
+    logger.debug("dropped")
+    logger.debug("kept")
+    logger.info("always")
+    assert [record.getMessage() for record in capture.records] == ["kept", "always"]
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    record = logging.LogRecord("app.tests", logging.INFO, __file__, 1, "value %s", ({"mutable": 1},), None)
+    handler.handle(record)
+    handler.handle(logging.LogRecord("app.tests", logging.INFO, __file__, 2, "second", None, None))
+    assert handler.dropped == 1
+    queued = handler.queue.get_nowait()
+    assert (queued.msg, queued.args) == ("value {'mutable': 1}", None)
+
+
+def test_json_lines_carry_the_request_id_and_fields():
+    record = logging.LogRecord("app.access", logging.INFO, __file__, 1, "GET /api 200", None, None)
+    record.request_id = "abc"
+    record.fields = {"status": 200}
+    assert json.loads(JsonFormatter().format(record)) == {
+        "ts": round(record.created, 3), "level": "INFO", "logger": "app.access", "msg": "GET /api 200", "request_id": "abc", "status": 200,
+    }
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+
+import pytest
+
+from app import match_index
+from app.match_index import fetch_event_matches, lookup_match, resolve_match
+
+
+@pytest.fixture(autouse=True)
+def known(monkeypatch):
+    """This worker's in-memory index, emptied for each test."""
+    known = OrderedDict()
+    monkeypatch.setattr(match_index, "_known", known)
+    return known
+
+
+def test_fetched_matches_are_indexed_without_points(fpl):
+    matches = fetch_event_matches(5, 3)
+    entry = lookup_match(matches[0]["id"])
+    assert entry["league"] == 5 and entry["event"] == 3
+    assert entry["entry_1_entry"] == matches[0]["entry_1_entry"]
+    assert "entry_1_points" not in entry
+
+
+def test_other_workers_find_matches_in_the_shared_cache(fpl, known):
+    match_id = fetch_event_matches(5, 3)[0]["id"]
+    known.clear()
+    assert lookup_match(match_id)["event"] == 3
+    assert match_id in known
+
+
+def test_resolve_match_fetches_the_league_on_a_miss(fpl, monkeypatch):
+    fetched = []
+    fetch = match_index.get_league_matches
+
+    def recording_fetch(league_id, event, page=1):
+        fetched.append((league_id, event, page))
+        return fetch(league_id, event, page)
+
+    monkeypatch.setattr(match_index, "get_league_matches", recording_fetch)
+    assert lookup_match(4001) is None
+    assert resolve_match(4001, 4, 5)["entry_2_entry"]
+    assert resolve_match(4001, 4, 5) is not None
+    assert fetched == [(5, 4, 1)]
+    assert resolve_match(999999, 4, 5) is None
+
+
+def test_memory_keeps_the_most_recently_used_matches(fpl, known, monkeypatch):
+    monkeypatch.setattr(match_index, "MATCH_INDEX_MEMORY_SIZE", 3)
+    ids = [match["id"] for match in fetch_event_matches(5, 3)]
+    assert list(known) == ids[-3:]
+    lookup_match(ids[-3])
+    lookup_match(ids[0])
+    assert list(known) == [ids[-1], ids[-3], ids[0]]
+    # Evicted matches are still found in the shared cache
+    assert lookup_match(ids[1])["event"] == 3
@@ -0,0 +1,52 @@
+import pytest
+import requests
+
+from app import live_scoring, ownership
+from app.ownership import DIFFERENTIAL_MAX_OWNERSHIP, league_ownership
+
+LEAGUE = 5
+
+
+def test_counts_cover_the_whole_league(fpl):
+    result = league_ownership(LEAGUE, 10)
+    managers = len(fpl.entry_ids)
+    assert result["managers"] == managers and result["finished"] is False
+    assert sum(player["owners"] for player in result["players"]) == managers * 15
+    assert sum(captain["captains"] for captain in result["captains"]) == managers
+    assert sorted(entry["entry"] for entry in result["entries"]) == fpl.entry_ids
+    # Gains are measured against the league average, so they cancel out
+    assert sum(entry["gain_over_league"] for entry in result["entries"]) == pytest.approx(0, abs=0.1 * managers)
+
+
+def test_players_are_ranked_by_effective_ownership(fpl):
+    players = league_ownership(LEAGUE, 10)["players"]
+    eo = [player["effective_ownership"] for player in players]
+    assert eo == sorted(eo, reverse=True)
+    for player in players:
+        assert player["ownership"] == round(player["owners"] * 100 / len(fpl.entry_ids), 1)
+        assert player["benched"] <= player["owners"]
+
+
+def test_differentials_are_rarely_owned_starters(fpl):
+    for entry in league_ownership(LEAGUE, 10)["entries"]:
+        for player in entry["differentials"]:
+            assert player["ownership"] <= DIFFERENTIAL_MAX_OWNERSHIP
+            assert player["multiplier"] > 0
+
+
+def test_result_is_cached(fpl, monkeypatch):
+    first = league_ownership(LEAGUE, 10)
+    monkeypatch.setattr(ownership, "compute_ownership", lambda league_id, event: pytest.fail("computed again"))
+    assert league_ownership(LEAGUE, 10) == first
+
+
+def test_partial_picks_are_an_error_and_not_cached(fpl, monkeypatch, cache):
+    def get_entry_picks(entry_id, event):
+        if entry_id == fpl.entry_ids[3]:
+            raise requests.ConnectionError("upstream down")
+        return fpl.picks(entry_id, event)
+
+    monkeypatch.setattr(live_scoring, "get_entry_picks", get_entry_picks)
+    with pytest.raises(requests.RequestException):
+        league_ownership(LEAGUE, 10)
+    assert cache.get(f"league-ownership:{LEAGUE}:10") is None
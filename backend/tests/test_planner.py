@@ -0,0 +1,44 @@
+from app.planner import difficulty_table, entry_planner
+from app.snapshot import get_snapshot
+
+
+def team_fixtures(fpl, team, events):
+    """(event, difficulty) of each of ``team``'s fixtures in ``events``, from the raw payload."""
+    found = []
+    for fixture in fpl.fixtures:
+        if fixture["event"] in events:
+            if fixture["team_h"] == team:
+                found.append((fixture["event"], fixture["team_h_difficulty"]))
+            if fixture["team_a"] == team:
+                found.append((fixture["event"], fixture["team_a_difficulty"]))
+    return found
+
+
+def test_planner_covers_the_next_gameweeks(fpl):
+    result = entry_planner(1000, 3)
+    assert result["picks_event"] == 10
+    assert result["events"] == [11, 12, 13]
+    assert [player["element"] for player in result["players"]] == [pick["element"] for pick in fpl.picks(1000, 10)["picks"]]
+
+
+def test_player_difficulty_matches_the_fixtures(fpl):
+    snapshot = get_snapshot()
+    result = entry_planner(1000, 3)
+    for player in result["players"]:
+        expected = team_fixtures(fpl, snapshot.player(player["element"])["team"], result["events"])
+        assert [(fixture["event"], fixture["difficulty"]) for fixture in player["fixtures"]] == sorted(expected)
+        assert player["fixture_count"] == len(expected)
+        assert player["difficulty_total"] == sum(difficulty for _, difficulty in expected)
+        assert player["blanks"] == len(set(result["events"]) - {event for event, _ in expected})
+
+
+def test_squad_totals_add_up(fpl):
+    squad = entry_planner(1000, 3)["squad"]
+    for key in ("fixture_count", "difficulty_total"):
+        assert squad["all"][key] == squad["starting_xi"][key] + squad["bench"][key]
+    assert sum(row["fixtures"] for row in squad["all"]["by_event"]) == squad["all"]["fixture_count"]
+
+
+def test_table_is_built_once_per_snapshot(fpl):
+    snapshot = get_snapshot()
+    assert difficulty_table(snapshot) is difficulty_table(snapshot)
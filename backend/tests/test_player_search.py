@@ -0,0 +1,109 @@
+import copy
+
+import pytest
+
+from app import player_search
+from app.player_search import NameIndex, PlayerIndex, get_player_index, normalize
+
+BOOTSTRAP = {
+    "teams": [
+        {"id": 1, "name": "Arsenal", "short_name": "ARS"},
+        {"id": 2, "name": "Man City", "short_name": "MCI"},
+        {"id": 3, "name": "Liverpool", "short_name": "LIV"},
+    ],
+    "element_types": [
+        {"id": 1, "singular_name_short": "GKP"}, {"id": 2, "singular_name_short": "DEF"},
+        {"id": 3, "singular_name_short": "MID"}, {"id": 4, "singular_name_short": "FWD"},
+    ],
+    "elements": [
+        {"id": 1, "web_name": "Ødegaard", "first_name": "Martin", "second_name": "Ødegaard", "team": 1, "element_type": 3, "now_cost": 85, "selected_by_percent": "30.0"},
+        {"id": 2, "web_name": "Haaland", "first_name": "Erling", "second_name": "Haaland", "team": 2, "element_type": 4, "now_cost": 150, "selected_by_percent": "80.0"},
+        {"id": 3, "web_name": "M.Salah", "first_name": "Mohamed", "second_name": "Salah", "team": 3, "element_type": 3, "now_cost": 130, "selected_by_percent": "60.0"},
+        {"id": 4, "web_name": "Saka", "first_name": "Bukayo", "second_name": "Saka", "team": 1, "element_type": 3, "now_cost": 100, "selected_by_percent": "40.0"},
+        {"id": 5, "web_name": "Salas", "first_name": "Diego", "second_name": "Salas", "team": 3, "element_type": 2, "now_cost": 45, "selected_by_percent": "1.0"},
+    ],
+}
+
+
+@pytest.fixture
+def index() -> PlayerIndex:
+    return PlayerIndex(BOOTSTRAP, NameIndex(BOOTSTRAP["elements"], BOOTSTRAP["teams"]))
+
+
+def ids(index: PlayerIndex, query: str, **filters):
+    return [player["id"] for player in index.search(query, **filters)[1]]
+
+
+def test_normalize_folds_case_and_accents():
+    assert normalize("Ødegaard") == "odegaard"
+    assert normalize("  Gabriel Martinelli-Silva ") == "gabriel martinelli silva"
+    assert normalize(None) == ""
+
+
+def test_accented_names_match_plain_queries(index):
+    assert ids(index, "odegaard") == [1]
+    assert ids(index, "ØDEGAARD") == [1]
+
+
+def test_exact_match_ranks_above_prefix_and_fuzzy_matches(index):
+    assert ids(index, "salas") == [5, 3]
+    assert ids(index, "salah") == [3, 5]
+
+
+def test_equal_matches_rank_by_ownership(index):
+    # "sala" is a prefix of both second names (and one edit from "saka")
+    assert ids(index, "sala") == [3, 5, 4]
+    assert ids(index, "") == [2, 3, 4, 1, 5]
+
+
+def test_team_names_match_their_players(index):
+    assert ids(index, "arsenal") == [4, 1]
+    assert ids(index, "mci") == [2]
+
+
+def test_one_typo_still_matches(index):
+    assert ids(index, "haalnd") == [2]
+    assert ids(index, "odegard") == [1]
+    # Too short to match fuzzily
+    assert ids(index, "hx") == []
+
+
+def test_every_query_word_must_match(index):
+    assert ids(index, "mohamed salah") == [3]
+    assert ids(index, "liverpool salas") == [5, 3]
+    assert ids(index, "erling salah") == []
+
+
+def test_filters_and_limit(index):
+    assert ids(index, "", position=3) == [3, 4, 1]
+    assert ids(index, "", min_cost=90, max_cost=130) == [3, 4]
+    total, results = index.search("", limit=2)
+    assert total == 5
+    assert [player["id"] for player in results] == [2, 3]
+
+
+def test_results_carry_team_and_position(index):
+    result = index.search("haaland")[1][0]
+    assert result["teamShortName"] == "MCI"
+    assert result["position"] == "FWD"
+    assert result["score"] == 100.0
+
+
+def test_name_index_is_reused_until_a_name_changes(monkeypatch):
+    bootstrap = copy.deepcopy(BOOTSTRAP)
+    monkeypatch.setattr(player_search, "get_bootstrap", lambda: bootstrap)
+    monkeypatch.setattr(player_search, "_current", None)
+    monkeypatch.setattr(player_search, "_names", None)
+    first = get_player_index()
+    assert get_player_index() is first
+
+    # A new payload with a price change keeps the names
+    bootstrap = copy.deepcopy(bootstrap)
+    bootstrap["elements"][0]["now_cost"] = 90
+    repriced = get_player_index()
+    assert repriced is not first and repriced.names is first.names
+    assert repriced.search("odegaard")[1][0]["now_cost"] == 90
+
+    bootstrap = copy.deepcopy(bootstrap)
+    bootstrap["elements"][0]["web_name"] = "Odegaard Jr"
+    assert get_player_index().names is not first.names
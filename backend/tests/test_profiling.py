@@ -0,0 +1,72 @@
+import asyncio
+import cProfile
+import io
+import json
+import pstats
+from collections import deque
+
+import pytest
+
+from app import profiling
+from app.profiling import ProfilingMiddleware, _function_label, get_profile, list_profiles
+
+
+async def route(scope, receive, send):
+    body = json.dumps({"values": [str(i) for i in range(1000)]}).encode()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+def call(headers=(), query=b""):
+    """Headers of a GET through the profiling middleware."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/example", "query_string": query, "headers": list(headers)}
+    asyncio.run(ProfilingMiddleware(route)(scope, receive, send))
+    return dict(messages[0]["headers"])
+
+
+@pytest.fixture(autouse=True)
+def stored(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "_stored_profiles", deque(maxlen=2))
+
+
+def test_labels_are_formatted_as_pstats_prints_them():
+    profile = cProfile.Profile()
+    profile.enable()
+    sorted([3, 1, 2])
+    json.dumps({})
+    profile.disable()
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    labels = {_function_label(func) for func in stats.stats}  # type: ignore[attr-defined]
+    assert "{built-in method builtins.sorted}" in labels
+    assert "{method 'disable' of '_lsprof.Profiler' objects}" in labels
+    assert any("json/__init__.py:" in label and label.endswith("(dumps)") for label in labels)
+
+
+def test_requests_without_the_token_are_not_profiled():
+    assert b"x-profile-id" not in call()
+    assert b"x-profile-id" not in call(headers=[(b"x-profile-token", b"wrong")])
+    assert list_profiles() == []
+
+
+def test_profiled_request_stores_a_report():
+    profile_id = int(call(headers=[(b"x-profile-token", b"secret")])[b"x-profile-id"])
+    report = get_profile(profile_id)
+    assert report["path"] == "/api/example" and report["status_code"] == 200
+    assert report["breakdown"]["json"] > 0
+    assert any("(dumps)" in row["function"] for row in report["top_functions"])
+    assert [summary["id"] for summary in list_profiles()] == [profile_id]
+
+
+def test_only_the_latest_reports_are_kept():
+    ids = [int(call(query=b"__profile=secret")[b"x-profile-id"]) for _ in range(3)]
+    assert [summary["id"] for summary in list_profiles()] == ids[:0:-1]
+    assert get_profile(ids[0]) is None
@@ -0,0 +1,81 @@
+import struct
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import snapshot
+from app.main import app
+from app.snapshot import Snapshot, build_snapshot, get_snapshot, load_snapshot, write_snapshot
+
+
+@pytest.fixture
+def payloads(fpl):
+    return fpl.bootstrap(), fpl.fixtures
+
+
+def test_lookups_match_the_payloads(payloads, tmp_path):
+    bootstrap, fixtures = payloads
+    path = str(tmp_path / "reference.snap")
+    write_snapshot(path, build_snapshot(bootstrap, fixtures))
+    loaded = load_snapshot(path)
+
+    element = bootstrap["elements"][41]
+    player = loaded.player(element["id"])
+    assert player["web_name"] == element["web_name"]
+    assert player["now_cost"] == element["now_cost"]
+    # Percentages survive exactly (stored as float64)
+    assert player["selected_by_percent"] == float(element["selected_by_percent"])
+    assert player["form"] == float(element["form"])
+    assert loaded.team(3)["short_name"] == bootstrap["teams"][2]["short_name"]
+    assert loaded.player(99999) is None
+    assert loaded.current_event()["id"] == 10
+    assert loaded.next_event()["id"] == 11
+    assert len(list(loaded.players())) == len(bootstrap["elements"])
+
+
+def test_fixtures_by_gameweek(payloads):
+    bootstrap, fixtures = payloads
+    loaded = Snapshot(build_snapshot(bootstrap, fixtures))
+    gameweek = loaded.fixtures(10)
+    assert [fixture["id"] for fixture in gameweek] == [fixture["id"] for fixture in fixtures if fixture["event"] == 10]
+    # Unplayed fixtures keep their missing scores
+    assert gameweek[0]["team_h_score"] is None
+    assert loaded.fixtures(9)[0]["team_h_score"] is not None
+    assert loaded.fixtures(99) == []
+    assert len(loaded.fixtures()) == len(fixtures)
+
+
+def test_source_hash_follows_the_content(payloads):
+    bootstrap, fixtures = payloads
+    first = Snapshot(build_snapshot(bootstrap, fixtures, built_at=1))
+    assert Snapshot(build_snapshot(bootstrap, fixtures, built_at=2)).source_hash == first.source_hash
+    changed = dict(bootstrap, elements=[dict(bootstrap["elements"][0], now_cost=1)] + bootstrap["elements"][1:])
+    assert Snapshot(build_snapshot(changed, fixtures)).source_hash != first.source_hash
+
+
+def test_unreadable_files_are_ignored(payloads, tmp_path):
+    path = tmp_path / "reference.snap"
+    assert load_snapshot(str(path)) is None
+    path.write_bytes(b"not a snapshot at all, but long enough to hold a header")
+    assert load_snapshot(str(path)) is None
+    data = bytearray(build_snapshot(*payloads))
+    struct.pack_into("<H", data, 8, snapshot.FORMAT_VERSION + 1)
+    path.write_bytes(bytes(data))
+    assert load_snapshot(str(path)) is None
+
+
+def test_get_snapshot_builds_once_and_writes_the_file(fpl):
+    built = get_snapshot()
+    assert built.current_event()["id"] == 10
+    assert get_snapshot() is built
+    assert load_snapshot(snapshot.SNAPSHOT_PATH).source_hash == built.source_hash
+
+
+def test_fixtures_route_takes_scores_from_the_gameweek_payload(payloads, monkeypatch):
+    bootstrap, fixtures = payloads
+    stale = [dict(fixture, team_h_score=99, finished=False) if fixture["event"] == 9 else fixture for fixture in fixtures]
+    monkeypatch.setattr(snapshot, "_current", Snapshot(build_snapshot(bootstrap, stale)))
+    results = TestClient(app).get("/api/fixtures/9").json()
+    finished = [fixture for fixture in fixtures if fixture["event"] == 9 and fixture["finished"]]
+    assert [result["homeScore"] for result in results] == [fixture["team_h_score"] for fixture in finished]
+    assert results[0]["homeTeam"]["abbreviation"] == bootstrap["teams"][finished[0]["team_h"] - 1]["short_name"]
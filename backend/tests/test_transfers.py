@@ -0,0 +1,101 @@
+import pytest
+import requests
+
+from app import entry_history, models, transfers
+from app.transfers import entry_transfers, sync_entries, synced_events
+
+ENTRY = 1000
+
+
+def expected_transfers(fpl, entry_id, up_to_event=10, after_event=0):
+    # The ledger takes transfers for the gameweeks the entry's history says had any
+    events = {
+        row["event"] for row in fpl.history(entry_id)["current"]
+        if row["event_transfers"] and after_event < row["event"] <= up_to_event
+    }
+    return [transfer for transfer in fpl.transfers(entry_id) if transfer["event"] in events]
+
+
+@pytest.fixture
+def transfer_fetches(monkeypatch):
+    """Entry ids whose season transfers list was downloaded."""
+    fetched = []
+    get_json = transfers.get_json
+
+    def recording_get_json(path, ttl=None):
+        if path.endswith("/transfers/"):
+            fetched.append(int(path.split("/")[1]))
+        return get_json(path, ttl=ttl)
+
+    monkeypatch.setattr(transfers, "get_json", recording_get_json)
+    return fetched
+
+
+def test_sync_appends_the_season_and_moves_the_watermark(fpl, db):
+    assert synced_events(db, [ENTRY]) == {ENTRY: 0}
+    appended = sync_entries(db, [ENTRY])
+    assert appended == len(expected_transfers(fpl, ENTRY))
+    assert synced_events(db, [ENTRY]) == {ENTRY: 10}
+    assert db.query(models.EntryTransfer).filter_by(entry_id=ENTRY).count() == appended
+
+
+def test_synced_entries_are_not_fetched_again(fpl, db, transfer_fetches):
+    sync_entries(db, [ENTRY])
+    fetched = len(transfer_fetches)
+    assert sync_entries(db, [ENTRY]) == 0
+    assert len(transfer_fetches) == fetched
+
+
+def test_sync_past_the_watermark_appends_only_new_gameweeks(fpl, db):
+    first = sync_entries(db, [ENTRY], up_to_event=5)
+    assert first == len(expected_transfers(fpl, ENTRY, up_to_event=5))
+    assert synced_events(db, [ENTRY]) == {ENTRY: 5}
+    second = sync_entries(db, [ENTRY])
+    assert second == len(expected_transfers(fpl, ENTRY, after_event=5))
+    assert db.query(models.EntryTransfer).filter_by(entry_id=ENTRY).count() == first + second
+
+
+def test_entries_without_new_transfers_skip_the_download(fpl, db, transfer_fetches):
+    sync_entries(db, fpl.entry_ids, up_to_event=9)
+    transfer_fetches.clear()
+    sync_entries(db, fpl.entry_ids)
+    moved = {entry_id for entry_id in fpl.entry_ids if fpl.history(entry_id)["current"][9]["event_transfers"]}
+    assert set(transfer_fetches) == moved
+    assert set(synced_events(db, fpl.entry_ids).values()) == {10}
+
+
+def test_history_watermark_tracks_the_unfinished_gameweek(fpl, db):
+    assert entry_history.sync_entries(db, [ENTRY]) == [ENTRY]
+    state = db.get(models.EntryHistorySync, ENTRY)
+    assert state.last_event == 10
+    assert not state.last_event_final
+    assert db.query(models.EntryPastSeason).filter_by(entry_id=ENTRY).count() == len(fpl.history(ENTRY)["past"])
+    # Within the refresh interval the unfinished gameweek is not fetched again
+    assert entry_history.sync_entries(db, [ENTRY]) == []
+
+
+def test_entry_transfers_lists_pending_transfers_first(fpl, db, monkeypatch):
+    pending = {
+        "element_in": 1, "element_in_cost": 50, "element_out": 2, "element_out_cost": 55,
+        "entry": ENTRY, "event": 11, "time": "2024-10-30T10:00:00Z",
+    }
+    get_json = transfers.get_json
+    monkeypatch.setattr(
+        transfers, "get_json",
+        lambda path, ttl=None: [pending] + get_json(path, ttl=ttl) if ttl else get_json(path, ttl=ttl),
+    )
+    listed = entry_transfers(db, ENTRY)
+    assert listed[0] == pending
+    assert len(listed) == 1 + len(expected_transfers(fpl, ENTRY))
+    assert entry_transfers(db, ENTRY, event=11) == [pending]
+    assert pending not in entry_transfers(db, ENTRY, event=10)
+
+
+def test_entry_transfers_falls_back_to_the_ledger_when_upstream_fails(fpl, db, monkeypatch):
+    sync_entries(db, [ENTRY])
+
+    def pending_transfers(entry_id):
+        raise requests.ConnectionError("upstream down")
+
+    monkeypatch.setattr(transfers, "pending_transfers", pending_transfers)
+    assert len(entry_transfers(db, ENTRY)) == len(expected_transfers(fpl, ENTRY))
@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app import trends
+from app.snapshot import Snapshot, build_snapshot
+from app.trends import TrendStore, ownership_trend, player_trend, price_changes, time_range
+
+# now_cost and selected_by_percent per element at each snapshot time; None leaves the element out
+HISTORY = {
+    100: {1: (50, 10.0), 2: (60, 5.0), 3: (45, 1.0)},
+    200: {1: (51, 12.0), 2: (60, 5.5), 3: None},
+    300: {1: (51, 12.5), 2: (61, 4.0), 3: (45, 1.5)},
+    400: {1: (50, 11.0), 2: (62, 3.0), 3: (45, 2.0)},
+}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch) -> TrendStore:
+    store = TrendStore(str(tmp_path / "trends"), width=8)
+    for timestamp, values in HISTORY.items():
+        elements = [
+            {"id": element, "now_cost": value[0], "selected_by_percent": str(value[1]), "form": "1.0"}
+            for element, value in values.items() if value
+        ]
+        store.append(timestamp, 1, elements)
+    bootstrap = {
+        "teams": [{"id": 1, "name": "Arsenal", "short_name": "ARS"}],
+        "elements": [{"id": element, "team": 1, "web_name": f"Player {element}"} for element in (1, 2, 3)],
+        "events": [],
+    }
+    snapshot = Snapshot(build_snapshot(bootstrap, []))
+    monkeypatch.setattr(trends, "_store", store)
+    monkeypatch.setattr(trends, "get_snapshot", lambda: snapshot)
+    return store
+
+
+def test_span_is_inclusive(store):
+    assert store.span(100, 400) == (0, 4)
+    assert store.span(150, 300) == (1, 3)
+    assert store.span(500, 600) == (4, 4)
+
+
+def test_time_range_defaults_to_the_week_before_end():
+    end = datetime(2024, 9, 1, tzinfo=timezone.utc)
+    assert time_range(None, end) == (end.timestamp() - trends.TRENDS_DEFAULT_RANGE, end.timestamp())
+    # Naive datetimes are UTC
+    assert time_range(datetime(2024, 8, 1), end)[0] == datetime(2024, 8, 1, tzinfo=timezone.utc).timestamp()
+
+
+def test_price_changes_compare_with_the_snapshot_before_the_range(store):
+    result = price_changes(150, 450)
+    assert result["snapshots"] == 3
+    moves = {player["element"]: [(move["from"], move["to"]) for move in player["changes"]] for player in result["players"]}
+    assert moves == {1: [(50, 51), (51, 50)], 2: [(60, 61), (61, 62)]}
+    # Biggest net move first; element 3 dropped out of one snapshot but never changed price
+    assert [player["element"] for player in result["players"]] == [2, 1]
+    assert (result["risers"], result["fallers"]) == (1, 0)
+    assert result["players"][0]["web_name"] == "Player 2"
+
+
+def test_price_changes_within_a_narrower_range(store):
+    result = price_changes(250, 450)
+    net = {player["element"]: player["net_change"] for player in result["players"]}
+    assert net == {2: 2, 1: -1}
+    assert (result["risers"], result["fallers"]) == (1, 1)
+    assert price_changes(0, 150)["players"] == []
+
+
+def test_price_changes_scan_in_chunks(store, monkeypatch):
+    whole = price_changes(0, 450)
+    monkeypatch.setattr(trends, "SCAN_CHUNK_ROWS", 1)
+    assert price_changes(0, 450) == whole
+
+
+def test_ownership_trend_between_first_and_last_snapshot(store):
+    result = ownership_trend(100, 400)
+    assert [(player["element"], player["change"]) for player in result["risers"]] == [(3, 1.0), (1, 1.0)]
+    assert [(player["element"], player["change"]) for player in result["fallers"]] == [(2, -2.0)]
+    assert ownership_trend(100, 150)["risers"] == []
+
+
+def test_player_trend_thins_to_max_points(store):
+    result = player_trend(3, 0, 500)
+    assert result["series"]["now_cost"] == [45, None, 45, 45]
+    thinned = player_trend(1, 0, 500, max_points=2)
+    assert thinned["step"] == 2
+    assert thinned["series"]["now_cost"] == [50, 51]
+    with pytest.raises(ValueError):
+        player_trend(99, 0, 500)
+
+
+def test_append_skips_snapshots_closer_than_min_interval(store):
+    assert not store.append(450, 1, [], min_interval=100)
+    assert store.append(500, 1, [], min_interval=100)
+    assert len(store) == 5
+
+
+def test_store_refuses_a_different_layout(store):
+    with pytest.raises(ValueError):
+        TrendStore(store.directory, width=16)
@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+
+import pytest
+
+from app import upstream, upstream_archive
+from app.upstream_archive import ArchiveMiss, ArchiveReader, ArchiveWriter, bucket_for_event, event_for_path
+
+
+def test_paths_are_bucketed_by_gameweek():
+    assert event_for_path("event/7/live/") == 7
+    assert event_for_path("entry/1/event/12/picks/") == 12
+    assert event_for_path("leagues-h2h-matches/league/5/?event=3&page=1") == 3
+    assert event_for_path("bootstrap-static/") is None
+    assert bucket_for_event(7) == "gw-07"
+    assert bucket_for_event(None) == "common"
+
+
+def test_replay_serves_the_body_current_at_the_replay_time(tmp_path):
+    writer = ArchiveWriter(str(tmp_path))
+    writer.record("event/7/live/", b"first", timestamp=100)
+    writer.record("event/7/live/", b"second", timestamp=200)
+    writer.record("bootstrap-static/", b"bootstrap", timestamp=150)
+    reader = ArchiveReader(str(tmp_path))
+    assert reader.recorded_start == 100
+    assert reader.lookup("event/7/live/", at=50) == b"first"
+    assert reader.lookup("event/7/live/", at=199) == b"first"
+    assert reader.lookup("event/7/live/", at=250) == b"second"
+    assert reader.lookup("bootstrap-static/", at=100) == b"bootstrap"
+    assert reader.lookup("fixtures/") is None
+    assert sorted(os.listdir(tmp_path)) == ["common.data", "common.index.jsonl", "gw-07.data", "gw-07.index.jsonl"]
+
+
+def test_unchanged_bodies_are_stored_once(tmp_path):
+    writer = ArchiveWriter(str(tmp_path))
+    for timestamp in (100, 200, 300):
+        writer.record("event/7/live/", b"same", timestamp=timestamp)
+    size = os.path.getsize(tmp_path / "gw-07.data")
+    writer.record("event/7/live/", b"changed", timestamp=400)
+    assert os.path.getsize(tmp_path / "gw-07.data") > size
+    assert ArchiveReader(str(tmp_path)).lookup("event/7/live/", at=300) == b"same"
+
+
+RECORDS_PER_WORKER = 1000
+
+
+def _record_many(directory: str, worker: int):
+    writer = ArchiveWriter(directory)
+    for i in range(RECORDS_PER_WORKER):
+        writer.record(f"entry/{worker}/event/1/picks/?n={i}", os.urandom(64) * 64 + f"{worker}:{i}".encode(), timestamp=i)
+
+
+def test_concurrent_processes_record_into_one_archive(tmp_path):
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_record_many, args=(str(tmp_path), worker)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    reader = ArchiveReader(str(tmp_path))
+    for worker in range(4):
+        for i in range(RECORDS_PER_WORKER):
+            assert reader.lookup(f"entry/{worker}/event/1/picks/?n={i}", at=i).endswith(f"{worker}:{i}".encode())
+
+
+def test_replay_mode_answers_upstream_fetches(tmp_path, monkeypatch):
+    ArchiveWriter(str(tmp_path)).record("bootstrap-static/", b'{"events": []}', timestamp=100)
+    monkeypatch.setattr(upstream_archive, "UPSTREAM_MODE", "replay")
+    monkeypatch.setattr(upstream_archive, "_reader", ArchiveReader(str(tmp_path)))
+    assert upstream.get_json("bootstrap-static/") == {"events": []}
+    with pytest.raises(ArchiveMiss):
+        upstream.fetch_bytes("fixtures/")
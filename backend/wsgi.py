@@ -1,24 +1,15 @@
 import os
 import sys
 import logging
-from app.main import app
+from app.logging_config import configure_logging
 
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+# Configure logging (queue-backed, level from LOG_LEVEL)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Log environment details
 logger.debug("Starting wsgi.py initialization")
 logger.debug(f"Current directory: {os.getcwd()}")
-logger.debug(f"Directory contents: {os.listdir()}")
-logger.debug(f"PYTHONPATH: {os.getenv('PYTHONPATH')}")
-logger.debug(f"Python path: {sys.path}")
-logger.debug(f"Environment variables: {dict(os.environ)}")
 
 # Add the current directory to Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,16 +15,11 @@ const PlayerSearchModal = ({ onSelect, onClose, excludePlayerId }) => {
     }
     
     try {
-      const response = await fetch(`${API_URL}/bootstrap-static`);
+      const response = await fetch(`${API_URL}/players/search?q=${encodeURIComponent(term)}&limit=6`);
       const data = await response.json();
       
-      const filteredPlayers = data.elements
-        .filter(player => 
-          player.id !== excludePlayerId &&
-          (player.web_name.toLowerCase().includes(term.toLowerCase()) ||
-           player.first_name.toLowerCase().includes(term.toLowerCase()) ||
-           player.second_name.toLowerCase().includes(term.toLowerCase()))
-        )
+      const filteredPlayers = data.results
+        .filter(player => player.id !== excludePlayerId)
         .slice(0, 5); // Limit to 5 results
         
       setSearchResults(filteredPlayers);
@@ -33,7 +33,7 @@ const MatchupRow = ({ matchup, isExpanded, onToggle, eventId, onManagerClick })
         'Authorization': `Bearer ${SUPABASE_ANON_KEY}`,
         'Content-Type': 'application/json'
       };
-      fetch(`${API_URL}/matchup/${matchup.id}?event=${eventId}`, { headers })
+      fetch(`${API_URL}/matchup/${matchup.id}?event=${eventId}&league_id=${matchup.league}`, { headers })
       .then(response => {
           if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
           return response.json();